@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+
+from ..core.responses import FastJSONResponse
+from .models import Category, Subcategory
+
+MAX_CACHED_RESPONSES = 256
+
+
+class CategoryCache:
+    """
+    Per-worker copy of every live category, its subcategories and rendered responses
+    Writes in this worker bump `version` and the next read reloads; `ttl` bounds how
+    long writes made by other workers go unseen
+    """
+
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self.version = 0
+        self.etag = ""
+        self.categories: List[Category] = []
+        self.by_id: Dict[str, Category] = {}
+        self.subcategories: Dict[str, Tuple[str, Subcategory]] = {}
+        self._responses: Dict[Hashable, Tuple[str, bytes]] = {}
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def bump(self):
+        """Call after any category write"""
+        self.version += 1
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_version == self.version and time.monotonic() - self._loaded_at < self.ttl
+
+    async def ensure_loaded(self):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            version = self.version
+            categories = await Category.find_trusted(
+                {Category.is_deleted: False},
+                sort=[(Category.sort_order, 1), (Category.name, 1)],
+            )
+            self.categories = categories
+            self.by_id = {category.categoryId: category for category in categories}
+            self.subcategories = {
+                sub.id: (category.categoryId, sub)
+                for category in categories
+                for sub in category.subcategories
+                if sub.id
+            }
+            self.etag = hashlib.blake2b(
+                orjson.dumps([category.model_dump(mode="json", by_alias=True) for category in categories]),
+                digest_size=8,
+            ).hexdigest()
+            self._responses.clear()
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+
+    async def get(self, category_id: str) -> Optional[Category]:
+        await self.ensure_loaded()
+        return self.by_id.get(category_id)
+
+    async def name(self, category_id: str) -> Optional[str]:
+        """Name of a category or subcategory"""
+        await self.ensure_loaded()
+        category = self.by_id.get(category_id)
+        if category:
+            return category.name
+        parent = self.subcategories.get(category_id)
+        return parent[1].name if parent else None
+
+    async def names(self) -> Dict[str, str]:
+        """categoryId / subcategory id -> name for everything cached"""
+        await self.ensure_loaded()
+        names = {sub_id: sub.name for sub_id, (_, sub) in self.subcategories.items()}
+        names.update({category_id: category.name for category_id, category in self.by_id.items()})
+        return names
+
+    async def filter(
+        self,
+        transaction_types: Optional[List[Any]] = None,
+        is_active: Optional[bool] = None,
+        search: Optional[str] = None,
+    ) -> List[Category]:
+        """Same filters as the list endpoint's query, in memory"""
+        await self.ensure_loaded()
+        # Plain case-insensitive substring - user input is never compiled as a regex
+        needle = search.casefold() if search else None
+        wanted = set(transaction_types or [])
+        return [
+            category
+            for category in self.categories
+            if (not wanted or wanted.intersection(category.transaction_types))
+            and (is_active is None or category.is_active == is_active)
+            and (
+                needle is None
+                or needle in category.name.casefold()
+                or (category.description and needle in category.description.casefold())
+            )
+        ]
+
+    def cached_response(self, key: Hashable, request: Request, build) -> Response:
+        """
+        Rendered JSON for `key`, reused until the next reload
+        `build()` returns the FastJSONResponse to cache; If-None-Match hits get a 304
+        """
+        entry = self._responses.get(key)
+        if entry is None:
+            response: FastJSONResponse = build()
+            if response.status_code != 200:
+                return response
+            etag = f'W/"{self.etag}-{hashlib.blake2b(response.body, digest_size=6).hexdigest()}"'
+            entry = (etag, response.body)
+            if len(self._responses) >= MAX_CACHED_RESPONSES:
+                self._responses.pop(next(iter(self._responses)))
+            self._responses[key] = entry
+
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+category_cache = CategoryCache()
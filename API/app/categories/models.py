@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import ClassVar, Optional, List
 from enum import Enum
 from pydantic import Field, field_validator, BaseModel
-from ..database import BaseDocument
+from pymongo import IndexModel
+from ..database import LIVE_FILTER, TOMBSTONE_FILTER, BaseDocument
 from ..core.config import *
 from ..cloud_services.aws_services.dynamodb import *
 
@@ -153,6 +154,9 @@ class Category(model):
             return []
         return [acc for acc in v if acc and str(acc).strip()]
     
+    # Replaced by the partial live_* / tombstones_* indexes
+    legacy_indexes: ClassVar[List[str]] = ["is_deleted_1"]
+
     class Settings:
         name = "categories"
         indexes = [
@@ -160,8 +164,11 @@ class Category(model):
             "name",
             "transaction_types",
             "is_active",
-            "is_deleted",
-            "sort_order"
+            "sort_order",
+            # Category cache load: live categories in display order
+            IndexModel([("sortOrder", 1), ("name", 1)], name="live_sort_name", partialFilterExpression=LIVE_FILTER),
+            # Compaction: tombstones by deletion time
+            IndexModel([("updatedAt", 1)], name="tombstones_updated", partialFilterExpression=TOMBSTONE_FILTER),
         ]
     
     class Config:
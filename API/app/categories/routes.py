@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import Optional, List
 from ..core.utils import utils
+from ..core.responses import api_response
 from datetime import datetime
 from .models import (
     Category,
@@ -10,6 +11,10 @@ from .models import (
     TransactionType,
     Subcategory,
 )
+from ..auth.dependencies import get_current_user
+from .cache import category_cache
+from .stats import category_stats_cache
+from ..expense_tracker.search import reindex
 
 
 router = APIRouter()
@@ -49,11 +54,12 @@ async def save_category(data: CategoryCreate):
             
             category = Category(**category_data)
             await category.insert()
+            category_cache.bump()
             
-            return ApiResponse(
+            return api_response(
                 success=True,
                 message="Category created successfully",
-                data=category.model_dump(by_alias=True, mode="json"),
+                data=category,
             )
         
         # === UPDATE EXISTING CATEGORY ===
@@ -79,16 +85,21 @@ async def save_category(data: CategoryCreate):
                     sub["sort_order"] = i
                     sub["updated_at"] = datetime.utcnow()
             
+            renamed = "name" in category_data and category_data["name"] != category.name
             for key, value in category_data.items():
                 if hasattr(category, key):
                     setattr(category, key, value)
             
             await category.save()
+            category_cache.bump()
+            if renamed:
+                # Category names are part of transaction search tokens
+                await reindex(category.categoryId)
             
-            return ApiResponse(
+            return api_response(
                 success=True,
                 message="Category updated successfully",
-                data=category.model_dump(by_alias=True, mode="json"),
+                data=category,
             )
     
     except HTTPException:
@@ -97,7 +108,7 @@ async def save_category(data: CategoryCreate):
         import traceback
         print(f"Error in save_category: {str(e)}")
         print(traceback.format_exc())
-        return ApiResponse(
+        return api_response(
             success=False,
             message="Failed to save category",
             errors=[str(e)]
@@ -105,6 +116,7 @@ async def save_category(data: CategoryCreate):
 
 @router.get("/get_list")
 async def list_categories(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     transaction_types: Optional[List[TransactionType]] = Query(None, alias="transactionTypes"),
@@ -113,54 +125,20 @@ async def list_categories(
 ):
     """List categories with filters - supports multiple transaction types"""
     try:
-        # Start with base query
-        query = Category.find(Category.is_deleted == False)
-        
-        # ✅ Filter by multiple transaction types
-        if transaction_types:
-            from beanie.operators import In
-            query = query.find(In(Category.transaction_types, transaction_types))
-        
-        if is_active is not None:
-            query = query.find(Category.is_active == is_active)
-        
-        # Search in name/description
-        if search:
-            from beanie.operators import RegEx
-            query = query.find(
-                RegEx(Category.name, search, "i") | 
-                RegEx(Category.description, search, "i")
-            )
-        
-        # Get total count
-        total = await query.count()
-        
-        # Apply sorting and pagination
-        categories = (
-            await query.sort(
-                Category.sort_order,
-                Category.name
-            )
-            .skip(skip)
-            .limit(limit)
-            .to_list()
-        )
-        
-        # Serialize
-        categories_data = [
-            c.model_dump(by_alias=True, mode="json") for c in categories
-        ]
-        
-        return {
-            "success": True,
-            "data": categories_data,
-            "pagination": {
+        # Served from the per-worker cache; unchanged lists answer If-None-Match with 304
+        categories = await category_cache.filter(transaction_types, is_active, search)
+        total = len(categories)
+
+        key = ("list", skip, limit, tuple(transaction_types or ()), is_active, search)
+        return category_cache.cached_response(key, request, lambda: api_response(
+            data=categories[skip:skip + limit],
+            pagination={
                 "total": total,
                 "skip": skip,
                 "limit": limit,
                 "pages": (total + limit - 1) // limit,
             },
-        }
+        ))
     except Exception as e:
         import traceback
         print(f"Error listing categories: {str(e)}")
@@ -168,34 +146,11 @@ async def list_categories(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/stats/summary")
-async def get_category_stats():
-    """Get category statistics"""
+async def get_category_stats(current_user=Depends(get_current_user)):
+    """Get category statistics - one aggregation, cached per user"""
     try:
-        # Count categories by type
-        categories = await Category.find(
-            Category.is_deleted == False,
-            Category.is_active == True
-        ).to_list()
-        
-        stats = {
-            "total": len(categories),
-            "byType": {},
-            "withSubcategories": 0,
-            "totalSubcategories": 0
-        }
-        
-        for category in categories:
-            type_name = category.transaction_type.value
-            stats["byType"][type_name] = stats["byType"].get(type_name, 0) + 1
-            
-            if category.subcategories:
-                stats["withSubcategories"] += 1
-                stats["totalSubcategories"] += len(category.subcategories)
-        
-        return {
-            "success": True,
-            "data": stats
-        }
+        stats = await category_stats_cache.get(str(current_user.id))
+        return api_response(data=stats)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -211,13 +166,14 @@ async def reorder_categories(categoryId: str, new_order: int = Query(..., ge=0))
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
         
-        category.display_order = new_order
+        category.sort_order = new_order
         category.updated_at = datetime.utcnow()
         await category.save()
+        category_cache.bump()
         
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=category.model_dump(by_alias=True, mode="json"),
+            data=category,
             message="Category order updated successfully"
         )
     except HTTPException:
@@ -249,8 +205,9 @@ async def delete_category(categoryId: str):
         category.is_deleted = True
         category.updated_at = datetime.utcnow()
         await category.save()
+        category_cache.bump()
         
-        return ApiResponse(
+        return api_response(
             success=True, 
             message="Category deleted successfully"
         )
@@ -263,23 +220,19 @@ async def delete_category(categoryId: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{categoryId}")
-async def get_category(categoryId: str):
+async def get_category(categoryId: str, request: Request):
     """Get single category by custom categoryId"""
     try:
-        # Use find_one() for custom fields
-        category = await Category.find_one(
-            Category.categoryId == categoryId,
-            Category.is_deleted == False
-        )
+        category = await category_cache.get(categoryId)
         
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
         
-        return ApiResponse(
+        return category_cache.cached_response(("get", categoryId), request, lambda: api_response(
             success=True,
-            data=category.model_dump(by_alias=True, mode='json'),
+            data=category,
             message="Category retrieved successfully"
-        )
+        ))
         
     except HTTPException:
         raise
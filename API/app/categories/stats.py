@@ -0,0 +1,121 @@
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from ..expense_tracker.models import TransactionRollup, TransactionType
+from ..expense_tracker.signals import TransactionChange, transaction_committed
+from .cache import category_cache
+from .models import Category
+
+
+async def category_stats(user: str) -> Dict[str, Any]:
+    """
+    Category counts and per-category usage in one $facet aggregation
+    Usage is joined from the user's monthly rollups rather than raw transactions
+    """
+    subcategory_count = {"$size": {"$ifNull": [f"${Category.subcategories}", []]}}
+    pipeline = [
+        {"$match": {Category.is_deleted: False, Category.is_active: True}},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "withSubcategories": {"$sum": {"$cond": [{"$gt": [subcategory_count, 0]}, 1, 0]}},
+                    "totalSubcategories": {"$sum": subcategory_count},
+                }},
+            ],
+            "byType": [
+                {"$unwind": f"${Category.transaction_types}"},
+                {"$group": {"_id": f"${Category.transaction_types}", "count": {"$sum": 1}}},
+            ],
+            "usage": [
+                {"$lookup": {
+                    "from": TransactionRollup.get_collection_name(),
+                    "let": {"categoryId": f"${Category.categoryId}"},
+                    "pipeline": [
+                        {"$match": {
+                            TransactionRollup.user: user,
+                            "$expr": {"$eq": [f"${TransactionRollup.categoryId}", "$$categoryId"]},
+                        }},
+                        {"$group": {
+                            "_id": None,
+                            "count": {"$sum": f"${TransactionRollup.transaction_count}"},
+                            "spend": {"$sum": {"$cond": [
+                                {"$eq": [f"${TransactionRollup.transaction_type}", TransactionType.EXPENSE.value]},
+                                f"${TransactionRollup.total}",
+                                0,
+                            ]}},
+                        }},
+                    ],
+                    "as": "usage",
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "categoryId": f"${Category.categoryId}",
+                    "name": "$name",
+                    "usage": {"$arrayElemAt": ["$usage", 0]},
+                }},
+            ],
+        }},
+    ]
+
+    stats: Dict[str, Any] = {"total": 0, "byType": {}, "withSubcategories": 0, "totalSubcategories": 0, "usage": []}
+    async for facets in Category.aggregate(pipeline):
+        if facets["totals"]:
+            totals = facets["totals"][0]
+            stats["total"] = totals["total"]
+            stats["withSubcategories"] = totals["withSubcategories"]
+            stats["totalSubcategories"] = totals["totalSubcategories"]
+        stats["byType"] = {row["_id"]: row["count"] for row in facets["byType"]}
+        stats["usage"] = sorted(
+            (
+                {
+                    "categoryId": row["categoryId"],
+                    "name": row["name"],
+                    "transactionCount": (row.get("usage") or {}).get("count", 0),
+                    "spend": round((row.get("usage") or {}).get("spend", 0.0), 2),
+                }
+                for row in facets["usage"]
+            ),
+            key=lambda row: -row["spend"],
+        )
+    return stats
+
+
+class CategoryStatsCache:
+    """
+    Stats per user, valid while neither the categories nor the user's transactions
+    have been written since - plus `ttl` for writes made by other workers
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._user_versions: Dict[str, int] = defaultdict(int)
+        self._entries: Dict[str, Tuple[Tuple[int, int], float, Dict[str, Any]]] = {}
+
+    def bump(self, user: str):
+        self._user_versions[user] += 1
+
+    def _version(self, user: str) -> Tuple[int, int]:
+        return category_cache.version, self._user_versions[user]
+
+    async def get(self, user: str) -> Dict[str, Any]:
+        entry = self._entries.get(user)
+        if entry and entry[0] == self._version(user) and time.monotonic() - entry[1] < self.ttl:
+            return entry[2]
+        version = self._version(user)
+        stats = await category_stats(user)
+        self._entries[user] = (version, time.monotonic(), stats)
+        return stats
+
+
+category_stats_cache = CategoryStatsCache()
+
+
+@transaction_committed.connect
+async def invalidate_category_stats(changes: List[TransactionChange], **kwargs):
+    for before, after in changes:
+        for transaction in (before, after):
+            if transaction is not None:
+                category_stats_cache.bump(transaction.created_by or "")
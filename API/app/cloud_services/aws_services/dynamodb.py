@@ -10,6 +10,7 @@ from datetime import datetime
 import json
 from uuid import uuid4
 from ...core.config import *
+from ...core.hydration import Hydrator
 
 # SQLAlchemy imports (for existing auth system)
 from sqlalchemy import create_engine
@@ -20,6 +21,9 @@ from sqlalchemy.orm import sessionmaker
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# TransactWriteItems accepts at most this many actions per request
+TRANSACT_WRITE_LIMIT = 100
+
 # BASE_DIR = Path(__file__).resolve().parent
 # ENV_PATH = BASE_DIR / "core" / "settings" / ".env"
 
@@ -212,13 +216,13 @@ class QuerySet:
         return count
     
     async def update(self, **kwargs) -> int:
-        """Update all matching documents"""
+        """Update all matching documents - rewritten through one batched writer"""
         items = await self.to_list()
-        count = 0
         for item in items:
-            await item.update(**kwargs)
-            count += 1
-        return count
+            for key, value in kwargs.items():
+                setattr(item, key, value)
+        await self.model.bulk_save(items)
+        return len(items)
 
 # Django-style Manager
 class Manager:
@@ -256,10 +260,9 @@ class Manager:
         return obj
     
     async def bulk_create(self, objects: List[dict]) -> List[T]:
-        """Create multiple documents"""
+        """Create multiple documents - batched writes (25 items per request)"""
         docs = [self.model(**obj) for obj in objects]
-        for doc in docs:
-            await doc.save()
+        await self.model.bulk_save(docs)
         return docs
     
     def all(self) -> QuerySet:
@@ -343,12 +346,70 @@ class BaseDynamoModel(BaseModel):
         except Exception as e:
             logger.error(f"❌ Failed to create table {cls.table_name}: {e}")
             raise
+
+    def to_item(self) -> Dict[str, Any]:
+        """Serialize to the stored item shape"""
+        item = self.dict(by_alias=True)
+        item['data'] = self.dict(exclude={'pk', 'sk', 'created_at', 'updated_at', 'data'})
+        return item
+
+    @classmethod
+    async def bulk_save(cls, docs: List['BaseDynamoModel']) -> None:
+        """
+        Put many documents with BatchWriteItem
+        boto3's batch_writer groups puts into 25-item requests and retries unprocessed items
+        """
+        if not docs:
+            return
+        now = datetime.utcnow().isoformat()
+        items = []
+        for doc in docs:
+            doc.updated_at = now
+            items.append(doc.to_item())
+
+        def _write():
+            table = DynamoDBManager._resource.Table(cls.table_name)
+            with table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, _write)
+        except Exception as e:
+            logger.error(f"Error batch saving documents: {e}")
+            raise
+
+    @classmethod
+    async def transact_save(cls, docs: List['BaseDynamoModel']) -> None:
+        """
+        Put up to TRANSACT_WRITE_LIMIT documents with TransactWriteItems - all of them or none
+        For writes that must land together (the legs of a transfer)
+        """
+        if not docs:
+            return
+        if len(docs) > TRANSACT_WRITE_LIMIT:
+            raise ValueError(f"TransactWriteItems takes at most {TRANSACT_WRITE_LIMIT} items, got {len(docs)}")
+        now = datetime.utcnow().isoformat()
+        transact_items = []
+        for doc in docs:
+            doc.updated_at = now
+            transact_items.append({'Put': {'TableName': doc.table_name, 'Item': doc.to_item()}})
+
+        # The resource's client accepts plain Python values, like Table.put_item
+        client = DynamoDBManager._resource.meta.client
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None, lambda: client.transact_write_items(TransactItems=transact_items)
+            )
+        except Exception as e:
+            logger.error(f"Error transactionally saving documents: {e}")
+            raise
+
     async def save(self, **kwargs) -> 'BaseDynamoModel':
         """Save document - Django style"""
         self.updated_at = datetime.utcnow().isoformat()
         
-        item = self.dict(by_alias=True)
-        item['data'] = self.dict(exclude={'pk', 'sk', 'created_at', 'updated_at', 'data'})
+        item = self.to_item()
         
         try:
             table = DynamoDBManager._resource.Table(self.table_name)
@@ -414,14 +475,20 @@ class BaseDynamoModel(BaseModel):
             )
             
             if 'Item' in result:
-                item = result['Item']
-                data = {**item['data'], 'pk': item['pk'], 'sk': item['sk']}
-                return cls(**data)
+                return cls.from_item(result['Item'])
             return None
         except Exception as e:
             logger.error(f"Error getting document: {e}")
             return None
     
+    @classmethod
+    def from_item(cls: Type[T], item: Dict[str, Any]) -> T:
+        """
+        Build a model from a stored DynamoDB item without validation
+        Items are written by save() from validated models, so reads trust them
+        """
+        return Hydrator.hydrate(cls, {**item.get('data', {}), 'pk': item['pk'], 'sk': item['sk']})
+
     @classmethod
     async def _query_items(cls, filters: dict, limit: Optional[int] = None) -> List[T]:
         """Internal query - FIXED DynamoDB scan"""
@@ -441,8 +508,7 @@ class BaseDynamoModel(BaseModel):
                 # Manual filter (DynamoDB scan limitation)
                 data = item.get('data', {})
                 if cls._item_matches_filters(data, filters):
-                    full_item = {**data, 'pk': item['pk'], 'sk': item['sk']}
-                    items.append(cls(**full_item))
+                    items.append(cls.from_item(item))
             return items
         except Exception as e:
             logger.error(f"Query error: {e}")
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Optional, Set, Tuple, TypeVar
+
+# Cached values report their size as .nbytes
+V = TypeVar("V")
+
+
+class UserCache(Generic[V]):
+    """
+    Per-worker value per user, built by `load(user)` on first use and patched in place
+    by a transaction_committed receiver through `changed(user)`
+    Least recently used users are dropped while the total exceeds `budget_bytes`.
+    Entries are rebuilt after `ttl` seconds, covering writes made by other workers
+    """
+
+    def __init__(self, load: Callable[[str], Awaitable[V]], budget_bytes: int, ttl: float = 300):
+        self.load = load
+        self.budget_bytes = budget_bytes
+        self.ttl = ttl
+        self._users: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Users written to while their load was running - that result may predate the write
+        self._missed: Set[str] = set()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(value.nbytes for _, value in self._users.values())
+
+    async def get(self, user: str) -> V:
+        entry = self._users.get(user)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._users.move_to_end(user)
+            return entry[1]
+        task = self._loading.get(user)
+        if task is None:
+            self._missed.discard(user)
+            task = self._loading[user] = asyncio.ensure_future(self._load(user))
+        try:
+            loaded_at, value = await task
+        finally:
+            if self._loading.get(user) is task:
+                del self._loading[user]
+        if user in self._missed:
+            # Answer this read, but build afresh next time
+            self._users.pop(user, None)
+            return value
+        self._users[user] = (loaded_at, value)
+        self._users.move_to_end(user)
+        self.evict()
+        return value
+
+    async def _load(self, user: str) -> Tuple[float, V]:
+        loaded_at = time.monotonic()
+        return loaded_at, await self.load(user)
+
+    def evict(self):
+        total = self.nbytes
+        # The most recently used user always stays, even when alone over budget
+        while total > self.budget_bytes and len(self._users) > 1:
+            _, (_, value) = self._users.popitem(last=False)
+            total -= value.nbytes
+
+    def loaded(self, user: str) -> Optional[V]:
+        entry = self._users.get(user)
+        return entry[1] if entry is not None else None
+
+    def changed(self, user: str) -> Optional[V]:
+        """The loaded value to patch for a committed write to `user`'s rows; a running load is not kept"""
+        if user in self._loading:
+            self._missed.add(user)
+        return self.loaded(user)
+
+    def invalidate(self, user: Optional[str] = None):
+        if user is None:
+            self._users.clear()
+            self._missed.update(self._loading)
+        else:
+            self._users.pop(user, None)
+            if user in self._loading:
+                self._missed.add(user)
@@ -29,4 +29,34 @@ DB_NAME = env_config("DB_NAME", default="expense_tracker")
 SQLALCHEMY_DATABASE_URL = env_config(
     "DATABASE_URL",
     default="sqlite:///./sql_app.db"  # Default SQLite for testing
-)
\ No newline at end of file
+)
+# Background jobs
+BUDGET_RECONCILE_SECONDS = env_config("BUDGET_RECONCILE_SECONDS", default=3600, cast=int)
+RECURRING_SCHEDULER_SECONDS = env_config("RECURRING_SCHEDULER_SECONDS", default=300, cast=int)
+
+# Typeahead: per-worker memory for every user's suggestion vocabulary
+SUGGEST_MEMORY_BUDGET_MB = env_config("SUGGEST_MEMORY_BUDGET_MB", default=64, cast=int)
+# Analytics: processes for large time-series computations (0 computes inline)
+ANALYTICS_WORKERS = env_config("ANALYTICS_WORKERS", default=2, cast=int)
+# Analytics: per-worker memory for the columnar copies of active users' transactions
+ANALYTICS_CACHE_MB = env_config("ANALYTICS_CACHE_MB", default=256, cast=int)
+
+# Cold archive: per-user, per-year files for transactions older than ARCHIVE_AFTER_YEARS
+ARCHIVE_DIR = env_config("ARCHIVE_DIR", default=str(BASE_DIR.parent.parent / "archive"))
+ARCHIVE_AFTER_YEARS = env_config("ARCHIVE_AFTER_YEARS", default=3, cast=int)
+ARCHIVE_INTERVAL_SECONDS = env_config("ARCHIVE_INTERVAL_SECONDS", default=0, cast=int)
+# Archiving deletes rows from the shared database but writes the files to ARCHIVE_DIR, so every
+# host running the API must read the same directory: one host, or a shared volume with working
+# file locks. Set this once that holds - archiving refuses to run without it
+ARCHIVE_DIR_SHARED = env_config("ARCHIVE_DIR_SHARED", default="false", cast=bool)
+
+# Read-side replica: monthly transactions_YYYYMM copies that serve date-bounded reads
+# Every transaction write is also upserted into its month - bench_partitions measures both sides
+# Reads stay on the main collection until `python -m API.app.expense_tracker.partitions` has
+# backfilled. Turning the mode off stops the mirroring - before turning it back on, drop the
+# transactions_YYYYMM collections and the partition_backfills marker, then backfill again
+TRANSACTION_PARTITIONS = env_config("TRANSACTION_PARTITIONS", default="false", cast=bool)
+
+# Compaction: soft-deleted rows older than the retention window move to <collection>_trash
+TOMBSTONE_RETENTION_DAYS = env_config("TOMBSTONE_RETENTION_DAYS", default=30, cast=int)
+COMPACTION_INTERVAL_SECONDS = env_config("COMPACTION_INTERVAL_SECONDS", default=86400, cast=int)
@@ -0,0 +1,139 @@
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+import types
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+_setattr = object.__setattr__
+_MISSING = object()
+
+# A plan entry: (field name, stored keys to look up, converter or None, default, default factory)
+FieldPlan = Tuple[str, Tuple[str, ...], Optional[Callable[[Any], Any]], Any, Optional[Callable[[], Any]]]
+
+
+class ModelPlan:
+    """Per-model hydration plan - computed once, reused for every document"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.fields: List[FieldPlan] = []
+        for name, field in model.model_fields.items():
+            keys = (field.alias, name) if field.alias and field.alias != name else (name,)
+            default = _MISSING if field.default is PydanticUndefined else field.default
+            factory = field.default_factory
+            if isinstance(default, (dict, list, set)):
+                # Mutable defaults are copied per instance, as pydantic does
+                default, factory = _MISSING, default.copy
+            self.fields.append(
+                (name, keys, Hydrator._converter(field.annotation), default, factory)
+            )
+
+        # Private attributes (Beanie keeps state-management bookkeeping here)
+        self.private: Dict[str, Any] = {}
+        self.private_factories: Dict[str, Callable[[], Any]] = {}
+        for name, attr in (model.__private_attributes__ or {}).items():
+            if attr.default_factory is not None:
+                self.private_factories[name] = attr.default_factory
+            elif attr.default is not PydanticUndefined:
+                self.private[name] = attr.default
+
+
+class Hydrator:
+    """
+    Builds model instances from data we wrote ourselves, skipping validation
+    Only converts what the storage layer changes (dates stored as datetimes,
+    DynamoDB Decimals, enum values, nested models); everything else is passed through
+    """
+
+    _plans: Dict[type, ModelPlan] = {}
+
+    @classmethod
+    def hydrate(cls, model: Type[BaseModel], raw: Dict[str, Any]) -> BaseModel:
+        """Construct `model` from a stored document without running validators"""
+        plan = cls._plans.get(model)
+        if plan is None:
+            plan = cls._plans[model] = ModelPlan(model)
+
+        # Walk fields in schema order so dumps keep the declared key order
+        values = {}
+        fields_set = set()
+        for name, keys, convert, default, factory in plan.fields:
+            value = raw.get(keys[0], _MISSING)
+            if value is _MISSING and len(keys) > 1:
+                value = raw.get(keys[1], _MISSING)
+            if value is _MISSING:
+                if factory is not None:
+                    values[name] = factory()
+                else:
+                    values[name] = None if default is _MISSING else default
+                continue
+            if convert is not None and value is not None:
+                value = convert(value)
+            values[name] = value
+            fields_set.add(name)
+
+        # Same end state as model_construct(), without its per-field Python overhead
+        obj = model.__new__(model)
+        _setattr(obj, "__dict__", values)
+        _setattr(obj, "__pydantic_fields_set__", fields_set)
+        _setattr(obj, "__pydantic_extra__", None)
+        if plan.private or plan.private_factories:
+            private = dict(plan.private)
+            for name, factory in plan.private_factories.items():
+                private[name] = factory()
+            _setattr(obj, "__pydantic_private__", private)
+        else:
+            _setattr(obj, "__pydantic_private__", None)
+        return obj
+
+    @classmethod
+    def _converter(cls, annotation: Any) -> Optional[Callable[[Any], Any]]:
+        """Return a converter for `annotation`, or None when values pass through unchanged"""
+        origin = get_origin(annotation)
+
+        if origin is Union or origin is types.UnionType:
+            args = [arg for arg in get_args(annotation) if arg is not type(None)]
+            return cls._converter(args[0]) if len(args) == 1 else None
+
+        if origin in (list, List):
+            args = get_args(annotation)
+            item = cls._converter(args[0]) if args else None
+            if item is None:
+                return None
+            return lambda v: [item(i) if i is not None else None for i in v]
+
+        if not isinstance(annotation, type):
+            return None
+
+        if issubclass(annotation, BaseModel):
+            return lambda v: cls.hydrate(annotation, v) if isinstance(v, dict) else v
+        if issubclass(annotation, Enum):
+            return lambda v: v if type(v) is annotation else annotation(v)
+        if issubclass(annotation, datetime):
+            return _to_datetime
+        if issubclass(annotation, date):
+            return _to_date
+        if annotation is float:
+            return lambda v: v if type(v) is float else float(v)
+        if annotation is int:
+            return lambda v: v if type(v) is int else int(v)
+        return None
+
+
+def _to_date(value: Any) -> Any:
+    # MongoDB has no date type - Beanie stores dates as midnight datetimes
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, (int, float, Decimal)):
+        return datetime.utcfromtimestamp(float(value))
+    return value
@@ -0,0 +1,57 @@
+from typing import Any, List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it does not encode natively"""
+    if isinstance(obj, BaseModel):
+        # Pydantic serializes straight to JSON bytes in Rust - orjson embeds them as-is
+        return orjson.Fragment(obj.__pydantic_serializer__.to_json(obj, by_alias=True))
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson
+    Pydantic models (and lists of them) anywhere in the content are dumped
+    directly to bytes - no intermediate dicts, no re-validation
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def api_response(
+    success: bool = True,
+    data: Any = None,
+    message: Optional[str] = None,
+    errors: Optional[List[str]] = None,
+    status_code: int = 200,
+    **extra: Any,
+) -> FastJSONResponse:
+    """
+    Build the standard {success, data, message, errors} envelope
+    Returning a Response skips FastAPI's response_model validation,
+    so only use this for payloads we produced ourselves
+    """
+    content = {
+        "success": success,
+        "data": data,
+        "message": message,
+        "errors": errors,
+        **extra,
+    }
+    return FastJSONResponse(content=content, status_code=status_code)
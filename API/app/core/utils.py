@@ -1,6 +1,7 @@
 # utils.py or wherever your Utils class is defined
 
-from typing import Dict
+from datetime import date, datetime
+from typing import Dict, Optional
 import base64
 import hashlib
 import hmac
@@ -41,6 +42,13 @@ class Utils:
             # Combine: timestamp(16) + counter(6) + random(2) = 24 digits
             return f"{timestamp}{Utils._counter:06d}{random_part:02d}"
     
+    @staticmethod
+    def as_datetime(value: Optional[date]) -> Optional[datetime]:
+        """Date -> midnight datetime, the form MongoDB stores dates in (for raw queries)"""
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.combine(value, datetime.min.time())
+
     @staticmethod
     def is_none(value) -> bool:
         """Check if value is None or empty"""
@@ -1,11 +1,19 @@
-from typing import Optional, List, Type, TypeVar, Any, ClassVar
+from typing import Optional, List, Type, TypeVar, Any, ClassVar, Tuple, Callable, Awaitable
+from datetime import date, datetime
+import asyncio
+import re
+import time
 from beanie import Document, init_beanie, PydanticObjectId
-from motor.motor_asyncio import AsyncIOMotorClient
+from beanie.odm.queries.find import FindMany
+from beanie.odm.utils.encoder import Encoder
+from pymongo import AsyncMongoClient, IndexModel
+from pymongo.errors import OperationFailure
 from pydantic import BaseModel
 import logging
 from decouple import Config, RepositoryEnv
 from pathlib import Path
 from .core.config import *
+from .core.hydration import Hydrator
 
 # SQLAlchemy imports (for existing auth system)
 from sqlalchemy import create_engine
@@ -42,21 +50,31 @@ def get_db():
 
 # Type variable for generic operations
 T = TypeVar('T', bound=Document)
+R = TypeVar('R')
+
+# Partial index filters - soft-deleted documents are tombstones every hot query skips
+LIVE_FILTER = {"isDeleted": False}
+TOMBSTONE_FILTER = {"isDeleted": True}
+INDEX_NOT_FOUND = 27
 
 class MongoDBManager:
     """Singleton database manager - Django-style for MongoDB"""
     
-    _client: Optional[AsyncIOMotorClient] = None
+    _client: Optional[AsyncMongoClient] = None
     _db = None
     _models: List[Type[Document]] = []
+    _supports_transactions: Optional[bool] = None
     
     @classmethod
     async def connect(cls, models: List[Type[Document]]):
         """Connect to MongoDB and initialize Beanie"""
         try:
-            cls._client = AsyncIOMotorClient(MONGO_URL)
+            # Beanie 2 runs on PyMongo's native async client
+            cls._client = AsyncMongoClient(MONGO_URL)
             cls._db = cls._client[DB_NAME]
             cls._models = models
+            # Replaced index definitions go first - init_beanie builds their successors
+            await cls.drop_legacy_indexes(models)
             
             # Initialize Beanie with all models
             await init_beanie(
@@ -68,11 +86,39 @@ class MongoDBManager:
             logger.error(f"❌ MongoDB connection failed: {e}")
             raise
     
+    @classmethod
+    async def drop_legacy_indexes(cls, models: List[Type[Document]]) -> List[str]:
+        """
+        Drop the indexes each model lists in `legacy_indexes` - definitions replaced by newer
+        ones (e.g. full indexes now partial on isDeleted) that would clash with or shadow them
+        """
+        dropped = []
+        for model in models:
+            names = getattr(model, "legacy_indexes", None)
+            collection_name = getattr(getattr(model, "Settings", None), "name", None)
+            if not names or not collection_name:
+                continue
+            collection = cls._db[collection_name]
+            existing = await collection.index_information()
+            for name in names:
+                if name not in existing:
+                    continue
+                try:
+                    await collection.drop_index(name)
+                    dropped.append(f"{collection_name}.{name}")
+                except OperationFailure as e:
+                    # Another worker starting up dropped it first
+                    if e.code != INDEX_NOT_FOUND:
+                        raise
+        if dropped:
+            logger.info(f"Dropped legacy indexes: {', '.join(dropped)}")
+        return dropped
+
     @classmethod
     async def close(cls):
         """Close database connection"""
         if cls._client:
-            cls._client.close()
+            await cls._client.close()
             logger.info("MongoDB connection closed")
     
     @classmethod
@@ -85,6 +131,194 @@ class MongoDBManager:
             logger.error(f"Database ping failed: {e}")
             return False
 
+    @classmethod
+    async def supports_transactions(cls) -> bool:
+        """Multi-document transactions need a replica set or sharded cluster"""
+        if cls._supports_transactions is None:
+            if cls._client is None:
+                cls._supports_transactions = False
+            else:
+                hello = await cls._client.admin.command('hello')
+                cls._supports_transactions = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+        return cls._supports_transactions
+
+    @classmethod
+    async def run_transaction(cls, callback: Callable[[Any], Awaitable[R]]) -> R:
+        """
+        Run `callback(session)` in one multi-document transaction - Django's atomic()
+        The whole callback is retried on transient errors (write conflicts between requests
+        $inc-ing the same documents) and the commit on unknown commit results, by PyMongo's
+        with_transaction. On a standalone server the callback runs once with session=None
+        Example:
+            async def write(session):
+                await doc.insert(session=session)
+            await MongoDBManager.run_transaction(write)
+        """
+        if not await cls.supports_transactions():
+            return await callback(None)
+        async with cls._client.start_session() as session:
+            return await session.with_transaction(callback)
+
+# Date-partitioned copies of a collection
+PARTITION_MARKERS = "partition_backfills"
+
+
+class MonthlyPartitions:
+    """
+    One collection per calendar month of `field`: <collection>_YYYYMM
+    A read-side replica - the model's own collection stays the write target and source of truth
+    The QuerySet planner prunes months outside the filter's range on `field`
+    and queries the rest in parallel, once a backfill has filled them
+    """
+
+    def __init__(
+        self,
+        model: Type[T],
+        field: str,
+        indexes: Optional[List[IndexModel]] = None,
+        ttl: float = 60,
+        miss_ttl: float = 5,
+    ):
+        self.model = model
+        self.field = field
+        self.indexes = indexes or []
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._known: Optional[set] = None
+        self._listed_at: Optional[float] = None
+        self._ready = False
+        self._checked_at: Optional[float] = None
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.model.get_collection_name()}_"
+
+    def name(self, value: date) -> str:
+        return f"{self.prefix}{value:%Y%m}"
+
+    def collection(self, name: str):
+        return self.model.get_pymongo_collection().database[name]
+
+    async def names(self, newest: Optional[date] = None) -> List[str]:
+        """
+        Existing partitions, oldest first
+        Listed again after `ttl` seconds, or after `miss_ttl` when `newest`'s month is not
+        known yet - another worker may have created it, e.g. at a month rollover
+        """
+        now = time.monotonic()
+        age = None if self._listed_at is None else now - self._listed_at
+        missing = newest is not None and self._known is not None and self.name(newest) not in self._known
+        if age is None or age >= self.ttl or (missing and age >= self.miss_ttl):
+            pattern = re.compile(re.escape(self.prefix) + r"\d{6}$")
+            database = self.model.get_pymongo_collection().database
+            self._known = {name for name in await database.list_collection_names() if pattern.match(name)}
+            self._listed_at = now
+        return sorted(self._known)
+
+    async def ensure(self, name: str):
+        """The partition's collection, with its indexes on first use"""
+        known = set(await self.names())
+        collection = self.collection(name)
+        if name not in known:
+            if self.indexes:
+                await collection.create_indexes(self.indexes)
+            self._known.add(name)
+        return collection
+
+    def _markers(self):
+        return self.model.get_pymongo_collection().database[PARTITION_MARKERS]
+
+    async def ready(self) -> bool:
+        """
+        Whether a backfill has filled the partitions - until then reads stay on the main collection
+        Looked up again every `ttl` seconds while missing, logging an error each time
+        """
+        if self._ready:
+            return True
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.ttl:
+            return False
+        self._checked_at = now
+        collection_name = self.model.get_collection_name()
+        self._ready = await self._markers().find_one({"_id": collection_name}) is not None
+        if not self._ready:
+            logger.error(
+                f"{self.prefix}YYYYMM partitions are enabled but not backfilled - "
+                f"reads stay on {collection_name} until the backfill has run"
+            )
+        return self._ready
+
+    async def mark_ready(self):
+        """Record a finished backfill for every worker"""
+        await self._markers().update_one(
+            {"_id": self.model.get_collection_name()},
+            {"$set": {"completedAt": datetime.utcnow()}},
+            upsert=True,
+        )
+        self._ready = True
+
+    async def serves(self, query: dict) -> bool:
+        """Whether a read with `query` goes to the partitions - it bounds `field` and they are filled"""
+        return self.bounds(query) != (None, None) and await self.ready()
+
+    def newest(self, query: dict) -> date:
+        """The latest month a read with `query` can reach that exists today"""
+        _, high = self.bounds(query)
+        return high or date.today()
+
+    def bounds(self, query: dict) -> Tuple[Optional[date], Optional[date]]:
+        """Inclusive (low, high) dates the filter allows on `field`, from top-level and $and clauses"""
+        low = high = None
+        clauses = [query] + [clause for clause in query.get("$and", []) if isinstance(clause, dict)]
+        for clause in clauses:
+            if self.field not in clause:
+                continue
+            condition = clause[self.field]
+            if not isinstance(condition, dict):
+                condition = {"$gte": condition, "$lte": condition}
+            for operator, value in condition.items():
+                if not isinstance(value, date):
+                    continue
+                value = value.date() if isinstance(value, datetime) else value
+                if operator in ("$gte", "$gt") and (low is None or value > low):
+                    low = value
+                elif operator in ("$lte", "$lt") and (high is None or value < high):
+                    high = value
+        return low, high
+
+    def prune(self, names: List[str], query: dict) -> List[str]:
+        low, high = self.bounds(query)
+        low_name = self.name(low) if low else None
+        high_name = self.name(high) if high else None
+        return [
+            name for name in names
+            if (low_name is None or name >= low_name) and (high_name is None or name <= high_name)
+        ]
+
+    async def find(self, query: dict, sort: Optional[List[tuple]] = None, skip: int = 0, limit: int = 0) -> List[dict]:
+        """Raw documents from the matching months - each sorted and cut to skip + limit, then merged"""
+        async def one(name: str) -> List[dict]:
+            cursor = self.collection(name).find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(skip + limit)
+            return await cursor.to_list(None)
+
+        names = self.prune(await self.names(self.newest(query)), query)
+        parts = await asyncio.gather(*(one(name) for name in names))
+        rows = [row for part in parts for row in part]
+        # Stable sorts, last key first; None sorts low like MongoDB's null
+        for key, direction in reversed(sort or []):
+            rows.sort(key=lambda row: (row.get(key) is not None, row.get(key)), reverse=direction == -1)
+        return rows[skip:skip + limit] if limit else rows[skip:]
+
+    async def count(self, query: dict) -> int:
+        names = self.prune(await self.names(self.newest(query)), query)
+        counts = await asyncio.gather(*(self.collection(name).count_documents(query) for name in names))
+        return sum(counts)
+
+
 # Django-style QuerySet wrapper
 class QuerySet:
     """
@@ -98,6 +332,7 @@ class QuerySet:
         self._sort = []
         self._skip_count = 0
         self._limit_count = None
+        self._trusted = False
         self._chain = self.model.find_all()
     
     def filter(self, **kwargs) -> 'QuerySet':
@@ -109,8 +344,14 @@ class QuerySet:
             .filter(email__contains='@gmail.com')
         """
         query_filter = self._build_filter(kwargs)
-        self._query = query_filter
-        self._chain = self.model.find(query_filter)
+        # Chained filters narrow the query instead of replacing it
+        for field, condition in query_filter.items():
+            existing = self._query.get(field)
+            if isinstance(existing, dict) and isinstance(condition, dict):
+                existing.update(condition)
+            else:
+                self._query[field] = condition
+        self._chain = self.model.find(self._query)
         return self
     
     def get(self, **kwargs) -> Optional[T]:
@@ -153,6 +394,14 @@ class QuerySet:
         self._limit_count = count
         return self
     
+    def trusted(self) -> 'QuerySet':
+        """
+        Hydrate results without validation - read-only paths only
+        Example: await Transaction.objects.filter(is_deleted=False).trusted().to_list()
+        """
+        self._trusted = True
+        return self
+    
     def first(self) -> Optional[T]:
         """Get first document"""
         return self.model.find_one(self._query)
@@ -163,6 +412,9 @@ class QuerySet:
     
     async def count(self) -> int:
         """Count documents"""
+        partitions = await self._partitions()
+        if partitions is not None:
+            return await partitions.count(self._chain.get_filter_query())
         return await self.model.find(self._query).count()
     
     async def exists(self) -> bool:
@@ -172,6 +424,25 @@ class QuerySet:
     
     async def to_list(self, length: Optional[int] = None) -> List[T]:
         """Execute query and return list"""
+        partitions = await self._partitions()
+        if partitions is not None:
+            raws = await partitions.find(
+                self._chain.get_filter_query(),
+                sort=[(self._db_field(field), direction) for field, direction in self._sort] or None,
+                skip=self._skip_count,
+                limit=length or self._limit_count or 0,
+            )
+            build = self.model.from_db if self._trusted else self.model.model_validate
+            return [build(raw) for raw in raws]
+
+        if self._trusted:
+            return await self.model.find_trusted(
+                self._chain,
+                sort=self._sort or None,
+                skip=self._skip_count,
+                limit=length or self._limit_count or 0,
+            )
+        
         query = self._chain
         
         if self._sort:
@@ -195,13 +466,32 @@ class QuerySet:
         Update all matching documents
         Example: await User.objects.filter(age__lt=18).update(status='minor')
         """
-        update_data = {"$set": kwargs}
-        docs = await self.model.find(self._query).to_list()
-        count = 0
-        for doc in docs:
-            await doc.update(update_data)
-            count += 1
-        return count
+        update_data = {
+            "$set": Encoder(to_db=True).encode(
+                {self._db_field(key): value for key, value in kwargs.items()}
+            )
+        }
+        # One update_many round trip instead of a read plus one write per document
+        result = await self.model.get_pymongo_collection().update_many(
+            self._chain.get_filter_query(), update_data
+        )
+        return result.modified_count
+    
+    async def _partitions(self) -> Optional[MonthlyPartitions]:
+        """The model's monthly partitions when the filter bounds their date field and they are filled"""
+        partitions = getattr(self.model, "partitions", None)
+        if partitions is None or not await partitions.serves(self._chain.get_filter_query()):
+            return None
+        return partitions
+
+    def _db_field(self, field: str) -> str:
+        """Map a model field name to the key it is stored under (its alias)"""
+        if field == 'id':
+            return '_id'
+        model_field = self.model.model_fields.get(field)
+        if model_field is not None and model_field.alias:
+            return model_field.alias
+        return field
     
     def _build_filter(self, kwargs: dict) -> dict:
         """Build MongoDB query from Django-style filters"""
@@ -210,6 +500,7 @@ class QuerySet:
         for key, value in kwargs.items():
             if '__' in key:
                 field, operator = key.rsplit('__', 1)
+                field = self._db_field(field)
                 
                 # Django-style operators
                 operator_map = {
@@ -232,19 +523,25 @@ class QuerySet:
                     
                     # Handle regex patterns
                     if operator == 'contains':
-                        query[field] = {mongo_op: value}
+                        condition = {mongo_op: value}
                     elif operator == 'icontains':
-                        query[field] = {mongo_op: value, '$options': 'i'}
+                        condition = {mongo_op: value, '$options': 'i'}
                     elif operator == 'startswith':
-                        query[field] = {mongo_op: f'^{value}'}
+                        condition = {mongo_op: f'^{value}'}
                     elif operator == 'endswith':
-                        query[field] = {mongo_op: f'{value}$'}
+                        condition = {mongo_op: f'{value}$'}
                     elif operator == 'isnull':
-                        query[field] = {mongo_op: not value}
+                        condition = {mongo_op: not value}
+                    else:
+                        condition = {mongo_op: value}
+                    
+                    # transaction_date__gte + transaction_date__lte -> one range
+                    if isinstance(query.get(field), dict):
+                        query[field].update(condition)
                     else:
-                        query[field] = {mongo_op: value}
+                        query[field] = condition
             else:
-                query[key] = value
+                query[self._db_field(key)] = value
         
         return query
 
@@ -321,6 +618,10 @@ class BaseDocument(Document):
     
     # Use ClassVar to exclude from Pydantic validation
     objects: ClassVar[Manager] = None  # Will be set automatically
+    # Date-range reads through objects go here when set
+    partitions: ClassVar[Optional[MonthlyPartitions]] = None
+    # Index names replaced by newer definitions - dropped on connect, before init_beanie
+    legacy_indexes: ClassVar[List[str]] = []
     
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -335,10 +636,10 @@ class BaseDocument(Document):
         try:
             if self.id:
                 # Update existing
-                await self.replace()
+                await self.replace(**kwargs)
             else:
                 # Create new
-                await self.insert()
+                await self.insert(**kwargs)
             return self
         except Exception as e:
             logger.error(f"Error saving document: {e}")
@@ -395,6 +696,51 @@ class BaseDocument(Document):
         """Get document by ID"""
         return await cls.get(id)
     
+    @classmethod
+    def from_db(cls: Type[T], raw: dict) -> T:
+        """
+        Build a document from a raw MongoDB document without validation
+        Only for data we wrote ourselves - writes still go through validation
+        """
+        return Hydrator.hydrate(cls, raw)
+    
+    @classmethod
+    async def find_trusted(
+        cls: Type[T],
+        *args,
+        sort: Optional[List[tuple]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        hint: Optional[Any] = None,
+    ) -> List[T]:
+        """
+        Trusted read path - same filters as find(), results built via from_db()
+        Example: await Transaction.find_trusted(Transaction.is_deleted == False, limit=50)
+        """
+        if len(args) == 1 and isinstance(args[0], FindMany):
+            filter_query = args[0].get_filter_query()
+        else:
+            filter_query = cls.find(*args).get_filter_query()
+        
+        cursor = cls.get_pymongo_collection().find(filter_query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        if hint:
+            cursor = cursor.hint(hint)
+        return [cls.from_db(raw) async for raw in cursor]
+    
+    @classmethod
+    async def find_one_trusted(cls: Type[T], *args) -> Optional[T]:
+        """Trusted single-document read"""
+        raw = await cls.get_pymongo_collection().find_one(
+            cls.find(*args).get_filter_query()
+        )
+        return cls.from_db(raw) if raw else None
+    
     def to_dict(self) -> dict:
         """Convert to dictionary"""
         return self.dict()
@@ -0,0 +1,495 @@
+import argparse
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import bson
+import numpy as np
+import orjson
+from bson import ObjectId
+from pymongo import DeleteOne
+from pymongo.errors import BulkWriteError
+
+from ..core.config import ARCHIVE_AFTER_YEARS, ARCHIVE_DIR, ARCHIVE_DIR_SHARED
+from ..core.utils import utils
+from .models import Transaction, TransactionType, TransferLeg
+from .partitions import discard_raw, store_raw
+from .recurring import acquire_lease, release_lease, worker_id
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TXARCH01"
+ALIGN = 64
+DELETE_BATCH_SIZE = 1000
+SHADOW_BATCH_SIZE = 10_000
+LEASE_NAME = "transaction-archive"
+
+# Fixed-width per-row arrays, in file order; codes index the string tables in the footer
+ROW_DTYPES = {
+    "ids": "S12",          # ObjectId bytes, sorted
+    "day": "<i4",          # days since 1970-01-01
+    "amount": "<f8",
+    "type": "i1",          # -> types
+    "category": "<i2",     # -> categories
+    "payment": "i1",       # -> payments
+    "counted": "?",        # live rows the analytics count (not the IN leg of a transfer)
+    "tag_count": "<i2",
+    "doc_end": "<i8",      # end offset of the row's BSON document in the documents blob
+}
+TAG_DTYPE = "<i4"          # -> tags
+
+# Settlements and debt aging read debts from the hot collection; templates drive the scheduler
+KEEP_HOT_TYPES = [
+    TransactionType.DEBT_GIVEN.value,
+    TransactionType.DEBT_RECEIVED.value,
+    TransactionType.DEBT_REPAYMENT.value,
+    TransactionType.DEBT_COLLECTION.value,
+]
+
+
+def _transfer_group(doc: Dict[str, Any]) -> Optional[str]:
+    """Same grouping as services.transfer_group, on a raw document"""
+    leg = doc.get(Transaction.transfer_leg)
+    if leg is None:
+        return None
+    if leg == TransferLeg.OUT.value:
+        return doc.get(Transaction.transaction_id)
+    return doc.get(Transaction.linked_transaction_id)
+
+
+# ==================== SEGMENT FILES ====================
+
+class Segment:
+    """
+    One user-year of archived transactions, mapped read-only
+    Layout: MAGIC | 64-byte aligned arrays | BSON documents | JSON footer | footer length | MAGIC.
+    The arrays are views into the mapping, so opening a segment reads only the footer
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"Not an archive segment: {path}")
+        footer_end = len(self._map) - len(MAGIC) - 8
+        footer_size = int(np.frombuffer(self._map, "<u8", 1, footer_end)[0])
+        footer = orjson.loads(self._map[footer_end - footer_size:footer_end])
+
+        self.rows: int = footer["rows"]
+        self.strings: Dict[str, List[str]] = footer["strings"]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.frombuffer(self._map, dtype, count, offset)
+            for name, (dtype, count, offset) in footer["arrays"].items()
+        }
+        self._documents_at: int = footer["documents"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def rows_of(self, ids: Iterable[ObjectId]) -> np.ndarray:
+        """Rows holding these ids, by binary search over the sorted id column"""
+        wanted = np.array(sorted({oid.binary for oid in ids}), dtype="S12")
+        if not len(wanted) or not self.rows:
+            return np.empty(0, dtype=np.int64)
+        rows = np.searchsorted(self.ids, wanted)
+        rows = rows[rows < self.rows]
+        return rows[np.isin(self.ids[rows], wanted)]
+
+    def documents(self, rows: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Decoded documents of `rows` (all rows by default)"""
+        ends = self.doc_end
+        rows = range(self.rows) if rows is None else rows
+        base = self._documents_at
+        return [
+            bson.decode(self._map[base + (int(ends[row - 1]) if row else 0):base + int(ends[row])])
+            for row in rows
+        ]
+
+    @staticmethod
+    def write(path: Path, docs: List[Dict[str, Any]]):
+        """Write `docs` as a segment, atomically replacing any file at `path`"""
+        docs = sorted(docs, key=lambda doc: doc["_id"].binary)
+        strings: Dict[str, Dict[str, int]] = {"types": {}, "payments": {}, "categories": {}, "tags": {}}
+
+        def code(table: str, value: Optional[str]) -> int:
+            return strings[table].setdefault(value or "", len(strings[table]))
+
+        blobs = [bson.encode(doc) for doc in docs]
+        tags = [[code("tags", tag) for tag in doc.get(Transaction.tags) or []] for doc in docs]
+        arrays = {
+            "ids": np.array([doc["_id"].binary for doc in docs], dtype=ROW_DTYPES["ids"]),
+            "day": np.array(
+                [doc[Transaction.transaction_date] for doc in docs], dtype="datetime64[D]"
+            ).astype(ROW_DTYPES["day"]),
+            "amount": np.array([doc["amount"] for doc in docs], dtype=ROW_DTYPES["amount"]),
+            "type": np.array([code("types", doc[Transaction.transaction_type]) for doc in docs], dtype=ROW_DTYPES["type"]),
+            "category": np.array([code("categories", doc.get(Transaction.categoryId)) for doc in docs], dtype=ROW_DTYPES["category"]),
+            "payment": np.array([code("payments", doc[Transaction.payment_method]) for doc in docs], dtype=ROW_DTYPES["payment"]),
+            "counted": np.array(
+                [doc.get(Transaction.transfer_leg) != TransferLeg.IN.value for doc in docs], dtype=ROW_DTYPES["counted"]
+            ),
+            "tag_count": np.array([len(row_tags) for row_tags in tags], dtype=ROW_DTYPES["tag_count"]),
+            "doc_end": np.cumsum([len(blob) for blob in blobs], dtype=np.int64).astype(ROW_DTYPES["doc_end"]),
+            "tag_codes": np.array([tag for row_tags in tags for tag in row_tags], dtype=TAG_DTYPE),
+        }
+
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            file.write(MAGIC)
+            layout = {}
+            for name, array in arrays.items():
+                file.write(b"\0" * (-file.tell() % ALIGN))
+                layout[name] = (array.dtype.str, len(array), file.tell())
+                file.write(array.tobytes())
+            documents_at = file.tell()
+            for blob in blobs:
+                file.write(blob)
+            footer = orjson.dumps({
+                "rows": len(docs),
+                "arrays": layout,
+                "documents": documents_at,
+                "strings": {table: list(values) for table, values in strings.items()},
+            })
+            file.write(footer)
+            file.write(np.array([len(footer)], dtype="<u8").tobytes())
+            file.write(MAGIC)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+
+class ArchiveStore:
+    """
+    Segment files under `root`: <user>/<year>.seg
+    Open segments are cached until their file changes; rewrites take a per-user file lock,
+    so the archive job and restores from any worker on the host never interleave.
+    `shared` declares that every API host reads this same `root`
+    """
+
+    def __init__(self, root: str, shared: bool = False):
+        self.root = Path(root)
+        self.shared = shared
+        self._open: Dict[Path, Tuple[int, Segment]] = {}
+
+    def user_dir(self, user: str) -> Path:
+        return self.root / quote(user, safe="")
+
+    def path(self, user: str, year: int) -> Path:
+        return self.user_dir(user) / f"{year}.seg"
+
+    def _segment(self, path: Path) -> Optional[Segment]:
+        try:
+            modified = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._open.pop(path, None)
+            return None
+        entry = self._open.get(path)
+        if entry is None or entry[0] != modified:
+            entry = self._open[path] = (modified, Segment(path))
+        return entry[1]
+
+    def segments(self, user: str) -> List[Tuple[int, Segment]]:
+        """(year, segment) for every archived year of the user, oldest first"""
+        directory = self.user_dir(user)
+        if not directory.is_dir():
+            return []
+        found = []
+        for path in sorted(directory.glob("*.seg")):
+            segment = self._segment(path)
+            if segment is not None and len(segment):
+                found.append((int(path.stem), segment))
+        return found
+
+    @contextmanager
+    def locked(self, user: str):
+        directory = self.user_dir(user)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def rewrite(self, user: str, year: int, add: Iterable[Dict[str, Any]] = (), remove: Iterable[ObjectId] = ()):
+        """Merge `add` into the user-year (newer copies win) and drop `remove`; call under locked()"""
+        path = self.path(user, year)
+        segment = self._segment(path)
+        docs = {doc["_id"]: doc for doc in (segment.documents() if segment is not None else [])}
+        docs.update((doc["_id"], doc) for doc in add)
+        for oid in remove:
+            docs.pop(oid, None)
+        if docs:
+            Segment.write(path, list(docs.values()))
+        elif segment is not None:
+            path.unlink()
+        self._open.pop(path, None)
+
+    def users(self) -> List[str]:
+        """Every user with an archive directory"""
+        if not self.root.is_dir():
+            return []
+        return [unquote(path.name) for path in sorted(self.root.iterdir()) if path.is_dir()]
+
+    def nbytes(self, user: Optional[str] = None) -> int:
+        root = self.user_dir(user) if user else self.root
+        return sum(path.stat().st_size for path in root.rglob("*.seg")) if root.is_dir() else 0
+
+
+archive_store = ArchiveStore(ARCHIVE_DIR, shared=ARCHIVE_DIR_SHARED)
+
+
+# ==================== ARCHIVE / RESTORE ====================
+
+def archive_query(cutoff: date) -> Dict[str, Any]:
+    """Hot rows that move to the archive: owned, live, dated before `cutoff`, not debts or templates"""
+    return {
+        Transaction.created_by: {"$type": "string"},
+        Transaction.transaction_date: {"$lt": utils.as_datetime(cutoff)},
+        Transaction.is_deleted: False,
+        Transaction.is_recurring: False,
+        Transaction.transaction_type: {"$nin": KEEP_HOT_TYPES},
+    }
+
+
+async def _move(user: str, year: int, docs: List[Dict[str, Any]]) -> int:
+    """File one user-year, then delete the rows that did not change in the meantime"""
+    with archive_store.locked(user):
+        archive_store.rewrite(user, year, add=docs)
+    # A row edited since it was read stays hot; its archived copy is shadowed until the next run
+    operations = [
+        DeleteOne({"_id": doc["_id"], Transaction.updated_at: doc.get(Transaction.updated_at)})
+        for doc in docs
+    ]
+    collection = Transaction.get_pymongo_collection()
+    deleted = 0
+    for start in range(0, len(operations), DELETE_BATCH_SIZE):
+        result = await collection.bulk_write(operations[start:start + DELETE_BATCH_SIZE], ordered=False)
+        deleted += result.deleted_count
+    if Transaction.partitions is not None:
+        kept = set(await collection.distinct("_id", {"_id": {"$in": [doc["_id"] for doc in docs]}}))
+        await discard_raw(doc for doc in docs if doc["_id"] not in kept)
+    return deleted
+
+
+async def archive_older_than(years: int = ARCHIVE_AFTER_YEARS, today: Optional[date] = None) -> Dict[str, int]:
+    """
+    Move calendar years that ended more than `years` ago out of the hot collection
+    Streams one user-year at a time in (created_by, transaction_date) index order.
+    Refused unless the archive directory is declared shared - the lease is cluster-wide,
+    and rows archived to one host's disk would vanish for every other host
+    """
+    if not archive_store.shared:
+        raise RuntimeError(
+            "ARCHIVE_DIR is not declared shared by every API host - set ARCHIVE_DIR_SHARED=true "
+            "once it is (a single host, or a shared volume)"
+        )
+    today = today or date.today()
+    cutoff = date(today.year - years, 1, 1)
+    cursor = Transaction.get_pymongo_collection().find(
+        archive_query(cutoff),
+        sort=[(Transaction.created_by, 1), (Transaction.transaction_date, -1)],
+        batch_size=5000,
+    )
+    stats = {"archived": 0, "segments": 0}
+    key, docs = None, []
+    async for doc in cursor:
+        doc_key = (doc[Transaction.created_by], doc[Transaction.transaction_date].year)
+        if doc_key != key and docs:
+            stats["archived"] += await _move(*key, docs)
+            stats["segments"] += 1
+            docs = []
+        key = doc_key
+        docs.append(doc)
+    if docs:
+        stats["archived"] += await _move(*key, docs)
+        stats["segments"] += 1
+    return stats
+
+
+async def restore_transactions(user: str, ids: List[str]) -> List[str]:
+    """
+    Move archived transactions of `user` back to the hot collection, with the other legs
+    of any transfer among them; returns the restored ids. Aggregates are unchanged -
+    archived rows were counted all along
+    """
+    wanted = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    restored: List[str] = []
+    if not wanted:
+        return restored
+    collection = Transaction.get_pymongo_collection()
+    with archive_store.locked(user):
+        for year, segment in archive_store.segments(user):
+            rows = set(segment.rows_of(wanted).tolist())
+            if not rows:
+                continue
+            docs = segment.documents()
+            groups = {_transfer_group(docs[row]) for row in rows} - {None}
+            moving = [doc for row, doc in enumerate(docs) if row in rows or _transfer_group(doc) in groups]
+            try:
+                await collection.insert_many(moving, ordered=False)
+            except BulkWriteError as e:
+                # Already hot - a run that stopped between filing and deleting
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+            await store_raw(moving)
+            archive_store.rewrite(user, year, remove=[doc["_id"] for doc in moving])
+            restored += [str(doc["_id"]) for doc in moving]
+    return restored
+
+
+async def find_archived(
+    user: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> Tuple[List[Transaction], int]:
+    """The user's archived transactions in [start, end], newest first, and their count"""
+    low = np.datetime64(start, "D").astype(np.int64) if start else None
+    high = np.datetime64(end, "D").astype(np.int64) if end else None
+    matches = []
+    for _, segment in reversed(archive_store.segments(user)):
+        mask = np.ones(len(segment), dtype=bool)
+        if low is not None:
+            mask &= segment.day >= low
+        if high is not None:
+            mask &= segment.day <= high
+        rows = np.flatnonzero(mask)
+        # Newest first: by day, then by _id (creation order) within a day
+        order = np.lexsort((segment.ids[rows], segment.day[rows]))[::-1]
+        matches.extend((segment, int(row)) for row in rows[order])
+    page = matches[skip:skip + limit]
+    transactions = [Transaction.from_db(segment.documents([row])[0]) for segment, row in page]
+    return transactions, len(matches)
+
+
+# ==================== HISTORY READS ====================
+# Rebuilds and reconciliation recompute aggregates from history - hot rows plus these
+
+# Footer string table of each coded column
+CODED_COLUMNS = {"type": "types", "category": "categories", "payment": "payments"}
+
+
+async def unshadowed_rows(segment: Segment) -> np.ndarray:
+    """Rows of `segment` with no copy in the hot collection - a hot copy is the current one"""
+    raw = segment.ids.tobytes()
+    ids = [ObjectId(raw[i:i + 12]) for i in range(0, len(raw), 12)]
+    hot = []
+    collection = Transaction.get_pymongo_collection()
+    for start in range(0, len(ids), SHADOW_BATCH_SIZE):
+        cursor = collection.find({"_id": {"$in": ids[start:start + SHADOW_BATCH_SIZE]}}, {"_id": 1})
+        hot += [doc["_id"].binary async for doc in cursor]
+    if not hot:
+        return np.arange(len(segment))
+    return np.flatnonzero(~np.isin(segment.ids, np.array(hot, dtype="S12")))
+
+
+async def archived_segments(
+    first_year: Optional[int] = None, last_year: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Segment, np.ndarray]]:
+    """(user, segment, unshadowed rows) for every archived user-year in [first_year, last_year]"""
+    for user in archive_store.users():
+        for year, segment in archive_store.segments(user):
+            if (first_year is None or year >= first_year) and (last_year is None or year <= last_year):
+                yield user, segment, await unshadowed_rows(segment)
+
+
+def _decode(segment: Segment, column: str, value: int) -> Any:
+    if column == "day":
+        return date(1970, 1, 1) + timedelta(days=value)
+    if column == "month":
+        return f"{1970 + value // 12:04d}-{value % 12 + 1:02d}"
+    return segment.strings[CODED_COLUMNS[column]][value]
+
+
+def grouped_totals(
+    segment: Segment, rows: np.ndarray, by: Tuple[str, ...]
+) -> List[Tuple[tuple, float, int, float, float]]:
+    """
+    (key, sum, count, min, max) of `amount` over `rows`, grouped by segment columns
+    `by` names day, month, type, category or payment; keys come back as dates / "YYYY-MM" / strings
+    """
+    if not len(rows):
+        return []
+    keys = []
+    for column in by:
+        if column == "month":
+            keys.append(segment.day[rows].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64))
+        else:
+            keys.append(segment.columns[column][rows].astype(np.int64))
+    unique, inverse = np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    amounts = segment.amount[rows]
+    totals = np.bincount(inverse, weights=amounts, minlength=len(unique))
+    counts = np.bincount(inverse, minlength=len(unique))
+    low = np.full(len(unique), np.inf)
+    high = np.full(len(unique), -np.inf)
+    np.minimum.at(low, inverse, amounts)
+    np.maximum.at(high, inverse, amounts)
+    return [
+        (
+            tuple(_decode(segment, column, value) for column, value in zip(by, key)),
+            float(totals[group]), int(counts[group]), float(low[group]), float(high[group]),
+        )
+        for group, key in enumerate(unique.tolist())
+    ]
+
+
+# ==================== BACKGROUND JOB ====================
+
+async def archive_periodically(interval_seconds: int):
+    """Background loop started with the app - only the lease holder archives"""
+    if not archive_store.shared:
+        logger.error("Transaction archive not started: set ARCHIVE_DIR_SHARED once every API host reads ARCHIVE_DIR")
+        return
+    owner = worker_id()
+    ttl = max(interval_seconds * 2, 60)
+    try:
+        while True:
+            try:
+                if await acquire_lease(LEASE_NAME, owner, ttl):
+                    stats = await archive_older_than()
+                    if stats["archived"]:
+                        logger.info(f"Transaction archive: {stats}")
+            except Exception as e:
+                logger.error(f"Transaction archive run failed: {e}")
+            await asyncio.sleep(interval_seconds)
+    finally:
+        try:
+            await release_lease(LEASE_NAME, owner)
+        except Exception:
+            pass
+
+
+async def _main(years: int):
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        stats = await archive_older_than(years)
+        print(f"Archived {stats['archived']} transactions into {stats['segments']} segments")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.archive
+    parser = argparse.ArgumentParser(description="Move old transactions to the cold archive")
+    parser.add_argument("--years", type=int, default=ARCHIVE_AFTER_YEARS, help="keep this many years hot")
+    args = parser.parse_args()
+    asyncio.run(_main(args.years))
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from ..core.utils import utils
+from .archive import archived_segments, grouped_totals
+from .models import Budget, Transaction, TransactionType
+from .signals import (
+    BudgetAlert,
+    TransactionChange,
+    budget_threshold_crossed,
+    transaction_changed,
+)
+
+logger = logging.getLogger(__name__)
+
+BUDGET_THRESHOLDS = (0.5, 0.8, 1.0)
+# Counter drift below this is rounding noise
+SPENT_TOLERANCE = 0.01
+
+
+# ==================== INDEX ====================
+
+BudgetKey = Tuple[Optional[str], str]
+
+
+class BudgetIndex:
+    """
+    Active budgets by (owner, categoryId), each list sorted by start date
+    Reloaded after `ttl` seconds so budgets written elsewhere are picked up
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._starts: Dict[BudgetKey, List[date]] = {}
+        self._budgets: Dict[BudgetKey, List[Budget]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Force a reload on next use - call after creating / editing budgets"""
+        self._loaded_at = None
+
+    async def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            budgets = await Budget.find_trusted({Budget.is_active: True})
+            by_key: Dict[BudgetKey, List[Budget]] = defaultdict(list)
+            for budget in budgets:
+                by_key[(budget.created_by, budget.categoryId)].append(budget)
+            self._budgets = {}
+            self._starts = {}
+            for key, items in by_key.items():
+                items.sort(key=lambda b: b.start_date)
+                self._budgets[key] = items
+                self._starts[key] = [b.start_date for b in items]
+            self._loaded_at = time.monotonic()
+
+    def matching(self, created_by: Optional[str], category_id: str, on: date) -> List[Budget]:
+        """Active budgets of `created_by` for `category_id` whose period contains `on`"""
+        key = (created_by, category_id)
+        starts = self._starts.get(key)
+        if not starts:
+            return []
+        candidates = self._budgets[key][:bisect_right(starts, on)]
+        return [budget for budget in candidates if budget.end_date >= on]
+
+
+budget_index = BudgetIndex()
+
+
+# ==================== INCREMENTAL UPDATES ====================
+
+def _counts(transaction: Optional[Transaction]) -> bool:
+    return (
+        transaction is not None
+        and not transaction.is_deleted
+        and transaction.transaction_type == TransactionType.EXPENSE
+    )
+
+
+def crossed_thresholds(before: float, after: float, amount: float) -> List[float]:
+    """Thresholds passed going from `before` to `after` spent (upwards only)"""
+    if amount <= 0 or after <= before:
+        return []
+    return [t for t in BUDGET_THRESHOLDS if before < t * amount <= after]
+
+
+@transaction_changed.connect
+async def track_budget_spending(
+    changes: List[TransactionChange], session=None, after_commit: Optional[list] = None, **kwargs
+):
+    """
+    $inc `spent` on every active budget of the owner the written expenses fall into
+    Threshold alerts are queued on `after_commit`, so they go out once, after the write committed
+    """
+    await budget_index.ensure_loaded()
+
+    deltas: Dict[Any, float] = defaultdict(float)
+    for before, after in changes:
+        for transaction, sign in ((before, -1), (after, 1)):
+            if not _counts(transaction):
+                continue
+            for budget in budget_index.matching(
+                transaction.created_by, transaction.categoryId, transaction.transaction_date
+            ):
+                deltas[budget.id] += sign * transaction.amount
+
+    collection = Budget.get_pymongo_collection()
+    now = datetime.utcnow()
+    alerts: List[BudgetAlert] = []
+    for budget_id, delta in deltas.items():
+        delta = round(delta, 2)
+        if not delta:
+            continue
+        updated = await collection.find_one_and_update(
+            {"_id": budget_id},
+            {"$inc": {Budget.spent: delta}, "$set": {Budget.updated_at: now}},
+            projection={Budget.name: 1, Budget.amount: 1, Budget.spent: 1},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if not updated:
+            continue
+        spent = updated[Budget.spent]
+        for threshold in crossed_thresholds(spent - delta, spent, updated[Budget.amount]):
+            alerts.append(BudgetAlert(budget_id, updated[Budget.name], threshold, spent, updated[Budget.amount]))
+
+    if alerts and after_commit is not None:
+        after_commit.append((budget_threshold_crossed, {"alerts": alerts}))
+
+
+@budget_threshold_crossed.connect
+async def log_budget_alerts(alerts: List[BudgetAlert], **kwargs):
+    for alert in alerts:
+        logger.warning(
+            f"Budget '{alert.name}' passed {alert.threshold:.0%}: "
+            f"{alert.spent:.2f} of {alert.amount:.2f}"
+        )
+
+
+# ==================== RECONCILIATION ====================
+
+async def _daily_expenses(budgets: List[Budget]) -> Dict[BudgetKey, Tuple[List[date], List[float]]]:
+    """
+    Per (owner, category): sorted days and prefix sums of expenses, one aggregation for all budgets
+    Archived years the budgets reach into are added from their segments
+    """
+    keys = {(b.created_by, b.categoryId) for b in budgets}
+    first, last = min(b.start_date for b in budgets), max(b.end_date for b in budgets)
+    pipeline = [
+        {"$match": {
+            Transaction.is_deleted: False,
+            Transaction.transaction_type: TransactionType.EXPENSE.value,
+            Transaction.created_by: {"$in": list({owner for owner, _ in keys})},
+            Transaction.categoryId: {"$in": list({category_id for _, category_id in keys})},
+            Transaction.transaction_date: {
+                "$gte": utils.as_datetime(first),
+                "$lte": utils.as_datetime(last),
+            },
+        }},
+        {"$group": {
+            "_id": {
+                "owner": f"${Transaction.created_by}",
+                "category": f"${Transaction.categoryId}",
+                "day": f"${Transaction.transaction_date}",
+            },
+            "total": {"$sum": "$amount"},
+        }},
+    ]
+    days: Dict[BudgetKey, Dict[date, float]] = defaultdict(lambda: defaultdict(float))
+    async for row in Transaction.aggregate(pipeline):
+        day = row["_id"]["day"]
+        key = (row["_id"].get("owner"), row["_id"]["category"])
+        days[key][day.date() if isinstance(day, datetime) else day] += row["total"]
+
+    async for user, segment, rows in archived_segments(first.year, last.year):
+        for (category_id, kind, day), total, _, _, _ in grouped_totals(segment, rows, ("category", "type", "day")):
+            if kind == TransactionType.EXPENSE.value and (user, category_id) in keys and first <= day <= last:
+                days[(user, category_id)][day] += total
+
+    series = {}
+    for key, totals in days.items():
+        ordered = sorted(totals)
+        prefix = [0.0]
+        for day in ordered:
+            prefix.append(prefix[-1] + totals[day])
+        series[key] = (ordered, prefix)
+    return series
+
+
+async def reconcile_budgets() -> List[Dict[str, Any]]:
+    """
+    Compare every active budget's `spent` with its owner's expenses and correct drift
+    Corrections are compare-and-set, so a concurrent $inc is never overwritten
+    """
+    budgets = await Budget.find_trusted({Budget.is_active: True})
+    if not budgets:
+        return []
+    series = await _daily_expenses(budgets)
+
+    drift, operations = [], []
+    for budget in budgets:
+        days, prefix = series.get((budget.created_by, budget.categoryId), ([], [0.0]))
+        actual = round(
+            prefix[bisect_right(days, budget.end_date)] - prefix[bisect_left(days, budget.start_date)], 2
+        )
+        if abs(actual - budget.spent) > SPENT_TOLERANCE:
+            drift.append({"budgetId": str(budget.id), "name": budget.name, "spent": budget.spent, "actual": actual})
+            operations.append(UpdateOne(
+                {"_id": budget.id, Budget.spent: budget.spent},
+                {"$set": {Budget.spent: actual, Budget.updated_at: datetime.utcnow()}},
+            ))
+    if operations:
+        await Budget.get_pymongo_collection().bulk_write(operations, ordered=False)
+    return drift
+
+
+async def reconcile_periodically(interval_seconds: int):
+    """Background loop started with the app"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drift = await reconcile_budgets()
+            if drift:
+                logger.warning(f"Corrected spent on {len(drift)} budgets: {drift}")
+        except Exception as e:
+            logger.error(f"Budget reconciliation failed: {e}")
+
+
+async def _main():
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        drift = await reconcile_budgets()
+        print(f"Corrected {len(drift)} budgets")
+        for row in drift:
+            print(f"  {row['name']}: {row['spent']} -> {row['actual']}")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.budgets
+    argparse.ArgumentParser(description="Reconcile Budget.spent against transactions").parse_args()
+    asyncio.run(_main())
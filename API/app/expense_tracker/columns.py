@@ -0,0 +1,312 @@
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..core.cache import UserCache
+from ..core.config import ANALYTICS_CACHE_MB
+from .archive import Segment, archive_store
+from .models import PaymentMethod, Transaction, TransactionType, TransferLeg
+from .signals import TransactionChange, transaction_committed
+
+EPOCH = date(1970, 1, 1)
+TRANSACTION_TYPES = list(TransactionType)
+TYPE_CODES = {kind.value: code for code, kind in enumerate(TRANSACTION_TYPES)}
+PAYMENT_METHODS = list(PaymentMethod)
+PAYMENT_CODES = {method.value: code for code, method in enumerate(PAYMENT_METHODS)}
+MIN_CAPACITY = 1024
+# Python-side cost per live row on top of the arrays: id string, row_of entry
+ROW_OVERHEAD = 180
+
+# Per-row arrays, in ColumnView order
+ROW_COLUMNS = ("ids", "day", "amount", "type", "category", "payment", "tag_start", "tag_count")
+
+
+def day_number(value: date) -> int:
+    """Days since 1970-01-01"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def _counted(transaction: Optional[Transaction]) -> bool:
+    # Same rows the rollups count: live, and not the IN leg of a transfer
+    return (
+        transaction is not None
+        and not transaction.is_deleted
+        and transaction.transfer_leg != TransferLeg.IN
+    )
+
+
+class ColumnView(NamedTuple):
+    """Live rows only, as parallel arrays"""
+    ids: np.ndarray        # object - transaction _id strings
+    day: np.ndarray        # int32 - day_number()
+    amount: np.ndarray     # float64
+    type: np.ndarray       # int8 - index into TRANSACTION_TYPES
+    category: np.ndarray   # int16 - index into UserColumns.category_ids
+    payment: np.ndarray    # int8 - index into PAYMENT_METHODS
+    tag_start: np.ndarray  # int64 - first position in UserColumns.tag_codes
+    tag_count: np.ndarray  # int16
+
+
+def tag_positions(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Positions in tag_codes of every tag of the given rows, row by row"""
+    counts = counts.astype(np.int64)
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+class UserColumns:
+    """
+    One user's counted transactions as growable arrays
+    Categories, payment methods and tags are dictionary-encoded; a row's tags are
+    tag_codes[tag_start:tag_start + tag_count]. A write kills the row it replaces and
+    appends the new version, so patching is O(1) amortized; dead rows are dropped
+    when the arrays would otherwise grow. `version` moves on every patch and keys
+    everything derived
+    """
+
+    def __init__(self, capacity: int = MIN_CAPACITY):
+        self.size = 0
+        self.dead = 0
+        self.version = 0
+        self.ids = np.empty(capacity, dtype=object)
+        self.day = np.empty(capacity, dtype=np.int32)
+        self.amount = np.empty(capacity, dtype=np.float64)
+        self.type = np.empty(capacity, dtype=np.int8)
+        self.category = np.empty(capacity, dtype=np.int16)
+        self.payment = np.empty(capacity, dtype=np.int8)
+        self.tag_start = np.empty(capacity, dtype=np.int64)
+        self.tag_count = np.empty(capacity, dtype=np.int16)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.tag_codes = np.empty(capacity, dtype=np.int32)
+        self.tag_size = 0
+        self.row_of: Dict[str, int] = {}
+        self.category_ids: List[str] = []
+        self.tag_names: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._tag_codes: Dict[str, int] = {}
+        self._derived: Dict[str, Any] = {}
+
+    @property
+    def nbytes(self) -> int:
+        arrays = sum(getattr(self, name).nbytes for name in ROW_COLUMNS) + self.live.nbytes + self.tag_codes.nbytes
+        return arrays + len(self.row_of) * ROW_OVERHEAD
+
+    # -------- encoding --------
+
+    def category_code(self, category_id: Optional[str]) -> int:
+        category_id = category_id or ""
+        code = self._category_codes.get(category_id)
+        if code is None:
+            code = self._category_codes[category_id] = len(self.category_ids)
+            self.category_ids.append(category_id)
+        return code
+
+    def tag_code(self, tag: str) -> int:
+        code = self._tag_codes.get(tag)
+        if code is None:
+            code = self._tag_codes[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        return code
+
+    def code_of(self, category_id: Optional[str]) -> Optional[int]:
+        return self._category_codes.get(category_id or "")
+
+    def tag_code_of(self, tag: str) -> Optional[int]:
+        return self._tag_codes.get(tag)
+
+    # -------- writes --------
+
+    def _compact(self):
+        """Drop dead rows and their tags in place"""
+        keep = np.flatnonzero(self.live[:self.size])
+        counts = self.tag_count[keep]
+        tags = self.tag_codes[tag_positions(self.tag_start[keep], counts)]
+        for name in ROW_COLUMNS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+        self.tag_start[:len(keep)] = np.cumsum(counts, dtype=np.int64) - counts
+        self.tag_codes[:len(tags)] = tags
+        self.tag_size = len(tags)
+        self.live[:len(keep)] = True
+        self.live[len(keep):] = False
+        self.size, self.dead = len(keep), 0
+        self.row_of = dict(zip(self.ids[:self.size].tolist(), range(self.size)))
+
+    @staticmethod
+    def _grown(array: np.ndarray, used: int, needed: int) -> np.ndarray:
+        capacity = max(len(array), MIN_CAPACITY)
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=array.dtype) if array.dtype == bool else np.empty(capacity, dtype=array.dtype)
+        grown[:used] = array[:used]
+        return grown
+
+    def _reserve(self, rows: int, tags: int):
+        if self.size + rows > len(self.day) and self.dead * 2 >= self.size:
+            self._compact()
+        if self.size + rows > len(self.day):
+            for name in (*ROW_COLUMNS, "live"):
+                setattr(self, name, self._grown(getattr(self, name), self.size, self.size + rows))
+        if self.tag_size + tags > len(self.tag_codes):
+            self.tag_codes = self._grown(self.tag_codes, self.tag_size, self.tag_size + tags)
+
+    def extend(
+        self,
+        ids: List[str],
+        days: List[int],
+        amounts: List[float],
+        types: List[int],
+        categories: List[int],
+        payments: List[int],
+        tags: List[List[int]],
+    ):
+        """Append many rows at once - the initial load"""
+        tag_counts = np.fromiter((len(row_tags) for row_tags in tags), dtype=np.int16, count=len(ids))
+        flat_tags = [code for row_tags in tags for code in row_tags]
+        self.extend_arrays(ids, days, amounts, types, categories, payments, tag_counts, flat_tags)
+
+    def extend_arrays(self, ids, days, amounts, types, categories, payments, tag_counts, tag_codes):
+        """extend() with the tags as per-row counts plus one flat sequence of codes"""
+        count, tag_total = len(ids), len(tag_codes)
+        self._reserve(count, tag_total)
+
+        rows = slice(self.size, self.size + count)
+        self.ids[rows] = ids
+        self.day[rows] = days
+        self.amount[rows] = amounts
+        self.type[rows] = types
+        self.category[rows] = categories
+        self.payment[rows] = payments
+        self.tag_count[rows] = tag_counts
+        self.tag_start[rows] = self.tag_size + np.cumsum(tag_counts, dtype=np.int64) - tag_counts
+        self.tag_codes[self.tag_size:self.tag_size + tag_total] = tag_codes
+        self.live[rows] = True
+        self.row_of.update(zip(ids, range(self.size, self.size + count)))
+        self.size += count
+        self.tag_size += tag_total
+        self.version += 1
+
+    def encode(self, transaction: Transaction) -> tuple:
+        """One row's values in extend() argument order"""
+        return (
+            str(transaction.id),
+            day_number(transaction.transaction_date),
+            transaction.amount,
+            TYPE_CODES[transaction.transaction_type.value],
+            self.category_code(transaction.categoryId),
+            PAYMENT_CODES[transaction.payment_method.value],
+            [self.tag_code(tag) for tag in transaction.tags],
+        )
+
+    def append(self, transaction: Transaction):
+        self.kill(str(transaction.id))
+        self.extend(*([value] for value in self.encode(transaction)))
+
+    def kill(self, transaction_id: str):
+        row = self.row_of.pop(transaction_id, None)
+        if row is not None:
+            self.live[row] = False
+            self.dead += 1
+            self.version += 1
+
+    # -------- reads --------
+
+    def view(self) -> ColumnView:
+        """Live rows, compacted once per version"""
+        def build():
+            live = self.live[:self.size]
+            return ColumnView(*(getattr(self, name)[:self.size][live] for name in ROW_COLUMNS))
+        return self.derived("view", build)
+
+    def derived(self, key: str, build: Callable[[], Any]) -> Any:
+        """`build()` memoized until the next patch"""
+        entry = self._derived.get(key)
+        if entry is None or entry[0] != self.version:
+            entry = self._derived[key] = (self.version, build())
+        return entry[1]
+
+
+async def load_user_columns(user: str) -> UserColumns:
+    """Fill UserColumns from one projected cursor over the user's counted transactions"""
+    query = {
+        Transaction.created_by: user,
+        Transaction.is_deleted: False,
+        Transaction.transfer_leg: {"$ne": TransferLeg.IN.value},
+    }
+    projection = {
+        Transaction.transaction_date: 1,
+        "amount": 1,
+        Transaction.transaction_type: 1,
+        Transaction.categoryId: 1,
+        Transaction.payment_method: 1,
+        Transaction.tags: 1,
+    }
+    columns = UserColumns()
+    ids, days, amounts, types, categories, payments, tags = [], [], [], [], [], [], []
+    async for raw in Transaction.get_pymongo_collection().find(query, projection, batch_size=10_000):
+        ids.append(str(raw["_id"]))
+        days.append(day_number(raw[Transaction.transaction_date]))
+        amounts.append(raw["amount"])
+        types.append(TYPE_CODES[raw[Transaction.transaction_type]])
+        categories.append(columns.category_code(raw.get(Transaction.categoryId)))
+        payments.append(PAYMENT_CODES[raw[Transaction.payment_method]])
+        tags.append([columns.tag_code(tag) for tag in raw.get(Transaction.tags) or []])
+    columns.extend(ids, days, amounts, types, categories, payments, tags)
+    for _, segment in archive_store.segments(user):
+        extend_archived(columns, segment)
+    return columns
+
+
+def extend_archived(columns: UserColumns, segment: Segment):
+    """Append a cold-archive segment's counted rows, re-coded to the user's dictionaries"""
+    hex_ids = segment.ids.tobytes().hex()
+    ids = [hex_ids[i:i + 24] for i in range(0, len(hex_ids), 24)]
+    fresh = np.fromiter((i not in columns.row_of for i in ids), dtype=bool, count=len(ids))
+    # Rows also in the hot collection (restored, or filed by a run that stopped early) are shadowed
+    rows = np.flatnonzero(segment.counted & fresh)
+    if not len(rows):
+        return
+
+    strings = segment.strings
+    type_codes = np.array([TYPE_CODES[kind] for kind in strings["types"]], dtype=np.int8)
+    payment_codes = np.array([PAYMENT_CODES[method] for method in strings["payments"]], dtype=np.int8)
+    category_codes = np.array([columns.category_code(c) for c in strings["categories"]], dtype=np.int16)
+    tag_codes = np.array([columns.tag_code(tag) for tag in strings["tags"]], dtype=np.int32)
+
+    counts = segment.tag_count.astype(np.int64)
+    starts = np.cumsum(counts) - counts
+    columns.extend_arrays(
+        [ids[row] for row in rows],
+        segment.day[rows],
+        segment.amount[rows],
+        type_codes[segment.type[rows]],
+        category_codes[segment.category[rows]],
+        payment_codes[segment.payment[rows]],
+        segment.tag_count[rows],
+        tag_codes[segment.tag_codes[tag_positions(starts[rows], counts[rows])]],
+    )
+
+
+# Per-worker UserColumns, loaded on first use and patched in place by transaction_committed
+column_cache: UserCache[UserColumns] = UserCache(load_user_columns, ANALYTICS_CACHE_MB * 1024 * 1024)
+
+
+@transaction_committed.connect
+async def patch_columns(changes: List[TransactionChange], **kwargs):
+    """Keep loaded users' columns in step with every write"""
+    for before, after in changes:
+        if before is not None and before.id is not None:
+            columns = column_cache.changed(before.created_by or "")
+            if columns is not None:
+                columns.kill(str(before.id))
+        if _counted(after) and after.id is not None:
+            columns = column_cache.changed(after.created_by or "")
+            if columns is not None:
+                columns.append(after)
+    column_cache.evict()
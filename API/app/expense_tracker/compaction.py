@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Type
+
+from pymongo import ReplaceOne
+
+from ..categories.models import Category
+from ..core.config import TOMBSTONE_RETENTION_DAYS
+from ..database import TOMBSTONE_FILTER, BaseDocument
+from .models import Transaction
+from .partitions import discard_raw
+from .recurring import acquire_lease, release_lease, worker_id
+
+logger = logging.getLogger(__name__)
+
+COMPACT_BATCH_SIZE = 500
+# Pause between batches so compaction never holds the primary for long
+COMPACT_PAUSE_SECONDS = 0.2
+TRASH_SUFFIX = "_trash"
+LEASE_NAME = "tombstone-compaction"
+
+
+async def compact(
+    model: Type[BaseDocument],
+    retention_days: int = TOMBSTONE_RETENTION_DAYS,
+    batch_size: int = COMPACT_BATCH_SIZE,
+    pause_seconds: float = COMPACT_PAUSE_SECONDS,
+) -> int:
+    """
+    Move tombstones deleted more than `retention_days` ago into <collection>_trash
+    Batches of `batch_size`: copied to the trash first, then removed if still deleted,
+    so a stopped run loses nothing. Returns the number moved
+    """
+    collection = model.get_pymongo_collection()
+    trash = collection.database[f"{collection.name}{TRASH_SUFFIX}"]
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    # Deletes stamp updatedAt; the tombstones_updated partial index serves this
+    query = {**TOMBSTONE_FILTER, "updatedAt": {"$lt": cutoff}}
+
+    moved = 0
+    while True:
+        batch = await collection.find(query).sort("updatedAt", 1).limit(batch_size).to_list(None)
+        if not batch:
+            return moved
+        purged_at = datetime.utcnow()
+        await trash.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "purgedAt": purged_at}, upsert=True) for doc in batch],
+            ordered=False,
+        )
+        result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}, **TOMBSTONE_FILTER})
+        moved += result.deleted_count
+        if model is Transaction:
+            await discard_raw(batch)
+        if len(batch) < batch_size:
+            return moved
+        await asyncio.sleep(pause_seconds)
+
+
+async def compact_all(retention_days: int = TOMBSTONE_RETENTION_DAYS) -> Dict[str, int]:
+    return {
+        model.get_collection_name(): await compact(model, retention_days)
+        for model in (Transaction, Category)
+    }
+
+
+# ==================== BACKGROUND JOB ====================
+
+async def compact_periodically(interval_seconds: int):
+    """Background loop started with the app - only the lease holder compacts"""
+    owner = worker_id()
+    ttl = max(interval_seconds * 2, 60)
+    try:
+        while True:
+            try:
+                if await acquire_lease(LEASE_NAME, owner, ttl):
+                    stats = await compact_all()
+                    if any(stats.values()):
+                        logger.info(f"Tombstone compaction: {stats}")
+            except Exception as e:
+                logger.error(f"Tombstone compaction failed: {e}")
+            await asyncio.sleep(interval_seconds)
+    finally:
+        try:
+            await release_lease(LEASE_NAME, owner)
+        except Exception:
+            pass
+
+
+async def _main(retention_days: int):
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        stats = await compact_all(retention_days)
+        print(f"Moved to trash: {stats}")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.compaction
+    parser = argparse.ArgumentParser(description="Move old soft-deleted records to the trash collections")
+    parser.add_argument("--retention-days", type=int, default=TOMBSTONE_RETENTION_DAYS)
+    args = parser.parse_args()
+    asyncio.run(_main(args.retention_days))
@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..core.utils import utils
+from .models import Contact, Transaction, TransactionType
+from .signals import TransactionChange, transaction_changed
+
+# Contact counters hold what is outstanding:
+#   total_debt_given    - lent to the contact, not yet collected back
+#   total_debt_received - borrowed from the contact, not yet repaid
+DEBT_COUNTERS = {
+    TransactionType.DEBT_GIVEN: ("total_debt_given", 1),
+    TransactionType.DEBT_COLLECTION: ("total_debt_given", -1),
+    TransactionType.DEBT_RECEIVED: ("total_debt_received", 1),
+    TransactionType.DEBT_REPAYMENT: ("total_debt_received", -1),
+}
+
+# (label, first day overdue, last day overdue) - None is open-ended
+AGING_BUCKETS: List[Tuple[str, Optional[int], Optional[int]]] = [
+    ("current", None, 0),
+    ("0-30", 1, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+]
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def debt_effects(transaction: Optional[Transaction]) -> Dict[Tuple[str, str], float]:
+    """(contact_id, counter field) -> change one live debt transaction makes"""
+    effects: Dict[Tuple[str, str], float] = {}
+    if transaction is None or transaction.is_deleted or not transaction.contact_id:
+        return effects
+    counter = DEBT_COUNTERS.get(transaction.transaction_type)
+    if counter:
+        field, sign = counter
+        effects[(transaction.contact_id, field)] = sign * transaction.amount
+    return effects
+
+
+def debt_deltas(changes: List[TransactionChange]) -> Dict[str, Dict[str, float]]:
+    """Net counter change per contact for a batch of writes"""
+    deltas: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for before, after in changes:
+        for transaction, sign in ((before, -1), (after, 1)):
+            for (contact_id, field), effect in debt_effects(transaction).items():
+                deltas[contact_id][field] += sign * effect
+    return {
+        contact_id: {field: round(delta, 2) for field, delta in fields.items() if round(delta, 2)}
+        for contact_id, fields in deltas.items()
+    }
+
+
+# ==================== COUNTERS ====================
+
+@transaction_changed.connect
+async def update_contact_debts(changes: List[TransactionChange], session=None, **kwargs):
+    """$inc the outstanding debt counters of every contact a write touches"""
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"_id": ObjectId(contact_id)},
+            {
+                "$inc": {Contact.model_fields[field].alias: delta for field, delta in fields.items()},
+                "$set": {Contact.updated_at: now},
+            },
+        )
+        for contact_id, fields in debt_deltas(changes).items()
+        if fields and ObjectId.is_valid(contact_id)
+    ]
+    if operations:
+        await Contact.get_pymongo_collection().bulk_write(operations, ordered=False, session=session)
+
+
+async def rebuild_contact_totals() -> int:
+    """
+    Recompute every contact's counters from transaction history
+    The hot collection is all of it for debts - the archive never files debt types
+    """
+    pipeline = [
+        {"$match": {
+            Transaction.is_deleted: False,
+            Transaction.contact_id: {"$ne": None},
+            Transaction.transaction_type: {"$in": [kind.value for kind in DEBT_COUNTERS]},
+        }},
+        {"$group": {
+            "_id": {"contact": f"${Transaction.contact_id}", "type": f"${Transaction.transaction_type}"},
+            "total": {"$sum": "$amount"},
+        }},
+    ]
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"total_debt_given": 0.0, "total_debt_received": 0.0})
+    async for row in Transaction.aggregate(pipeline):
+        field, sign = DEBT_COUNTERS[TransactionType(row["_id"]["type"])]
+        totals[row["_id"]["contact"]][field] += sign * row["total"]
+
+    now = datetime.utcnow()
+    operations = []
+    async for contact in Contact.get_pymongo_collection().find({}, {"_id": 1}):
+        fields = totals.get(str(contact["_id"]), {"total_debt_given": 0.0, "total_debt_received": 0.0})
+        operations.append(UpdateOne(
+            {"_id": contact["_id"]},
+            {"$set": {
+                **{Contact.model_fields[field].alias: round(value, 2) for field, value in fields.items()},
+                Contact.updated_at: now,
+            }},
+        ))
+    if operations:
+        await Contact.get_pymongo_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+# ==================== AGING ====================
+
+def _bucket_branches(age: Dict[str, Any]) -> List[Dict[str, Any]]:
+    branches = []
+    for label, low, high in AGING_BUCKETS:
+        conditions = []
+        if low is not None:
+            conditions.append({"$gte": [age, low]})
+        if high is not None:
+            conditions.append({"$lte": [age, high]})
+        branches.append({"case": {"$and": conditions}, "then": label})
+    return branches
+
+
+async def debt_aging(
+    user: str, contact_id: Optional[str] = None, today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """
+    A user's unpaid DEBT_GIVEN / DEBT_RECEIVED amounts per contact, bucketed by days overdue
+    One aggregation, driven by the (createdBy, contactId, dueDate, isPaid) index.
+    Debts without a due date age from their transaction date
+    """
+    today = today or date.today()
+    match: Dict[str, Any] = {
+        Transaction.created_by: user,
+        Transaction.contact_id: contact_id if contact_id else {"$ne": None},
+        Transaction.is_paid: False,
+        Transaction.is_deleted: False,
+        Transaction.transaction_type: {"$in": [TransactionType.DEBT_GIVEN.value, TransactionType.DEBT_RECEIVED.value]},
+    }
+    # Whole days overdue; negative while not yet due
+    age = {"$floor": {"$divide": [
+        {"$subtract": [
+            utils.as_datetime(today),
+            {"$ifNull": [f"${Transaction.due_date}", f"${Transaction.transaction_date}"]},
+        ]},
+        DAY_MS,
+    ]}}
+    pipeline = [
+        {"$match": match},
+        {"$project": {
+            "contact": f"${Transaction.contact_id}",
+            "type": f"${Transaction.transaction_type}",
+            "amount": "$amount",
+            "bucket": {"$switch": {"branches": _bucket_branches(age), "default": "current"}},
+        }},
+        {"$group": {
+            "_id": {"contact": "$contact", "type": "$type", "bucket": "$bucket"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+    ]
+
+    labels = [label for label, _, _ in AGING_BUCKETS]
+    by_contact: Dict[str, Dict[str, Any]] = {}
+    async for row in Transaction.aggregate(pipeline):
+        key = row["_id"]
+        entry = by_contact.setdefault(key["contact"], {
+            "contactId": key["contact"],
+            "given": {label: 0.0 for label in labels},
+            "received": {label: 0.0 for label in labels},
+            "count": 0,
+        })
+        side = "given" if key["type"] == TransactionType.DEBT_GIVEN.value else "received"
+        entry[side][key["bucket"]] = round(entry[side][key["bucket"]] + row["total"], 2)
+        entry["count"] += row["count"]
+
+    for entry in by_contact.values():
+        entry["totalGiven"] = round(sum(entry["given"].values()), 2)
+        entry["totalReceived"] = round(sum(entry["received"].values()), 2)
+    return sorted(by_contact.values(), key=lambda e: -(e["totalGiven"] + e["totalReceived"]))
+
+
+async def _main():
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        written = await rebuild_contact_totals()
+        print(f"Rebuilt debt totals for {written} contacts")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.debts
+    argparse.ArgumentParser(description="Rebuild contact debt totals from transactions").parse_args()
+    asyncio.run(_main())
@@ -0,0 +1,342 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import orjson
+from bson import ObjectId
+
+from .models import Transaction, Account
+from ..categories.models import Category as CategoryDocument
+
+
+# (key, header) - key is also the NDJSON field name
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("transactionId", "Transaction ID"),
+    ("transactionDate", "Date"),
+    ("transactionType", "Type"),
+    ("amount", "Amount"),
+    ("currency", "Currency"),
+    ("category", "Category"),
+    ("subcategory", "Subcategory"),
+    ("description", "Description"),
+    ("paymentMethod", "Payment Method"),
+    ("fromAccount", "From Account"),
+    ("toAccount", "To Account"),
+    ("tags", "Tags"),
+    ("notes", "Notes"),
+    ("referenceNumber", "Reference Number"),
+]
+
+
+def export_projection() -> Dict[str, int]:
+    """Only the stored fields the export needs (field expressions exist once Beanie is initialized)"""
+    return {
+        field: 1
+        for field in (
+            Transaction.transaction_id,
+            Transaction.transaction_date,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.categoryId,
+            Transaction.subcategory_id,
+            Transaction.description,
+            Transaction.payment_method,
+            Transaction.from_account_id,
+            Transaction.to_account_id,
+            Transaction.tags,
+            Transaction.notes,
+            Transaction.reference_number,
+        )
+    }
+
+
+# ==================== NAME LOOKUP ====================
+
+class NameLookup:
+    """
+    Per-export cache of category / subcategory / account names
+    Unknown IDs are resolved once per chunk with a single $in query per collection
+    """
+
+    def __init__(self):
+        self.categories: Dict[str, str] = {}
+        self.subcategories: Dict[str, str] = {}
+        self.accounts: Dict[str, str] = {}
+
+    async def prime(self, docs: List[dict]):
+        """Resolve every ID in `docs` not seen earlier in this export"""
+        category_ids = {
+            doc.get(Transaction.categoryId) for doc in docs
+        } - self.categories.keys() - {None}
+        account_ids = {
+            account_id
+            for doc in docs
+            for account_id in (doc.get(Transaction.from_account_id), doc.get(Transaction.to_account_id))
+        } - self.accounts.keys() - {None}
+
+        if category_ids:
+            cursor = CategoryDocument.get_pymongo_collection().find(
+                {CategoryDocument.categoryId: {"$in": list(category_ids)}},
+                {CategoryDocument.categoryId: 1, CategoryDocument.name: 1, "subcategories.id": 1, "subcategories.name": 1},
+            )
+            async for category in cursor:
+                self.categories[category[CategoryDocument.categoryId]] = category.get("name", "")
+                for sub in category.get("subcategories") or []:
+                    if sub.get("id"):
+                        self.subcategories[sub["id"]] = sub.get("name", "")
+            # Remember misses so they are not queried again
+            for category_id in category_ids:
+                self.categories.setdefault(category_id, "")
+
+        if account_ids:
+            object_ids = [ObjectId(a) for a in account_ids if ObjectId.is_valid(a)]
+            if object_ids:
+                cursor = Account.get_pymongo_collection().find(
+                    {"_id": {"$in": object_ids}}, {Account.name: 1}
+                )
+                async for account in cursor:
+                    self.accounts[str(account["_id"])] = account.get(Account.name, "")
+            for account_id in account_ids:
+                self.accounts.setdefault(account_id, "")
+
+    def row(self, doc: dict) -> Dict[str, Any]:
+        """Flatten a raw transaction document into export columns"""
+        transaction_date = doc.get(Transaction.transaction_date)
+        if isinstance(transaction_date, datetime):
+            transaction_date = transaction_date.date()
+        if isinstance(transaction_date, date):
+            transaction_date = transaction_date.isoformat()
+
+        return {
+            "transactionId": doc.get(Transaction.transaction_id),
+            "transactionDate": transaction_date,
+            "transactionType": _enum_value(doc.get(Transaction.transaction_type)),
+            "amount": doc.get(Transaction.amount),
+            "currency": doc.get(Transaction.currency),
+            "category": self.categories.get(doc.get(Transaction.categoryId), ""),
+            "subcategory": self.subcategories.get(doc.get(Transaction.subcategory_id), ""),
+            "description": doc.get(Transaction.description),
+            "paymentMethod": _enum_value(doc.get(Transaction.payment_method)),
+            "fromAccount": self.accounts.get(doc.get(Transaction.from_account_id), ""),
+            "toAccount": self.accounts.get(doc.get(Transaction.to_account_id), ""),
+            "tags": ";".join(doc.get(Transaction.tags) or []),
+            "notes": doc.get(Transaction.notes),
+            "referenceNumber": doc.get(Transaction.reference_number),
+        }
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+# ==================== ENCODERS ====================
+
+class CsvEncoder:
+    """RFC 4180 CSV with a header row"""
+
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.keys = [key for key, _ in columns]
+        self.headers = [header for _, header in columns]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def begin(self) -> bytes:
+        self._writer.writerow(self.headers)
+        # BOM so Excel opens UTF-8 CSV correctly
+        return b"\xef\xbb\xbf" + self._drain()
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        self._writer.writerows(
+            ["" if row[key] is None else row[key] for key in self.keys] for row in rows
+        )
+        return self._drain()
+
+    def end(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    """One JSON object per line"""
+
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.keys = [key for key, _ in columns]
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+    def end(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink - zipfile then streams entries with data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Transactions" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+class XlsxEncoder:
+    """
+    Minimal single-sheet XLSX written as a streamed zip
+    Rows go straight into the deflate stream - nothing is held beyond the current chunk
+    """
+
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    extension = "xlsx"
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.keys = [key for key, _ in columns]
+        self.headers = [header for _, header in columns]
+        self._sink = _ChunkSink()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._sheet = None
+
+    @staticmethod
+    def _cell(value: Any) -> str:
+        if value is None or value == "":
+            return "<c/>"
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f"<c><v>{value}</v></c>"
+        text = escape(_XML_ILLEGAL.sub("", str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _row(self, values: List[Any]) -> str:
+        return "<row>" + "".join(self._cell(v) for v in values) + "</row>"
+
+    def begin(self) -> bytes:
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _WORKBOOK)
+        self._zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write((
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            "<sheetData>" + self._row(self.headers)
+        ).encode("utf-8"))
+        return self._sink.drain()
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        self._sheet.write(
+            "".join(self._row([row[key] for key in self.keys]) for row in rows).encode("utf-8")
+        )
+        return self._sink.drain()
+
+    def end(self) -> bytes:
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+        return self._sink.drain()
+
+
+EXPORT_ENCODERS = {
+    "csv": CsvEncoder,
+    "ndjson": NdjsonEncoder,
+    "xlsx": XlsxEncoder,
+    "excel": XlsxEncoder,
+}
+
+
+# ==================== STREAM ====================
+
+async def stream_export(
+    cursor,
+    encoder,
+    lookup: Optional[NameLookup] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """
+    Pull raw documents from `cursor` in chunks, resolve names, encode, yield
+    Memory is bounded by `chunk_size` regardless of how many rows match
+    """
+    lookup = lookup or NameLookup()
+    yield encoder.begin()
+
+    chunk: List[dict] = []
+    async for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            await lookup.prime(chunk)
+            data = encoder.encode([lookup.row(d) for d in chunk])
+            chunk = []
+            if data:
+                yield data
+
+    if chunk:
+        await lookup.prime(chunk)
+        data = encoder.encode([lookup.row(d) for d in chunk])
+        if data:
+            yield data
+
+    yield encoder.end()
@@ -0,0 +1,174 @@
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from .columns import PAYMENT_METHODS, TRANSACTION_TYPES, UserColumns, tag_positions
+from .models import Transaction
+from .signals import TransactionChange, transaction_committed
+
+# Most common values returned for the open-ended facets (categories, tags)
+FACET_LIMIT = 20
+# Lower bounds of the amount buckets; the last bucket is open-ended
+AMOUNT_BOUNDARIES = [0, 100, 500, 1000, 5000, 10000]
+
+
+def _counts(field: str, limit: Optional[int] = None, unwind: bool = False) -> List[Dict[str, Any]]:
+    stages: List[Dict[str, Any]] = [{"$unwind": f"${field}"}] if unwind else []
+    stages += [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+    if limit:
+        stages.append({"$limit": limit})
+    return stages
+
+
+def facet_stages() -> Dict[str, List[Dict[str, Any]]]:
+    """$facet branches counting the filter's matches per type, category, method, tag and amount"""
+    return {
+        "transactionType": _counts(Transaction.transaction_type),
+        "categoryId": _counts(Transaction.categoryId, FACET_LIMIT),
+        "paymentMethod": _counts(Transaction.payment_method),
+        "tags": _counts(Transaction.tags, FACET_LIMIT, unwind=True),
+        "amount": [{"$bucket": {
+            "groupBy": "$amount",
+            "boundaries": AMOUNT_BOUNDARIES,
+            "default": AMOUNT_BOUNDARIES[-1],
+            "output": {"count": {"$sum": 1}},
+        }}],
+        "total": [{"$count": "count"}],
+    }
+
+
+def _shape(row: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    total = row["total"][0]["count"] if row["total"] else 0
+    facets: Dict[str, Any] = {
+        name: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in row[name]]
+        for name in ("transactionType", "categoryId", "paymentMethod", "tags")
+    }
+    # $bucket puts the open-ended top bucket under `default`, merged here with its boundary
+    amounts: Dict[float, int] = {}
+    for bucket in row["amount"]:
+        amounts[bucket["_id"]] = amounts.get(bucket["_id"], 0) + bucket["count"]
+    upper = dict(zip(AMOUNT_BOUNDARIES, AMOUNT_BOUNDARIES[1:]))
+    facets["amount"] = [
+        {"min": low, "max": upper.get(low), "count": amounts[low]}
+        for low in AMOUNT_BOUNDARIES
+        if low in amounts
+    ]
+    return facets, total
+
+
+async def page_with_facets(
+    match: Dict[str, Any],
+    results: List[Dict[str, Any]],
+    **kwargs,
+) -> Tuple[List[Transaction], Dict[str, Any], int]:
+    """
+    One aggregation: $match, then $facet with the page (`results` stages) beside the facet counts
+    Returns (page, facets, total matches)
+    """
+    pipeline = [{"$match": match}, {"$facet": {"results": results, **facet_stages()}}]
+    async for row in Transaction.aggregate(pipeline, **kwargs):
+        page = [Transaction.from_db(raw) for raw in row.pop("results")]
+        facets, total = _shape(row)
+        return page, facets, total
+    return [], {}, 0
+
+
+async def count_facets(match: Dict[str, Any], **kwargs) -> Tuple[Dict[str, Any], int]:
+    """Facet counts and total for `match`, without a page"""
+    async for row in Transaction.aggregate([{"$match": match}, {"$facet": facet_stages()}], **kwargs):
+        return _shape(row)
+    return {}, 0
+
+
+# ==================== FROM COLUMNS ====================
+
+def _ranked(counts: np.ndarray, labels: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    rows = sorted(
+        ((labels[code], int(count)) for code, count in enumerate(counts.tolist()) if count),
+        key=lambda row: (-row[1], row[0]),
+    )
+    return [{"value": value, "count": count} for value, count in rows[:limit]]
+
+
+def column_facets(columns: UserColumns, mask: np.ndarray) -> Tuple[Dict[str, Any], int]:
+    """The same facets as facet_stages(), counted with bincounts over the rows `mask` selects"""
+    view = columns.view()
+    categories = [category_id or None for category_id in columns.category_ids]
+    tag_counts = view.tag_count[mask]
+    tags = columns.tag_codes[tag_positions(view.tag_start[mask], tag_counts)]
+    # Amounts are validated positive, so every row lands at or above the first boundary
+    amount_buckets = np.bincount(
+        np.maximum(np.searchsorted(AMOUNT_BOUNDARIES, view.amount[mask], side="right") - 1, 0),
+        minlength=len(AMOUNT_BOUNDARIES),
+    )
+    upper = AMOUNT_BOUNDARIES[1:] + [None]
+    facets = {
+        "transactionType": _ranked(
+            np.bincount(view.type[mask], minlength=len(TRANSACTION_TYPES)),
+            [kind.value for kind in TRANSACTION_TYPES],
+        ),
+        "categoryId": _ranked(
+            np.bincount(view.category[mask], minlength=len(categories)), categories, FACET_LIMIT
+        ),
+        "paymentMethod": _ranked(
+            np.bincount(view.payment[mask], minlength=len(PAYMENT_METHODS)),
+            [method.value for method in PAYMENT_METHODS],
+        ),
+        "tags": _ranked(np.bincount(tags, minlength=len(columns.tag_names)), columns.tag_names, FACET_LIMIT),
+        "amount": [
+            {"min": low, "max": high, "count": count}
+            for low, high, count in zip(AMOUNT_BOUNDARIES, upper, amount_buckets.tolist())
+            if count
+        ],
+    }
+    return facets, int(mask.sum())
+
+
+# ==================== CACHE ====================
+
+class FacetCache:
+    """
+    Facet counts and totals per filter, for `ttl` seconds
+    Any transaction write in this worker clears it; the TTL bounds staleness from other workers
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Dict[str, Any], int]] = {}
+
+    @staticmethod
+    def key(match: Dict[str, Any]) -> str:
+        return hashlib.blake2b(
+            orjson.dumps(match, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16,
+        ).hexdigest()
+
+    def get(self, match: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], int]]:
+        entry = self._entries.get(self.key(match))
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1], entry[2]
+        return None
+
+    def put(self, match: Dict[str, Any], facets: Dict[str, Any], total: int):
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[self.key(match)] = (time.monotonic(), facets, total)
+
+    def clear(self):
+        self._entries.clear()
+
+
+facet_cache = FacetCache()
+
+
+@transaction_committed.connect
+async def invalidate_facets(changes: List[TransactionChange], **kwargs):
+    if changes:
+        facet_cache.clear()
@@ -0,0 +1,205 @@
+import base64
+import binascii
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from ..core.utils import utils
+from .columns import PAYMENT_CODES, TYPE_CODES, UserColumns, day_number, tag_positions
+from .models import DateRange, FilterOptions, Transaction
+from .search import query_terms, search_filter
+
+# Names of the partial indexes the compiler hints - declared in Transaction.Settings.
+# Every compiled filter has isDeleted: false and its owner, so they always apply
+DATE_INDEX = "live_owner_date_id"
+CATEGORY_INDEX = "live_owner_category_date_id"
+SEARCH_INDEX = "live_search_tokens"
+
+# Keyset order: newest first, _id breaks ties within a day
+KEYSET_SORT = [("transactionDate", -1), ("_id", -1)]
+
+
+class CompiledQuery(NamedTuple):
+    filter: Dict[str, Any]
+    hint: str
+
+
+# ==================== DATE PRESETS ====================
+
+def resolve_date_range(date_range: DateRange, today: Optional[date] = None) -> Tuple[Optional[date], Optional[date]]:
+    """Preset -> (start, end), inclusive; weeks start on Sunday like the UI"""
+    today = today or date.today()
+    preset = date_range.preset
+    week_start = today - timedelta(days=(today.weekday() + 1) % 7)
+    if preset == "today":
+        return today, today
+    if preset == "yesterday":
+        return today - timedelta(days=1), today - timedelta(days=1)
+    if preset == "thisWeek":
+        return week_start, today
+    if preset == "lastWeek":
+        return week_start - timedelta(days=7), week_start - timedelta(days=1)
+    if preset == "thisMonth":
+        return today.replace(day=1), today
+    if preset == "lastMonth":
+        last_month_end = today.replace(day=1) - timedelta(days=1)
+        return last_month_end.replace(day=1), last_month_end
+    if preset == "thisYear":
+        return today.replace(month=1, day=1), today
+    if preset == "all":
+        return None, None
+    return date_range.start_date, date_range.end_date
+
+
+# ==================== COMPILER ====================
+
+def _status_predicates(today: date) -> Dict[str, Dict[str, Any]]:
+    # Same precedence as the list view: RECURRING, then PAID, then OVERDUE / PENDING
+    unpaid = {Transaction.is_recurring: False, Transaction.is_paid: False}
+    return {
+        "RECURRING": {Transaction.is_recurring: True},
+        "PAID": {Transaction.is_recurring: False, Transaction.is_paid: True},
+        "OVERDUE": {**unpaid, Transaction.due_date: {"$lt": utils.as_datetime(today)}},
+        "PENDING": {**unpaid, "$or": [
+            {Transaction.due_date: None},
+            {Transaction.due_date: {"$gte": utils.as_datetime(today)}},
+        ]},
+    }
+
+
+def _in(values: List[Any]) -> Any:
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+def compile_filters(filters: FilterOptions, created_by: str, today: Optional[date] = None) -> CompiledQuery:
+    """
+    FilterOptions -> one MongoDB filter over `created_by`'s transactions plus the index to drive it
+    Lists become $in, ranges become $gte / $lte, searchQuery uses the token index.
+    Clauses that need their own $or are collected under a single $and
+    """
+    today = today or date.today()
+    query: Dict[str, Any] = {Transaction.is_deleted: False, Transaction.created_by: created_by}
+    alternatives: List[Dict[str, Any]] = []
+
+    start, end = resolve_date_range(filters.date_range, today)
+    if start or end:
+        query[Transaction.transaction_date] = {
+            **({"$gte": utils.as_datetime(start)} if start else {}),
+            **({"$lte": utils.as_datetime(end)} if end else {}),
+        }
+    if filters.transaction_types:
+        query[Transaction.transaction_type] = _in([kind.value for kind in filters.transaction_types])
+    if filters.category_ids:
+        query[Transaction.categoryId] = _in(filters.category_ids)
+    if filters.payment_methods:
+        query[Transaction.payment_method] = _in(filters.payment_methods)
+    if filters.amount_range.min is not None or filters.amount_range.max is not None:
+        query["amount"] = {
+            **({"$gte": filters.amount_range.min} if filters.amount_range.min is not None else {}),
+            **({"$lte": filters.amount_range.max} if filters.amount_range.max is not None else {}),
+        }
+    if filters.tags:
+        query[Transaction.tags] = {"$in": [tag.lower().strip() for tag in filters.tags]}
+    if filters.account_ids:
+        accounts = _in(filters.account_ids)
+        alternatives.append({"$or": [
+            {Transaction.from_account_id: accounts},
+            {Transaction.to_account_id: accounts},
+        ]})
+    if filters.status:
+        predicates = _status_predicates(today)
+        wanted = [predicates[status.upper()] for status in filters.status if status.upper() in predicates]
+        if wanted:
+            alternatives.append(wanted[0] if len(wanted) == 1 else {"$or": wanted})
+
+    terms = query_terms(filters.search_query)
+    if terms:
+        query.update(search_filter(terms))
+
+    for alternative in alternatives:
+        if "$or" in alternative or any(key in query for key in alternative):
+            query.setdefault("$and", []).append(alternative)
+        else:
+            query.update(alternative)
+
+    # Token matches are the most selective; a category list comes next; otherwise walk by date
+    if terms:
+        hint = SEARCH_INDEX
+    elif filters.category_ids:
+        hint = CATEGORY_INDEX
+    else:
+        hint = DATE_INDEX
+    return CompiledQuery(query, hint)
+
+
+def _codes(values: List[Optional[int]]) -> np.ndarray:
+    return np.array([code for code in values if code is not None], dtype=np.int64)
+
+
+def compile_mask(columns: UserColumns, filters: FilterOptions, today: Optional[date] = None) -> Optional[np.ndarray]:
+    """
+    FilterOptions -> boolean mask over columns.view(), for the same rows compile_filters matches
+    None when the filter needs fields the columns do not hold (accounts, status, search)
+    """
+    if filters.account_ids or filters.status or query_terms(filters.search_query):
+        return None
+    view = columns.view()
+    mask = np.ones(len(view.day), dtype=bool)
+
+    start, end = resolve_date_range(filters.date_range, today or date.today())
+    if start:
+        mask &= view.day >= day_number(start)
+    if end:
+        mask &= view.day <= day_number(end)
+    if filters.transaction_types:
+        mask &= np.isin(view.type, _codes([TYPE_CODES.get(kind.value) for kind in filters.transaction_types]))
+    if filters.category_ids:
+        mask &= np.isin(view.category, _codes([columns.code_of(category) for category in filters.category_ids]))
+    if filters.payment_methods:
+        mask &= np.isin(view.payment, _codes([PAYMENT_CODES.get(method) for method in filters.payment_methods]))
+    if filters.amount_range.min is not None:
+        mask &= view.amount >= filters.amount_range.min
+    if filters.amount_range.max is not None:
+        mask &= view.amount <= filters.amount_range.max
+    if filters.tags:
+        wanted = _codes([columns.tag_code_of(tag.lower().strip()) for tag in filters.tags])
+        hits = np.isin(columns.tag_codes[tag_positions(view.tag_start, view.tag_count)], wanted)
+        rows = np.repeat(np.arange(len(view.day)), view.tag_count)
+        mask &= np.bincount(rows[hits], minlength=len(view.day)) > 0
+    return mask
+
+
+# ==================== KEYSET PAGINATION ====================
+
+def encode_cursor(transaction: Transaction) -> str:
+    """Opaque position after `transaction` in KEYSET_SORT order"""
+    position = {"d": transaction.transaction_date.isoformat(), "i": str(transaction.id)}
+    return base64.urlsafe_b64encode(orjson.dumps(position)).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        position = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return utils.as_datetime(date.fromisoformat(position["d"])), ObjectId(position["i"])
+    except (binascii.Error, orjson.JSONDecodeError, InvalidId, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def cursor_filter(cursor: str) -> Dict[str, Any]:
+    """Rows strictly after the cursor position"""
+    transaction_date, object_id = decode_cursor(cursor)
+    return {"$or": [
+        {Transaction.transaction_date: {"$lt": transaction_date}},
+        {Transaction.transaction_date: transaction_date, "_id": {"$lt": object_id}},
+    ]}
+
+
+def after_cursor(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict `query` to rows strictly after the cursor position"""
+    if not cursor:
+        return query
+    return {"$and": [query, cursor_filter(cursor)]}
@@ -0,0 +1,151 @@
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+from .columns import TYPE_CODES, UserColumns, day_number
+from .models import Transaction, TransactionType
+
+EXPENSE = TYPE_CODES[TransactionType.EXPENSE.value]
+HISTORY_MONTHS = 12
+# Bounds on the seasonal multiplier and on the share of a month's spend done by a given day
+SEASONAL_LIMITS = (0.5, 2.0)
+MIN_PACE = 0.05
+
+# Robust z-score (median / MAD of log amounts) above which an amount is flagged
+ANOMALY_THRESHOLD = 3.5
+MIN_ANOMALY_SAMPLES = 8
+# Floor on the log-amount spread - categories of near-identical amounts are not all outliers
+MIN_LOG_SCALE = 0.1
+
+
+def _months(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _day_of_month(days: np.ndarray) -> np.ndarray:
+    dates = days.astype("datetime64[D]")
+    return (dates - dates.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64) + 1
+
+
+# ==================== FORECAST ====================
+
+def forecast_month(columns: UserColumns, today: date) -> Dict[str, Any]:
+    """
+    Month-end expense per category, blending two projections by the share of a month's
+    spend usually done by today (`pace`; the elapsed share of the month without history):
+      pace    - spend so far divided by that share
+      history - average monthly spend over the last HISTORY_MONTHS, scaled by the
+                same month last year (seasonality); the run rate when there is no history
+    """
+    view = columns.view()
+    expense = view.type == EXPENSE
+    days, amounts, categories = view.day[expense], view.amount[expense], view.category[expense]
+    category_count = len(columns.category_ids)
+
+    months = _months(days)
+    current = _months(np.array([day_number(today)]))[0]
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    elapsed = today.day / days_in_month
+
+    # Month-to-date per category
+    so_far = (months == current) & (days <= day_number(today))
+    spent = np.bincount(categories[so_far], weights=amounts[so_far], minlength=category_count)
+
+    # History: (month, category) totals, in full and up to today's day of the month
+    first_month = current - HISTORY_MONTHS
+    past = (months >= first_month) & (months < current)
+    cells = (months[past] - first_month) * category_count + categories[past]
+    totals = np.bincount(cells, weights=amounts[past], minlength=HISTORY_MONTHS * category_count)
+    totals = totals.reshape(HISTORY_MONTHS, category_count)
+    early = _day_of_month(days[past]) <= today.day
+    paced = np.bincount(cells[early], weights=amounts[past][early], minlength=HISTORY_MONTHS * category_count)
+    paced = paced.reshape(HISTORY_MONTHS, category_count)
+
+    history_total = totals.sum(axis=0)
+    pace = np.full(category_count, elapsed)
+    np.divide(paced.sum(axis=0), history_total, out=pace, where=history_total > 0)
+    pace = np.clip(pace, MIN_PACE, 1.0)
+    pace_projection = spent / pace
+    run_rate = spent / elapsed
+
+    # Average over the months the user has existed, up to HISTORY_MONTHS
+    months_known = int(np.clip(current - months.min(), 1, HISTORY_MONTHS)) if len(months) else 1
+    baseline = history_total / months_known
+    seasonal = np.ones(category_count)
+    if months_known >= HISTORY_MONTHS:
+        last_year = totals[0]
+        np.divide(last_year, baseline, out=seasonal, where=(baseline > 0) & (last_year > 0))
+        seasonal = np.clip(seasonal, *SEASONAL_LIMITS)
+    expected = np.where(history_total > 0, baseline * seasonal, run_rate)
+
+    forecast = np.maximum(pace * pace_projection + (1 - pace) * expected, spent)
+
+    shown = np.flatnonzero((spent > 0) | (expected > 0))
+    rows = [
+        {
+            "categoryId": columns.category_ids[i],
+            "spentToDate": round(float(spent[i]), 2),
+            "forecast": round(float(forecast[i]), 2),
+            "runRate": round(float(run_rate[i]), 2),
+            "historicalAverage": round(float(baseline[i]), 2),
+            "seasonalIndex": round(float(seasonal[i]), 2),
+        }
+        for i in shown
+    ]
+    rows.sort(key=lambda row: -row["forecast"])
+    return {
+        "month": f"{today:%Y-%m}",
+        "asOf": today.isoformat(),
+        "elapsed": round(elapsed, 3),
+        "spentToDate": round(float(spent.sum()), 2),
+        "forecast": round(float(forecast.sum()), 2),
+        "categories": rows,
+    }
+
+
+# ==================== ANOMALIES ====================
+
+def _group_medians(values: np.ndarray, groups: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of `values` per group code, from one lexsort"""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    low = starts + np.maximum(counts - 1, 0) // 2
+    high = starts + counts // 2
+    medians = np.full(len(counts), np.nan)
+    present = counts > 0
+    medians[present] = (ordered[low[present]] + ordered[high[present]]) / 2
+    return medians
+
+
+def amount_profiles(columns: UserColumns) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per category: (median log amount, robust scale, row count) - recomputed once per version"""
+    def build():
+        view = columns.view()
+        logs = np.log(np.maximum(view.amount, 0.01))
+        counts = np.bincount(view.category, minlength=len(columns.category_ids))
+        medians = _group_medians(logs, view.category, counts)
+        deviations = np.abs(logs - medians[view.category])
+        # 1.4826 * MAD estimates the standard deviation of normally distributed data
+        scales = np.maximum(1.4826 * _group_medians(deviations, view.category, counts), MIN_LOG_SCALE)
+        return medians, scales, counts
+    return columns.derived("amount_profiles", build)
+
+
+def find_anomalies(columns: UserColumns, transactions: Iterable[Transaction]) -> Dict[str, Dict[str, Any]]:
+    """id -> {score, typicalAmount} for transactions far outside their category's usual amounts"""
+    medians, scales, counts = amount_profiles(columns)
+    flagged = {}
+    for transaction in transactions:
+        code = columns.code_of(transaction.categoryId)
+        if code is None or counts[code] < MIN_ANOMALY_SAMPLES:
+            continue
+        score = abs(np.log(max(transaction.amount, 0.01)) - medians[code]) / scales[code]
+        if score > ANOMALY_THRESHOLD:
+            flagged[str(transaction.id)] = {
+                "score": round(float(score), 1),
+                "typicalAmount": round(float(np.exp(medians[code])), 2),
+            }
+    return flagged
@@ -0,0 +1,343 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional
+
+# Normalized statement row:
+#   {"date": date, "amount": float (signed, + is money in), "description": str,
+#    "reference": Optional[str], "upi_reference": Optional[str]}
+StatementRow = Dict[str, Any]
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_UPI_REFERENCE = re.compile(r"\bUPI[-/: ]*(\d{12})\b", re.IGNORECASE)
+
+
+# ==================== HELPERS ====================
+
+class DateParser:
+    """
+    Parses statement dates, remembering the format that last worked
+    Statements use one format throughout, so after the first row this is a single strptime
+    """
+
+    DAY_FIRST = [
+        "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y",
+        "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%d/%b/%Y",
+    ]
+    MONTH_FIRST = ["%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y", "%b %d, %Y"]
+    ISO = ["%Y-%m-%d", "%Y/%m/%d", "%Y%m%d"]
+
+    def __init__(self, day_first: bool = True):
+        preferred = self.DAY_FIRST if day_first else self.MONTH_FIRST
+        fallback = self.MONTH_FIRST if day_first else self.DAY_FIRST
+        self.formats = self.ISO + preferred + fallback
+        self._last: Optional[str] = None
+
+    def __call__(self, value: str) -> Optional[date]:
+        value = value.strip().replace("'", "/")
+        if not value:
+            return None
+        # Drop time parts: "31/01/2024 10:15", "2024-01-31T10:15:00"
+        value = re.split(r"[ T](?=\d{1,2}:)", value, maxsplit=1)[0]
+        if self._last:
+            try:
+                return datetime.strptime(value, self._last).date()
+            except ValueError:
+                pass
+        for fmt in self.formats:
+            try:
+                parsed = datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+            self._last = fmt
+            return parsed
+        return None
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """'1,234.50', '(45.00)', '45.00 Dr', '₹ 99' -> float; blanks -> None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    upper = text.upper()
+    if upper.endswith("DR"):
+        negative, text = True, text[:-2]
+    elif upper.endswith("CR"):
+        text = text[:-2]
+    text = re.sub(r"[^\d.\-]", "", text)
+    if text in ("", "-", ".", "-."):
+        return None
+    try:
+        amount = float(text)
+    except ValueError:
+        return None
+    return -abs(amount) if negative else amount
+
+
+def upi_reference(*texts: Optional[str]) -> Optional[str]:
+    """12-digit UPI reference embedded in a narration, if any"""
+    for text in texts:
+        if text:
+            match = _UPI_REFERENCE.search(text)
+            if match:
+                return match.group(1)
+    return None
+
+
+def statement_reference(value: Optional[str]) -> Optional[str]:
+    """
+    Reference / cheque number, or None for the fillers banks repeat on every row
+    (0000000000000000, "-", "NA") - those would make distinct rows look like duplicates
+    """
+    value = (value or "").strip()
+    if not value.strip("0") or not any(char.isdigit() for char in value):
+        return None
+    return value
+
+
+def iter_text_chunks(stream: IO[bytes], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """Decode a binary stream piece by piece - the file is never read whole"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    while True:
+        chunk = text.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+    text.detach()
+
+
+# ==================== CSV ====================
+
+_CSV_COLUMNS = {
+    "date": ("date", "txndate", "transactiondate", "trandate", "valuedate", "postingdate", "postdate"),
+    "description": ("description", "narration", "particulars", "details", "remarks", "transactiondetails", "payee", "memo"),
+    "debit": ("debit", "debitamount", "withdrawal", "withdrawals", "withdrawalamt", "withdrawalamount", "dr"),
+    "credit": ("credit", "creditamount", "deposit", "deposits", "depositamt", "depositamount", "cr"),
+    "amount": ("amount", "transactionamount", "amt"),
+    "reference": ("reference", "referencenumber", "refno", "chqrefno", "chequeno", "chqno", "utr", "referenceno"),
+    "direction": ("drcr", "crdr", "type", "transactiontype"),
+}
+_HEADER_SCAN_LIMIT = 50
+
+
+def _normalize_header(value: str) -> str:
+    return re.sub(r"[^a-z]", "", value.lower())
+
+
+def _csv_header(row: List[str]) -> Optional[Dict[str, int]]:
+    """Column positions if `row` looks like a statement header"""
+    names = [_normalize_header(cell) for cell in row]
+    columns = {}
+    for key, aliases in _CSV_COLUMNS.items():
+        for position, name in enumerate(names):
+            if name in aliases:
+                columns[key] = position
+                break
+    if "date" in columns and ("amount" in columns or "debit" in columns or "credit" in columns):
+        return columns
+    return None
+
+
+def parse_csv(stream: IO[bytes], day_first: bool = True) -> Iterator[StatementRow]:
+    """
+    Bank CSV exports - header row is detected (banks prepend account details),
+    amounts come from debit/credit columns or a single signed amount column
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text)
+    parse_date = DateParser(day_first)
+
+    columns = None
+    for line_number, row in enumerate(reader):
+        columns = _csv_header(row)
+        if columns or line_number >= _HEADER_SCAN_LIMIT:
+            break
+    if not columns:
+        text.detach()
+        raise ValueError("Could not find a header row with date and amount columns")
+
+    def cell(row: List[str], key: str) -> Optional[str]:
+        position = columns.get(key)
+        return row[position] if position is not None and position < len(row) else None
+
+    for row in reader:
+        if not row or not any(row):
+            continue
+        transaction_date = parse_date(cell(row, "date") or "")
+        if transaction_date is None:
+            # Footer lines (totals, closing balance) have no date
+            continue
+
+        debit = parse_amount(cell(row, "debit"))
+        credit = parse_amount(cell(row, "credit"))
+        if debit or credit:
+            amount = (credit or 0.0) - abs(debit or 0.0)
+        else:
+            amount = parse_amount(cell(row, "amount"))
+            direction = (cell(row, "direction") or "").strip().upper()
+            if amount is not None and direction in ("DR", "DEBIT", "D", "WITHDRAWAL"):
+                amount = -abs(amount)
+        if not amount:
+            continue
+
+        description = (cell(row, "description") or "").strip()
+        reference = statement_reference(cell(row, "reference"))
+        yield {
+            "date": transaction_date,
+            "amount": amount,
+            "description": description,
+            "reference": reference,
+            "upi_reference": upi_reference(description, reference),
+        }
+    text.detach()
+
+
+# ==================== OFX ====================
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_row(fields: Dict[str, str], parse_date: DateParser) -> Optional[StatementRow]:
+    transaction_date = parse_date(fields.get("DTPOSTED", "")[:8])
+    amount = parse_amount(fields.get("TRNAMT"))
+    if transaction_date is None or not amount:
+        return None
+    name = fields.get("NAME", "").strip()
+    memo = fields.get("MEMO", "").strip()
+    description = name if not memo or memo == name else f"{name} - {memo}" if name else memo
+    reference = fields.get("REFNUM") or fields.get("CHECKNUM") or fields.get("FITID")
+    return {
+        "date": transaction_date,
+        "amount": amount,
+        "description": description,
+        "reference": statement_reference(reference),
+        "upi_reference": upi_reference(name, memo),
+    }
+
+
+def parse_ofx(stream: IO[bytes], day_first: bool = True) -> Iterator[StatementRow]:
+    """
+    OFX 1.x (SGML, unclosed leaf tags) and 2.x (XML) statements
+    Tags are tokenized from a rolling buffer so <STMTTRN> blocks may span read chunks
+    """
+    parse_date = DateParser(day_first)
+    fields: Optional[Dict[str, str]] = None
+    buffer = ""
+
+    for chunk in iter_text_chunks(stream):
+        buffer += chunk
+        # Only tokenize up to the last complete tag; keep the tail for the next chunk
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            continue
+        complete, buffer = buffer[:cut], buffer[cut:]
+        for closing, tag, value in _OFX_TAG.findall(complete):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if fields is not None:
+                    row = _ofx_row(fields, parse_date)
+                    if row:
+                        yield row
+                fields = None if closing else {}
+            elif fields is not None and not closing:
+                fields[tag] = value.strip()
+
+    for closing, tag, value in _OFX_TAG.findall(buffer):
+        if fields is not None and not closing and tag.upper() != "STMTTRN":
+            fields[tag.upper()] = value.strip()
+    if fields:
+        row = _ofx_row(fields, parse_date)
+        if row:
+            yield row
+
+
+# ==================== QIF ====================
+
+def parse_qif(stream: IO[bytes], day_first: bool = True) -> Iterator[StatementRow]:
+    """QIF bank/cash/card registers - one field per line, records end with '^'"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline=None)
+    parse_date = DateParser(day_first)
+    record: Dict[str, str] = {}
+
+    for line in text:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code != "^":
+            # First occurrence wins - split lines (S/E/$) repeat codes
+            record.setdefault(code, value)
+            continue
+
+        transaction_date = parse_date(record.get("D", ""))
+        amount = parse_amount(record.get("T") or record.get("U"))
+        if transaction_date is not None and amount:
+            payee = record.get("P", "")
+            memo = record.get("M", "")
+            description = payee if not memo or memo == payee else f"{payee} - {memo}" if payee else memo
+            # N is a cheque number or a register code (ATM, DEP, TXFR) repeated across rows
+            number = record.get("N", "")
+            yield {
+                "date": transaction_date,
+                "amount": amount,
+                "description": description,
+                "reference": statement_reference(number) if number.isdigit() else None,
+                "upi_reference": upi_reference(payee, memo),
+            }
+        record = {}
+    text.detach()
+
+
+STATEMENT_PARSERS: Dict[str, Callable[..., Iterator[StatementRow]]] = {
+    "csv": parse_csv,
+    "ofx": parse_ofx,
+    "qfx": parse_ofx,
+    "qif": parse_qif,
+}
+
+
+def detect_format(file_name: Optional[str]) -> Optional[str]:
+    """Statement format from the uploaded file's extension"""
+    if not file_name or "." not in file_name:
+        return None
+    extension = file_name.rsplit(".", 1)[1].lower()
+    return extension if extension in STATEMENT_PARSERS else None
+
+
+# ==================== MAPPING ====================
+
+def row_to_payload(
+    row: StatementRow,
+    expense_category_id: str,
+    income_category_id: Optional[str] = None,
+    account_id: Optional[str] = None,
+    currency: str = "INR",
+) -> Dict[str, Any]:
+    """Statement row -> TransactionCreate payload (aliased keys, as the UI sends them)"""
+    is_income = row["amount"] > 0
+    description = " ".join(row["description"].split())[:200]
+    if len(description) < 3:
+        description = "Imported transaction"
+    reference = row["reference"][:100] if row["reference"] else None
+    upi_reference = row["upi_reference"]
+
+    payload = {
+        "transactionType": "INCOME" if is_income else "EXPENSE",
+        "amount": round(abs(row["amount"]), 2),
+        "currency": currency,
+        "transactionDate": row["date"],
+        "categoryId": (income_category_id or expense_category_id) if is_income else expense_category_id,
+        "description": description,
+        "paymentMethod": "UPI" if upi_reference else "BANK_TRANSFER",
+        "referenceNumber": reference,
+        "upiTransactionId": upi_reference,
+        "tags": ["imported"],
+    }
+    if account_id:
+        payload["toAccountId" if is_income else "fromAccountId"] = account_id
+    return payload
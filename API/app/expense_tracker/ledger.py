@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateMany, UpdateOne
+
+from ..core.utils import utils
+from .archive import archived_segments
+from .models import Account, BalanceSnapshot, Transaction, TransactionType, TransferLeg
+from .signals import TransactionChange, transaction_changed
+
+# Money into the account named on the transaction / out of it
+INFLOW_TYPES = {TransactionType.INCOME, TransactionType.DEBT_RECEIVED, TransactionType.DEBT_COLLECTION}
+OUTFLOW_TYPES = {TransactionType.EXPENSE, TransactionType.DEBT_GIVEN, TransactionType.DEBT_REPAYMENT}
+
+
+def account_effects(transaction: Optional[Transaction]) -> Dict[str, float]:
+    """Balance change each account sees from one live transaction"""
+    effects: Dict[str, float] = defaultdict(float)
+    if transaction is None or transaction.is_deleted:
+        return effects
+
+    kind, amount = transaction.transaction_type, transaction.amount
+    if transaction.transfer_leg == TransferLeg.OUT:
+        # Linked transfer: each leg moves one account, the fee is its own EXPENSE leg
+        if transaction.from_account_id:
+            effects[transaction.from_account_id] -= amount
+    elif transaction.transfer_leg == TransferLeg.IN:
+        if transaction.to_account_id:
+            effects[transaction.to_account_id] += amount
+    elif kind == TransactionType.TRANSFER:
+        if transaction.from_account_id:
+            effects[transaction.from_account_id] -= amount + transaction.transfer_fee
+        if transaction.to_account_id:
+            effects[transaction.to_account_id] += amount
+    elif kind in INFLOW_TYPES:
+        account_id = transaction.to_account_id or transaction.from_account_id
+        if account_id:
+            effects[account_id] += amount
+    elif kind in OUTFLOW_TYPES:
+        account_id = transaction.from_account_id or transaction.to_account_id
+        if account_id:
+            effects[account_id] -= amount
+    return effects
+
+
+def ledger_deltas(changes: Iterable[TransactionChange]) -> Dict[Tuple[str, date], float]:
+    """Net balance change per (account, day) for a batch of writes"""
+    deltas: Dict[Tuple[str, date], float] = defaultdict(float)
+    for before, after in changes:
+        for transaction, sign in ((before, -1), (after, 1)):
+            for account_id, effect in account_effects(transaction).items():
+                deltas[(account_id, transaction.transaction_date)] += sign * effect
+    return {key: round(delta, 2) for key, delta in deltas.items() if round(delta, 2)}
+
+
+# ==================== POSTING ====================
+
+@transaction_changed.connect
+async def post_to_ledger(changes: List[TransactionChange], session=None, **kwargs):
+    """
+    $inc account balances and day snapshots for every write
+    Runs inside the caller's MongoDB transaction when one is open, so a transfer's
+    two balance moves and the transaction document commit together
+    """
+    deltas = ledger_deltas(changes)
+    if not deltas:
+        return
+
+    by_account: Dict[str, float] = defaultdict(float)
+    for (account_id, _), delta in deltas.items():
+        by_account[account_id] += delta
+
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"_id": ObjectId(account_id)},
+            {"$inc": {Account.balance: round(delta, 2)}, "$set": {Account.updated_at: now}},
+        )
+        for account_id, delta in by_account.items()
+        if ObjectId.is_valid(account_id) and round(delta, 2)
+    ]
+    if operations:
+        await Account.get_pymongo_collection().bulk_write(operations, ordered=False, session=session)
+
+    by_day: Dict[str, Dict[date, float]] = defaultdict(dict)
+    for (account_id, day), delta in deltas.items():
+        by_day[account_id][day] = delta
+    for account_id, days in by_day.items():
+        await _apply_snapshot_deltas(account_id, days, now, session)
+
+
+async def _apply_snapshot_deltas(account_id: str, days: Dict[date, float], now: datetime, session=None):
+    """
+    Shift the running totals from each day onwards; create missing day snapshots
+    One read and one ordered bulk_write per account, however many days the batch touches
+    """
+    collection = BalanceSnapshot.get_pymongo_collection()
+    account_filter = {BalanceSnapshot.account_id: account_id}
+    ordered_days = sorted(days)
+    first, last = utils.as_datetime(ordered_days[0]), utils.as_datetime(ordered_days[-1])
+
+    # Stored totals from the last snapshot before the first day up to the last day, newest first
+    stored: List[Tuple[datetime, float]] = []
+    cursor = collection.find(
+        {**account_filter, BalanceSnapshot.day: {"$lte": last}},
+        {BalanceSnapshot.day: 1, BalanceSnapshot.balance: 1},
+        sort=[(BalanceSnapshot.day, -1)],
+        session=session,
+    )
+    async for snapshot in cursor:
+        stored.append((snapshot[BalanceSnapshot.day], snapshot[BalanceSnapshot.balance]))
+        if snapshot[BalanceSnapshot.day] < first:
+            break
+    stored.reverse()
+
+    # A new day starts from the closing total of the snapshot before it
+    operations = []
+    existing = {day for day, _ in stored}
+    for day in ordered_days:
+        stored_day = utils.as_datetime(day)
+        if stored_day in existing:
+            continue
+        opening = next((balance for snapshot_day, balance in reversed(stored) if snapshot_day < stored_day), 0.0)
+        operations.append(UpdateOne(
+            {**account_filter, BalanceSnapshot.day: stored_day},
+            {"$setOnInsert": {BalanceSnapshot.balance: opening, BalanceSnapshot.change: 0.0}},
+            upsert=True,
+        ))
+    for day in ordered_days:
+        stored_day = utils.as_datetime(day)
+        operations.append(UpdateMany(
+            {**account_filter, BalanceSnapshot.day: {"$gte": stored_day}},
+            {"$inc": {BalanceSnapshot.balance: days[day]}},
+        ))
+        operations.append(UpdateOne(
+            {**account_filter, BalanceSnapshot.day: stored_day},
+            {"$inc": {BalanceSnapshot.change: days[day]}, "$set": {BalanceSnapshot.updated_at: now}},
+        ))
+    await collection.bulk_write(operations, ordered=True, session=session)
+
+
+# ==================== READS ====================
+
+async def balance_at(account: Account, on: date) -> float:
+    """
+    Account balance at the end of `on` - two indexed lookups, no history scan
+    Manual balance corrections count as having always been there
+    """
+    collection = BalanceSnapshot.get_pymongo_collection()
+    account_filter = {BalanceSnapshot.account_id: str(account.id)}
+    sort = [(BalanceSnapshot.day, -1)]
+
+    latest = await collection.find_one(account_filter, {BalanceSnapshot.balance: 1}, sort=sort)
+    if not latest:
+        return account.balance
+    at = await collection.find_one(
+        {**account_filter, BalanceSnapshot.day: {"$lte": utils.as_datetime(on)}},
+        {BalanceSnapshot.balance: 1},
+        sort=sort,
+    )
+    total_at = at[BalanceSnapshot.balance] if at else 0.0
+    return round(account.balance - latest[BalanceSnapshot.balance] + total_at, 2)
+
+
+# ==================== BACKFILL ====================
+
+async def rebuild_snapshots() -> int:
+    """Recompute every snapshot from transaction history, hot and archived (balances are left alone)"""
+    projection = {
+        field: 1
+        for field in (
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.transfer_fee,
+            Transaction.from_account_id,
+            Transaction.to_account_id,
+            Transaction.transaction_date,
+            Transaction.is_deleted,
+            Transaction.transfer_leg,
+        )
+    }
+    daily: Dict[str, Dict[date, float]] = defaultdict(lambda: defaultdict(float))
+    cursor = Transaction.get_pymongo_collection().find({Transaction.is_deleted: False}, projection)
+
+    def post(raw: dict):
+        transaction = Transaction.from_db(raw)
+        for account_id, effect in account_effects(transaction).items():
+            daily[account_id][transaction.transaction_date] += effect
+
+    async for raw in cursor:
+        post(raw)
+    async for _, segment, rows in archived_segments():
+        for raw in segment.documents(rows.tolist()):
+            post(raw)
+
+    now = datetime.utcnow()
+    operations = []
+    for account_id, days in daily.items():
+        running = 0.0
+        for day in sorted(days):
+            running = round(running + days[day], 2)
+            operations.append(InsertOne({
+                BalanceSnapshot.account_id: account_id,
+                BalanceSnapshot.day: utils.as_datetime(day),
+                BalanceSnapshot.balance: running,
+                BalanceSnapshot.change: round(days[day], 2),
+                BalanceSnapshot.updated_at: now,
+            }))
+
+    collection = BalanceSnapshot.get_pymongo_collection()
+    await collection.delete_many({})
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def _main():
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        written = await rebuild_snapshots()
+        print(f"Rebuilt {written} balance snapshots")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.ledger
+    argparse.ArgumentParser(description="Rebuild account balance snapshots from transactions").parse_args()
+    asyncio.run(_main())
@@ -1,9 +1,10 @@
 from datetime import datetime, date
-from typing import Optional, List, Literal
+from typing import Any, ClassVar, Dict, Optional, List, Literal
 from enum import Enum
 # from beanie import str
-from pydantic import Field, validator, BaseModel, EmailStr
-from ..database import BaseDocument
+from pydantic import Field, validator, BaseModel, EmailStr, model_serializer
+from pymongo import IndexModel
+from ..database import LIVE_FILTER, TOMBSTONE_FILTER, BaseDocument
 
 # ==================== ENUMS ====================
 
@@ -38,6 +39,19 @@ class RecurrenceFrequency(str, Enum):
     QUARTERLY = "QUARTERLY"
     YEARLY = "YEARLY"
 
+class TransferLeg(str, Enum):
+    """Role of a transaction inside a linked transfer"""
+    OUT = "OUT"
+    IN = "IN"
+    FEE = "FEE"
+
+class ImportStatus(str, Enum):
+    """Statement import job status"""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
 class AccountType(str, Enum):
     """Account types"""
     BANK = "BANK"
@@ -83,6 +97,9 @@ class RecurringConfig(BaseModel):
     end_date: Optional[date] = Field(None, alias="endDate")
     occurrences: Optional[int] = Field(None, ge=1)
     next_occurrence: Optional[date] = Field(None, alias="nextOccurrence")
+    # Maintained by the recurring scheduler
+    occurrence_count: int = Field(default=0, ge=0, alias="occurrenceCount")
+    completed_at: Optional[datetime] = Field(None, alias="completedAt")
     
     class Config:
         populate_by_name = True
@@ -210,6 +227,7 @@ class Transaction(BaseDocument):
     transfer_fee: float = Field(default=0.0, ge=0, alias="transferFee")
     create_linked_transactions: bool = Field(default=True, alias="createLinkedTransactions")
     linked_transaction_id: Optional[str] = Field(None, alias="linkedTransactionId")
+    transfer_leg: Optional[TransferLeg] = Field(None, alias="transferLeg")
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
@@ -217,6 +235,19 @@ class Transaction(BaseDocument):
     created_by: Optional[str] = Field(None, alias="createdBy")
     is_deleted: bool = Field(default=False, alias="isDeleted")
     is_duplicated: bool = Field(default=False, alias="isDuplicate")
+    idempotency_key: Optional[str] = Field(None, max_length=100, alias="idempotencyKey")
+    # Word prefixes for search - maintained on write, never sent to clients
+    search_tokens: List[str] = Field(default_factory=list, alias="searchTokens")
+
+    @model_serializer(mode="wrap")
+    def hide_search_tokens(self, handler, info):
+        """Drop search_tokens from JSON output - Beanie's encoder still stores them"""
+        data = handler(self)
+        if info.mode_is_json():
+            data.pop("searchTokens", None)
+            data.pop("search_tokens", None)
+        return data
+
     @validator('amount', 'transfer_fee')
     def validate_positive_amount(cls, v):
         """Ensure amounts are positive"""
@@ -252,6 +283,13 @@ class Transaction(BaseDocument):
         """Clean and lowercase tags"""
         return [tag.lower().strip() for tag in v if tag.strip()]
     
+    # Full indexes replaced by the partial live_* ones
+    legacy_indexes: ClassVar[List[str]] = [
+        "is_deleted_1",
+        "transaction_date_-1_created_at_-1",
+        "created_by_1_transaction_date_-1",
+    ]
+
     class Settings:
         name = "transactions"  # MongoDB collection name
         indexes = [
@@ -263,11 +301,41 @@ class Transaction(BaseDocument):
             "to_account_id",
             "contact_id",
             "payment_method",
-            [("transaction_date", -1), ("created_at", -1)],
-            [("created_by", 1), ("transaction_date", -1)],
             "is_recurring",
             "tags",
-            "is_deleted"
+            "linked_transaction_id",
+            # Hot read shapes all filter isDeleted: false - partial indexes leave tombstones out
+            # List pages: newest first
+            IndexModel([("transactionDate", -1), ("createdAt", -1)], name="live_date_created", partialFilterExpression=LIVE_FILTER),
+            # Per-user scans (analytics columns, suggestions, budgets) and advanced search keyset walks
+            IndexModel(
+                [("createdBy", 1), ("transactionDate", -1), ("_id", -1)],
+                name="live_owner_date_id",
+                partialFilterExpression=LIVE_FILTER,
+            ),
+            # Search: multikey index over word prefixes
+            IndexModel([("searchTokens", 1)], name="live_search_tokens", partialFilterExpression=LIVE_FILTER),
+            # Advanced search: a user's keyset walk within categories
+            IndexModel(
+                [("createdBy", 1), ("categoryId", 1), ("transactionDate", -1), ("_id", -1)],
+                name="live_owner_category_date_id",
+                partialFilterExpression=LIVE_FILTER,
+            ),
+            # Compaction: tombstones by deletion time
+            IndexModel([("updatedAt", 1)], name="tombstones_updated", partialFilterExpression=TOMBSTONE_FILTER),
+            # Debt aging: a user's unpaid debts per contact by due date
+            IndexModel([("createdBy", 1), ("contactId", 1), ("dueDate", 1), ("isPaid", 1)]),
+            # Recurring scheduler: due templates by next occurrence
+            IndexModel(
+                [("recurringConfig.nextOccurrence", 1), ("_id", 1)],
+                partialFilterExpression={"isRecurring": True},
+            ),
+            # Batch/sync clients retry safely - one document per key
+            IndexModel(
+                [("idempotencyKey", 1)],
+                unique=True,
+                partialFilterExpression={"idempotencyKey": {"$type": "string"}},
+            ),
         ]
     
     class Config:
@@ -284,6 +352,7 @@ class Budget(BaseDocument):
     spent: float = 0.0
     currency: str = "INR"
     is_active: bool = Field(default=True, alias="isActive")
+    created_by: Optional[str] = Field(None, alias="createdBy")
     created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
     updated_at: Optional[datetime] = Field(None, alias="updatedAt")
     
@@ -291,6 +360,7 @@ class Budget(BaseDocument):
         name = "budgets"
         indexes = [
             "categoryId",
+            IndexModel([("createdBy", 1), ("categoryId", 1)]),
             [("start_date", 1), ("end_date", 1)],
             "is_active"
         ]
@@ -298,6 +368,89 @@ class Budget(BaseDocument):
     class Config:
         populate_by_name = True
 
+class BalanceSnapshot(BaseDocument):
+    """
+    End-of-day running ledger total for one account
+    balance = sum of all transaction effects on the account up to and including `day`
+    """
+    account_id: str = Field(..., alias="accountId")
+    day: date
+    balance: float = 0.0
+    change: float = 0.0
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+
+    class Settings:
+        name = "account_balance_snapshots"
+        indexes = [
+            IndexModel([("accountId", 1), ("day", -1)], unique=True),
+        ]
+
+    class Config:
+        populate_by_name = True
+
+class TransactionRollup(BaseDocument):
+    """Monthly totals per (user, month, category, transaction type) - kept current by $inc deltas"""
+    user: str = ""
+    month: str  # YYYY-MM
+    categoryId: str = Field(..., alias="categoryId")
+    transaction_type: TransactionType = Field(..., alias="transactionType")
+    total: float = 0.0
+    transaction_count: int = Field(default=0, alias="count")
+    min_amount: Optional[float] = Field(None, alias="minAmount")
+    max_amount: Optional[float] = Field(None, alias="maxAmount")
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+
+    class Settings:
+        name = "transaction_rollups"
+        indexes = [
+            IndexModel(
+                [("user", 1), ("month", 1), ("categoryId", 1), ("transactionType", 1)],
+                unique=True,
+            ),
+            "month",
+        ]
+
+    class Config:
+        populate_by_name = True
+
+class ImportJob(BaseDocument):
+    """Statement import job - the UI polls it for progress"""
+    file_name: str = Field(..., alias="fileName")
+    format: str
+    status: ImportStatus = ImportStatus.PENDING
+    size_bytes: int = Field(default=0, alias="sizeBytes")
+    rows_read: int = Field(default=0, alias="rowsRead")
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    failed: int = 0
+    errors: List[str] = Field(default_factory=list)
+    created_by: Optional[str] = Field(None, alias="createdBy")
+    created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
+    started_at: Optional[datetime] = Field(None, alias="startedAt")
+    finished_at: Optional[datetime] = Field(None, alias="finishedAt")
+
+    class Settings:
+        name = "import_jobs"
+        indexes = ["status", [("createdBy", 1), ("createdAt", -1)]]
+
+    class Config:
+        populate_by_name = True
+
+class SchedulerLease(BaseDocument):
+    """Time-limited lock so only one worker runs a background job at a time"""
+    name: str
+    owner: str
+    expires_at: datetime = Field(..., alias="expiresAt")
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
+
+    class Settings:
+        name = "scheduler_leases"
+        indexes = [IndexModel([("name", 1)], unique=True)]
+
+    class Config:
+        populate_by_name = True
+
 # ==================== PYDANTIC SCHEMAS (API Request/Response) ====================
 
 class ApiResponse(BaseModel):
@@ -369,6 +522,7 @@ class TransactionCreate(BaseModel):
     transfer_fee: float = Field(default=0.0, alias="transferFee")
     create_linked_transactions: bool = Field(default=True, alias="createLinkedTransactions")
     is_duplicated : bool = Field(default=False, alias="isDuplicate")
+    idempotency_key: Optional[str] = Field(None, max_length=100, alias="idempotencyKey")
     # Add validator to convert empty strings to None
     @validator(
         'card_last_four_digits', 
@@ -409,6 +563,32 @@ class TransactionUpdate(BaseModel):
     class Config:
         populate_by_name = True
 
+class TransactionExportRequest(BaseModel):
+    """Export selection - explicit IDs, or the same filters as get_list"""
+    ids: List[str] = Field(default_factory=list)
+    transaction_type: Optional[TransactionType] = Field(None, alias="transactionType")
+    start_date: Optional[date] = Field(None, alias="startDate")
+    end_date: Optional[date] = Field(None, alias="endDate")
+    categoryId: Optional[str] = Field(None, alias="categoryId")
+    payment_method: Optional[PaymentMethod] = Field(None, alias="paymentMethod")
+    search: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+class TransactionBatchRequest(BaseModel):
+    """Schema for batch create - items are validated one by one so failures stay per-item"""
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+class BulkDeleteRequest(BaseModel):
+    """Schema for bulk soft delete"""
+    ids: List[str] = Field(..., min_length=1, max_length=5000)
+
+class BulkUpdateRequest(BaseModel):
+    """Schema for bulk update - same changes applied to every ID"""
+    ids: List[str] = Field(..., min_length=1, max_length=5000)
+    changes: TransactionUpdate
+
 class CategoryCreate(BaseModel):
     """Schema for creating categories"""
     name: str = Field(..., min_length=1, max_length=100)
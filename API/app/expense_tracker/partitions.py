@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+from beanie.odm.utils.dump import get_dict
+from pymongo import DeleteOne, IndexModel, ReplaceOne
+
+from ..core.config import TRANSACTION_PARTITIONS
+from ..database import LIVE_FILTER, MonthlyPartitions
+from .models import Transaction
+from .signals import TransactionChange, transaction_changed
+
+BACKFILL_BATCH_SIZE = 1000
+
+# The partitions are a read-side replica, not the write target. Ids, idempotency keys,
+# aggregates, archiving and the ledger all work against the one transactions collection,
+# and a unique index cannot span collections. Each write pays one extra upsert into a
+# month-sized collection, in the same MongoDB transaction; date-bounded list pages skip
+# every month outside their range. bench_partitions reports both, so the mode is only
+# worth turning on where range reads outweigh writes.
+
+# Every partition gets the live date-walk indexes; the global single-field ones are not repeated
+PARTITION_INDEXES = [
+    IndexModel([("transactionDate", -1), ("createdAt", -1)], name="live_date_created", partialFilterExpression=LIVE_FILTER),
+    IndexModel([("createdBy", 1), ("transactionDate", -1)], name="live_owner_date", partialFilterExpression=LIVE_FILTER),
+    IndexModel(
+        [("categoryId", 1), ("transactionDate", -1), ("_id", -1)],
+        name="live_category_date_id",
+        partialFilterExpression=LIVE_FILTER,
+    ),
+]
+
+
+def enable_partitions() -> MonthlyPartitions:
+    """
+    Mirror Transaction writes into monthly partitions, kept in step by transaction_changed
+    Date-bounded reads move over once backfill() has run
+    """
+    Transaction.partitions = MonthlyPartitions(Transaction, "transactionDate", PARTITION_INDEXES)
+    return Transaction.partitions
+
+
+if TRANSACTION_PARTITIONS:
+    enable_partitions()
+
+
+async def _apply(operations: Dict[str, List[Any]], session=None):
+    partitions = Transaction.partitions
+    for name, batch in operations.items():
+        collection = await partitions.ensure(name)
+        await collection.bulk_write(batch, ordered=False, session=session)
+
+
+@transaction_changed.connect
+async def route_to_partitions(changes: List[TransactionChange], session=None, **kwargs):
+    """Mirror each change into its month; a date moved across months leaves the old one"""
+    partitions = Transaction.partitions
+    if partitions is None:
+        return
+    operations: Dict[str, List[Any]] = defaultdict(list)
+    for before, after in changes:
+        target = partitions.name(after.transaction_date) if after is not None and after.id is not None else None
+        if before is not None and before.id is not None:
+            source = partitions.name(before.transaction_date)
+            if source != target:
+                operations[source].append(DeleteOne({"_id": before.id}))
+        if target:
+            operations[target].append(ReplaceOne({"_id": after.id}, get_dict(after, to_db=True), upsert=True))
+    await _apply(operations, session=session)
+
+
+async def store_raw(docs: Iterable[Dict[str, Any]]):
+    """Upsert raw documents written without transaction_changed (restores, backfill)"""
+    partitions = Transaction.partitions
+    if partitions is None:
+        return
+    operations: Dict[str, List[Any]] = defaultdict(list)
+    for doc in docs:
+        operations[partitions.name(doc[Transaction.transaction_date])].append(
+            ReplaceOne({"_id": doc["_id"]}, doc, upsert=True)
+        )
+    await _apply(operations)
+
+
+async def discard_raw(docs: Iterable[Dict[str, Any]]):
+    """Drop raw documents removed without transaction_changed (archiving)"""
+    partitions = Transaction.partitions
+    if partitions is None:
+        return
+    operations: Dict[str, List[Any]] = defaultdict(list)
+    for doc in docs:
+        operations[partitions.name(doc[Transaction.transaction_date])].append(DeleteOne({"_id": doc["_id"]}))
+    await _apply(operations)
+
+
+async def backfill() -> int:
+    """
+    Copy the whole collection into its monthly partitions, BACKFILL_BATCH_SIZE upserts at a time
+    Reads switch over to the partitions once this has finished
+    """
+    if Transaction.partitions is None:
+        enable_partitions()
+    written, batch = 0, []
+    async for doc in Transaction.get_pymongo_collection().find({}):
+        batch.append(doc)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            await store_raw(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        await store_raw(batch)
+        written += len(batch)
+    await Transaction.partitions.mark_ready()
+    return written
+
+
+async def _main():
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        written = await backfill()
+        print(f"Copied {written} transactions into {len(await Transaction.partitions.names())} partitions")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.partitions
+    parser = argparse.ArgumentParser(description="Build the monthly transaction partitions from the main collection")
+    parser.parse_args()
+    asyncio.run(_main())
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import calendar
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..core.utils import utils
+from .models import RecurrenceFrequency, SchedulerLease, Transaction, TransactionCreate
+from .services import create_transactions
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PAGE_SIZE = 200
+INSERT_BATCH_SIZE = 500
+# Occurrences one template may produce per regular tick; catch-up has no limit
+TICK_OCCURRENCE_LIMIT = 31
+LEASE_NAME = "recurring-transactions"
+
+# Not carried over from the template to its occurrences
+_INSTANCE_RESET = {
+    "transaction_id": None,
+    "is_recurring": False,
+    "recurring_config": None,
+    "is_duplicated": False,
+    "upi_transaction_id": None,
+    "cheque_number": None,
+    "reference_number": None,
+    "attachments": [],
+    "is_paid": False,
+}
+
+
+# ==================== SCHEDULE ====================
+
+def _add_months(start: date, months: int) -> date:
+    """Same day-of-month `months` later, clamped to the month's last day"""
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def occurrence_date(frequency: RecurrenceFrequency, start: date, n: int) -> Optional[date]:
+    """
+    Date of the n-th occurrence (0 = start)
+    Always counted from `start`, so the 31st stays the 31st after a short month
+    """
+    if frequency == RecurrenceFrequency.DAILY:
+        return start + timedelta(days=n)
+    if frequency == RecurrenceFrequency.WEEKLY:
+        return start + timedelta(weeks=n)
+    if frequency == RecurrenceFrequency.MONTHLY:
+        return _add_months(start, n)
+    if frequency == RecurrenceFrequency.QUARTERLY:
+        return _add_months(start, 3 * n)
+    if frequency == RecurrenceFrequency.YEARLY:
+        return _add_months(start, 12 * n)
+    return None
+
+
+def due_occurrences(
+    template: Transaction, today: date, limit: Optional[int] = None
+) -> Tuple[List[date], int, Optional[date]]:
+    """
+    Occurrences of `template` to materialize up to `today`
+    Returns (dates, new occurrence count, next occurrence - None once the series has ended)
+    Occurrences on or before the template's own date are covered by the template itself
+    """
+    config = template.recurring_config
+    n = config.occurrence_count
+    dates: List[date] = []
+    while True:
+        if config.occurrences is not None and n >= config.occurrences:
+            return dates, n, None
+        day = occurrence_date(config.frequency, config.start_date, n)
+        if day is None or (config.end_date and day > config.end_date):
+            return dates, n, None
+        if day > today or (limit is not None and len(dates) >= limit):
+            return dates, n, day
+        if day > template.transaction_date:
+            dates.append(day)
+        n += 1
+
+
+def instance_payload(template: Transaction, day: date) -> Dict[str, Any]:
+    """Create payload for one occurrence - the idempotency key makes re-runs harmless"""
+    data = {
+        name: getattr(template, name)
+        for name in TransactionCreate.model_fields
+        if hasattr(template, name)
+    }
+    data.update(_INSTANCE_RESET)
+    data["transaction_date"] = day
+    data["due_date"] = None
+    data["idempotency_key"] = f"recurring:{template.transaction_id or template.id}:{day.isoformat()}"
+    return data
+
+
+# ==================== MATERIALIZATION ====================
+
+def _due_filter(today: date) -> Dict[str, Any]:
+    return {
+        Transaction.is_recurring: True,
+        Transaction.is_deleted: False,
+        "recurringConfig.nextOccurrence": {"$lte": utils.as_datetime(today)},
+    }
+
+
+async def _initialize_templates() -> int:
+    """Give templates saved without a next occurrence their first one"""
+    templates = await Transaction.find_trusted({
+        Transaction.is_recurring: True,
+        Transaction.is_deleted: False,
+        "recurringConfig.frequency": {"$nin": [None, RecurrenceFrequency.NONE.value]},
+        "recurringConfig.nextOccurrence": None,
+        "recurringConfig.completedAt": None,
+    })
+    operations = [
+        UpdateOne(
+            {"_id": template.id, "recurringConfig.nextOccurrence": None},
+            {"$set": {"recurringConfig.nextOccurrence": utils.as_datetime(template.recurring_config.start_date)}},
+        )
+        for template in templates
+    ]
+    if operations:
+        await Transaction.get_pymongo_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def _flush(
+    payloads: List[Tuple[Optional[str], Dict[str, Any]]], advances: List[UpdateOne]
+) -> Tuple[int, int]:
+    """Insert queued occurrences, then move their templates forward - returns (created, advanced)"""
+    by_owner: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for owner, payload in payloads:
+        by_owner[owner].append(payload)
+
+    created = 0
+    for owner, items in by_owner.items():
+        for start in range(0, len(items), INSERT_BATCH_SIZE):
+            results = await create_transactions(items[start:start + INSERT_BATCH_SIZE], owner)
+            created += sum(1 for r in results if r["status"] == "created")
+            for result in results:
+                if result["status"] in ("invalid", "failed"):
+                    logger.error(f"Recurring occurrence not created: {result}")
+
+    advanced = 0
+    if advances:
+        # Compare-and-set on the occurrence count: a template advanced elsewhere is left alone
+        outcome = await Transaction.get_pymongo_collection().bulk_write(advances, ordered=False)
+        advanced = outcome.modified_count
+    payloads.clear()
+    advances.clear()
+    return created, advanced
+
+
+async def materialize_due(today: Optional[date] = None, catch_up: bool = False) -> Dict[str, int]:
+    """
+    Materialize every due occurrence of every recurring template
+    Regular ticks cap each template at TICK_OCCURRENCE_LIMIT occurrences so one long
+    backlog cannot hold up the rest - the remainder is picked up next tick.
+    `catch_up` drains the whole backlog in one run (after downtime)
+    """
+    today = today or date.today()
+    limit = None if catch_up else TICK_OCCURRENCE_LIMIT
+    stats = {"initialized": await _initialize_templates(), "templates": 0, "created": 0, "advanced": 0}
+
+    payloads: List[Tuple[Optional[str], Dict[str, Any]]] = []
+    advances: List[UpdateOne] = []
+    last_id = None
+    while True:
+        query = _due_filter(today)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        templates = await Transaction.find_trusted(query, sort=[("_id", 1)], limit=TEMPLATE_PAGE_SIZE)
+        if not templates:
+            break
+        last_id = templates[-1].id
+
+        for template in templates:
+            config = template.recurring_config
+            if config is None:
+                continue
+            days, count, next_day = due_occurrences(template, today, limit)
+            payloads.extend((template.created_by, instance_payload(template, day)) for day in days)
+
+            update: Dict[str, Any] = {
+                "recurringConfig.occurrenceCount": count,
+                "recurringConfig.nextOccurrence": utils.as_datetime(next_day),
+            }
+            if next_day is None:
+                update["recurringConfig.completedAt"] = datetime.utcnow()
+            advances.append(UpdateOne(
+                {"_id": template.id, "recurringConfig.occurrenceCount": config.occurrence_count},
+                {"$set": update},
+            ))
+            stats["templates"] += 1
+
+        if len(payloads) >= INSERT_BATCH_SIZE:
+            created, advanced = await _flush(payloads, advances)
+            stats["created"] += created
+            stats["advanced"] += advanced
+
+    created, advanced = await _flush(payloads, advances)
+    stats["created"] += created
+    stats["advanced"] += advanced
+    return stats
+
+
+# ==================== LEASE ====================
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def acquire_lease(name: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Take or renew the named lease - True when `owner` holds it for the next `ttl_seconds`
+    The unique name index turns a competing upsert into DuplicateKeyError
+    """
+    now = datetime.utcnow()
+    try:
+        lease = await SchedulerLease.get_pymongo_collection().find_one_and_update(
+            {
+                SchedulerLease.name: name,
+                "$or": [{SchedulerLease.owner: owner}, {SchedulerLease.expires_at: {"$lte": now}}],
+            },
+            {"$set": {
+                SchedulerLease.owner: owner,
+                SchedulerLease.expires_at: now + timedelta(seconds=ttl_seconds),
+                SchedulerLease.updated_at: now,
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False
+    return lease is not None and lease[SchedulerLease.owner] == owner
+
+
+async def release_lease(name: str, owner: str):
+    await SchedulerLease.get_pymongo_collection().update_one(
+        {SchedulerLease.name: name, SchedulerLease.owner: owner},
+        {"$set": {SchedulerLease.expires_at: datetime.utcnow()}},
+    )
+
+
+# ==================== SCHEDULER ====================
+
+async def run_scheduler(interval_seconds: int, catch_up: bool = True):
+    """
+    Background loop started with the app - safe on several workers,
+    only the holder of the lease materializes. The first run catches up on downtime
+    """
+    owner = worker_id()
+    ttl = max(interval_seconds * 2, 60)
+    try:
+        while True:
+            try:
+                if await acquire_lease(LEASE_NAME, owner, ttl):
+                    stats = await materialize_due(catch_up=catch_up)
+                    catch_up = False
+                    if stats["created"]:
+                        logger.info(f"Recurring transactions: {stats}")
+            except Exception as e:
+                logger.error(f"Recurring scheduler run failed: {e}")
+            await asyncio.sleep(interval_seconds)
+    finally:
+        try:
+            await release_lease(LEASE_NAME, owner)
+        except Exception:
+            pass
+
+
+async def _main(catch_up: bool, today: Optional[date]):
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    owner = worker_id()
+    try:
+        if not await acquire_lease(LEASE_NAME, owner, 3600):
+            print("Another worker holds the scheduler lease - try again later")
+            return
+        stats = await materialize_due(today, catch_up=catch_up)
+        print(f"Materialized {stats['created']} occurrences from {stats['templates']} templates")
+    finally:
+        await release_lease(LEASE_NAME, owner)
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.recurring --catch-up
+    parser = argparse.ArgumentParser(description="Materialize due recurring transactions")
+    parser.add_argument("--catch-up", action="store_true", help="drain the whole backlog in one run")
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="run as of this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(_main(args.catch_up, args.today))
@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from ..core.utils import utils
+from .archive import archived_segments, grouped_totals
+from .models import Transaction, TransactionRollup, TransactionType, TransferLeg
+from .signals import TransactionChange, transaction_changed
+
+# (user, month, categoryId, transactionType)
+RollupKey = Tuple[str, str, str, str]
+
+
+def month_key(value: date) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """[first day, first day of next month) as datetimes - how dates are stored"""
+    year, number = int(month[:4]), int(month[5:7])
+    start = datetime(year, number, 1)
+    end = datetime(year + number // 12, number % 12 + 1, 1)
+    return start, end
+
+
+def rollup_key(transaction: Transaction) -> RollupKey:
+    return (
+        transaction.created_by or "",
+        month_key(transaction.transaction_date),
+        transaction.categoryId,
+        getattr(transaction.transaction_type, "value", transaction.transaction_type),
+    )
+
+
+def _counted(transaction: Optional[Transaction]) -> bool:
+    """Live and not the IN leg of a transfer - the OUT leg already carries the amount"""
+    return (
+        transaction is not None
+        and not transaction.is_deleted
+        and transaction.transfer_leg != TransferLeg.IN
+    )
+
+
+def _counted_filter() -> Dict[str, Any]:
+    """_counted() as a query"""
+    return {Transaction.is_deleted: False, Transaction.transfer_leg: {"$ne": TransferLeg.IN.value}}
+
+
+def _key_filter(key: RollupKey) -> Dict[str, Any]:
+    user, month, category_id, transaction_type = key
+    return {
+        TransactionRollup.user: user,
+        TransactionRollup.month: month,
+        TransactionRollup.categoryId: category_id,
+        TransactionRollup.transaction_type: transaction_type,
+    }
+
+
+# ==================== INCREMENTAL UPDATES ====================
+
+def rollup_deltas(changes: Iterable[TransactionChange]) -> Dict[RollupKey, Dict[str, Any]]:
+    """Net effect of a batch of writes on each rollup bucket"""
+    deltas: Dict[RollupKey, Dict[str, Any]] = {}
+
+    def bucket(key: RollupKey) -> Dict[str, Any]:
+        if key not in deltas:
+            deltas[key] = {"total": 0.0, "count": 0, "added": [], "removed": []}
+        return deltas[key]
+
+    for before, after in changes:
+        old = before if _counted(before) else None
+        new = after if _counted(after) else None
+        if old and new and old.amount == new.amount and rollup_key(old) == rollup_key(new):
+            continue
+        if old:
+            delta = bucket(rollup_key(old))
+            delta["total"] -= old.amount
+            delta["count"] -= 1
+            delta["removed"].append(old.amount)
+        if new:
+            delta = bucket(rollup_key(new))
+            delta["total"] += new.amount
+            delta["count"] += 1
+            delta["added"].append(new.amount)
+    return deltas
+
+
+@transaction_changed.connect
+async def update_rollups(changes: List[TransactionChange], session=None, **kwargs):
+    """Apply $inc deltas for every bucket touched by `changes`"""
+    deltas = rollup_deltas(changes)
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    operations = []
+    for key, delta in deltas.items():
+        update: Dict[str, Any] = {
+            "$inc": {
+                TransactionRollup.total: round(delta["total"], 2),
+                TransactionRollup.transaction_count: delta["count"],
+            },
+            "$set": {TransactionRollup.updated_at: now},
+        }
+        if delta["added"]:
+            update["$min"] = {TransactionRollup.min_amount: min(delta["added"])}
+            update["$max"] = {TransactionRollup.max_amount: max(delta["added"])}
+        operations.append(UpdateOne(_key_filter(key), update, upsert=True))
+    await TransactionRollup.get_pymongo_collection().bulk_write(
+        operations, ordered=False, session=session
+    )
+
+    # $min/$max cannot be undone - re-derive bounds where a removed amount was one
+    removed = {key: delta["removed"] for key, delta in deltas.items() if delta["removed"]}
+    if removed:
+        await _refresh_bounds(removed, session)
+
+
+async def _refresh_bounds(removed: Dict[RollupKey, List[float]], session=None):
+    collection = TransactionRollup.get_pymongo_collection()
+    cursor = collection.find({"$or": [_key_filter(key) for key in removed]}, session=session)
+
+    operations = []
+    async for rollup in cursor:
+        key = (
+            rollup[TransactionRollup.user],
+            rollup[TransactionRollup.month],
+            rollup[TransactionRollup.categoryId],
+            rollup[TransactionRollup.transaction_type],
+        )
+        amounts = removed.get(key, [])
+        if rollup.get(TransactionRollup.transaction_count, 0) <= 0:
+            operations.append(DeleteOne({"_id": rollup["_id"]}))
+            continue
+        low, high = rollup.get(TransactionRollup.min_amount), rollup.get(TransactionRollup.max_amount)
+        if low is None or high is None or min(amounts) <= low or max(amounts) >= high:
+            bounds = await _bucket_bounds(key, session)
+            operations.append(UpdateOne({"_id": rollup["_id"]}, {"$set": {
+                TransactionRollup.min_amount: bounds[0],
+                TransactionRollup.max_amount: bounds[1],
+            }}))
+    if operations:
+        await collection.bulk_write(operations, ordered=False, session=session)
+
+
+async def _bucket_bounds(key: RollupKey, session=None) -> Tuple[Optional[float], Optional[float]]:
+    """Min / max amount of one bucket, straight from transactions"""
+    user, month, category_id, transaction_type = key
+    start, end = month_bounds(month)
+    pipeline = [
+        {"$match": {
+            Transaction.created_by: user or {"$in": [None, ""]},
+            **_counted_filter(),
+            Transaction.categoryId: category_id,
+            Transaction.transaction_type: transaction_type,
+            Transaction.transaction_date: {"$gte": start, "$lt": end},
+        }},
+        {"$group": {"_id": None, "low": {"$min": "$amount"}, "high": {"$max": "$amount"}}},
+    ]
+    async for row in Transaction.aggregate(pipeline, session=session):
+        return row["low"], row["high"]
+    return None, None
+
+
+# ==================== READS ====================
+
+def split_range(
+    start_date: Optional[date], end_date: Optional[date]
+) -> Tuple[Optional[str], Optional[str], List[Tuple[date, date]]]:
+    """
+    Split [start_date, end_date] into whole months (served by rollups)
+    and partial edge spans (aggregated from transactions)
+    Returns (first whole month, last whole month, raw spans); None months are open-ended
+    """
+    spans: List[Tuple[date, date]] = []
+
+    if start_date is None or start_date.day == 1:
+        first_month = month_key(start_date) if start_date else None
+    else:
+        last_day = calendar.monthrange(start_date.year, start_date.month)[1]
+        month_end = date(start_date.year, start_date.month, last_day)
+        spans.append((start_date, min(month_end, end_date) if end_date else month_end))
+        first_month = month_key(month_end + timedelta(days=1))
+
+    if end_date is None:
+        last_month = None
+    elif end_date.day == calendar.monthrange(end_date.year, end_date.month)[1]:
+        last_month = month_key(end_date)
+    else:
+        month_start = end_date.replace(day=1)
+        last_month = month_key(month_start - timedelta(days=1))
+        if not spans or month_key(spans[0][0]) != month_key(end_date):
+            spans.append((max(month_start, start_date) if start_date else month_start, end_date))
+
+    if first_month and last_month and first_month > last_month:
+        first_month = last_month = ""  # no whole months in range
+    return first_month, last_month, spans
+
+
+async def rollup_totals(
+    user: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    transaction_type: Optional[TransactionType] = None,
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Totals per (categoryId, transactionType) for a user and date range
+    Reads a handful of rollup rows plus at most two partial months of transactions
+    """
+    first_month, last_month, spans = split_range(start_date, end_date)
+    totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def merge(category_id, kind, total, count, low, high):
+        row = totals.setdefault((category_id, kind), {"total": 0.0, "count": 0, "min": None, "max": None})
+        row["total"] += total
+        row["count"] += count
+        if low is not None:
+            row["min"] = low if row["min"] is None else min(row["min"], low)
+        if high is not None:
+            row["max"] = high if row["max"] is None else max(row["max"], high)
+
+    if first_month != "":
+        query: Dict[str, Any] = {TransactionRollup.user: user, TransactionRollup.transaction_count: {"$gt": 0}}
+        months: Dict[str, str] = {}
+        if first_month:
+            months["$gte"] = first_month
+        if last_month:
+            months["$lte"] = last_month
+        if months:
+            query[TransactionRollup.month] = months
+        if transaction_type:
+            query[TransactionRollup.transaction_type] = transaction_type.value
+        async for rollup in TransactionRollup.get_pymongo_collection().find(query):
+            merge(
+                rollup[TransactionRollup.categoryId],
+                rollup[TransactionRollup.transaction_type],
+                rollup.get(TransactionRollup.total, 0.0),
+                rollup.get(TransactionRollup.transaction_count, 0),
+                rollup.get(TransactionRollup.min_amount),
+                rollup.get(TransactionRollup.max_amount),
+            )
+
+    for span_start, span_end in spans:
+        match: Dict[str, Any] = {
+            Transaction.created_by: user,
+            **_counted_filter(),
+            Transaction.transaction_date: {
+                "$gte": utils.as_datetime(span_start),
+                "$lte": utils.as_datetime(span_end),
+            },
+        }
+        if transaction_type:
+            match[Transaction.transaction_type] = transaction_type.value
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"category": f"${Transaction.categoryId}", "type": f"${Transaction.transaction_type}"},
+                "total": {"$sum": "$amount"},
+                "count": {"$sum": 1},
+                "low": {"$min": "$amount"},
+                "high": {"$max": "$amount"},
+            }},
+        ]
+        async for row in Transaction.aggregate(pipeline):
+            merge(row["_id"]["category"], row["_id"]["type"], row["total"], row["count"], row["low"], row["high"])
+
+    return totals
+
+
+# ==================== REBUILD ====================
+
+BucketStats = Tuple[float, int, float, float]  # total, count, min, max
+
+
+def _merge_stats(current: Optional[BucketStats], total: float, count: int, low: float, high: float) -> BucketStats:
+    if current is None:
+        return total, count, low, high
+    return current[0] + total, current[1] + count, min(current[2], low), max(current[3], high)
+
+
+async def archived_buckets() -> Dict[str, Dict[RollupKey, BucketStats]]:
+    """Counted rows of the cold archive as rollup buckets, by month"""
+    months: Dict[str, Dict[RollupKey, BucketStats]] = {}
+    async for user, segment, rows in archived_segments():
+        rows = rows[segment.counted[rows]]
+        for (month, category_id, kind), total, count, low, high in grouped_totals(
+            segment, rows, ("month", "category", "type")
+        ):
+            buckets = months.setdefault(month, {})
+            key = (user, month, category_id, kind)
+            buckets[key] = _merge_stats(buckets.get(key), total, count, low, high)
+    return months
+
+
+async def rebuild_month(
+    month: str, started: datetime, archived: Optional[Dict[RollupKey, BucketStats]] = None
+) -> int:
+    """Recompute every bucket of one month from transactions, plus its `archived` buckets"""
+    start, end = month_bounds(month)
+    pipeline = [
+        {"$match": {
+            **_counted_filter(),
+            Transaction.transaction_date: {"$gte": start, "$lt": end},
+        }},
+        {"$group": {
+            "_id": {
+                "user": {"$ifNull": [f"${Transaction.created_by}", ""]},
+                "category": f"${Transaction.categoryId}",
+                "type": f"${Transaction.transaction_type}",
+            },
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+            "low": {"$min": "$amount"},
+            "high": {"$max": "$amount"},
+        }},
+    ]
+    buckets: Dict[RollupKey, BucketStats] = dict(archived or {})
+    async for row in Transaction.aggregate(pipeline):
+        key = (row["_id"]["user"], month, row["_id"]["category"], row["_id"]["type"])
+        buckets[key] = _merge_stats(buckets.get(key), row["total"], row["count"], row["low"], row["high"])
+    operations = [
+        ReplaceOne(_key_filter(key), {
+            **_key_filter(key),
+            TransactionRollup.total: round(total, 2),
+            TransactionRollup.transaction_count: count,
+            TransactionRollup.min_amount: low,
+            TransactionRollup.max_amount: high,
+            TransactionRollup.updated_at: started,
+        }, upsert=True)
+        for key, (total, count, low, high) in buckets.items()
+    ]
+    if operations:
+        await TransactionRollup.get_pymongo_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def rebuild_rollups(workers: int = 8) -> int:
+    """
+    Backfill rollups from raw history, hot and archived - months are rebuilt concurrently,
+    `workers` at a time. Buckets not written by this run (or by live writes since it started)
+    are removed
+    """
+    collection = Transaction.get_pymongo_collection()
+    live = _counted_filter()
+    first = await collection.find_one(live, {Transaction.transaction_date: 1}, sort=[(Transaction.transaction_date, 1)])
+    last = await collection.find_one(live, {Transaction.transaction_date: 1}, sort=[(Transaction.transaction_date, -1)])
+
+    started = datetime.utcnow()
+    archived = await archived_buckets()
+    months: List[str] = []
+    if first and last:
+        cursor = first[Transaction.transaction_date].replace(day=1)
+        while cursor <= last[Transaction.transaction_date]:
+            months.append(month_key(cursor))
+            cursor = month_bounds(month_key(cursor))[1]
+    months = sorted(set(months) | set(archived))
+
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(month: str) -> int:
+        async with semaphore:
+            return await rebuild_month(month, started, archived.get(month))
+
+    written = sum(await asyncio.gather(*(run(month) for month in months)))
+    await TransactionRollup.get_pymongo_collection().delete_many(
+        {TransactionRollup.updated_at: {"$lt": started}}
+    )
+    return written
+
+
+async def _main(workers: int):
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        written = await rebuild_rollups(workers)
+        print(f"Rebuilt {written} rollup rows")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.rollups --workers 8
+    parser = argparse.ArgumentParser(description="Rebuild transaction rollups from raw history")
+    parser.add_argument("--workers", type=int, default=8, help="months rebuilt concurrently")
+    asyncio.run(_main(parser.parse_args().workers))
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional, List
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, File, Form, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Literal
+from bson import ObjectId
+import shutil
+import tempfile
 from ..core.utils import utils
 
 # from beanie import str
@@ -11,8 +15,13 @@ from ..expense_tracker.models import (
     Contact,
     Budget,
     UpiProvider,
+    ImportJob,
     TransactionCreate,
     TransactionUpdate,
+    TransactionExportRequest,
+    TransactionBatchRequest,
+    BulkDeleteRequest,
+    BulkUpdateRequest,
     CategoryCreate,
     AccountCreate,
     ContactCreate,
@@ -20,11 +29,47 @@ from ..expense_tracker.models import (
     FilterOptions,
     TransactionType,
     PaymentMethod,
+    TransferLeg,
 )
+from ..categories.cache import category_cache
 from ..auth.dependencies import get_current_user  # Reuse your auth
+from ..core.responses import FastJSONResponse, api_response
+from .exporters import (
+    EXPORT_COLUMNS,
+    EXPORT_ENCODERS,
+    NameLookup,
+    export_projection,
+    stream_export,
+)
+from .rollups import rollup_totals
+from .ledger import balance_at
+from .debts import debt_aging
+from .settlements import SELF, settlement_cache
+from .search import query_terms, relevance_stages, search_filter
+from .suggest import suggestion_cache
+from .filters import KEYSET_SORT, after_cursor, compile_filters, compile_mask, cursor_filter, encode_cursor
+from .facets import column_facets, count_facets, facet_cache, page_with_facets
+from .timeseries import timeseries
+from .columns import column_cache
+from .forecast import find_anomalies, forecast_month
+from .archive import find_archived, restore_transactions
+from . import budgets  # noqa: F401 - connects budget tracking to transaction_changed
+from . import partitions  # noqa: F401 - keeps the monthly partitions in step when enabled
+from .importers import READ_CHUNK_SIZE, STATEMENT_PARSERS, detect_format
+from .services import (
+    create_transactions,
+    ids_filter,
+    insert_transaction,
+    patch_transactions,
+    run_import,
+    save_transaction_update,
+    soft_delete_transactions,
+)
 from datetime import datetime
 
 router = APIRouter()
+
+EXPORT_CHUNK_SIZE = 1000
 # utils = Utils()
 # ==================== TRANSACTION ENDPOINTS ====================
 
@@ -59,11 +104,12 @@ async def save_transaction(data: TransactionCreate):
 
             # ✅ CORRECT WAY: Use constructor + insert
             transaction = Transaction(**transaction_data)
-            await transaction.insert()
+            # A TRANSFER is written as its linked OUT / IN / FEE legs; the OUT leg is returned
+            await insert_transaction(transaction)
 
-            return ApiResponse(
+            return api_response(
                 success=True,
-                data=transaction.model_dump(by_alias=True, mode="json"),
+                data=transaction,
                 message="Transaction created successfully",
             )
 
@@ -104,11 +150,12 @@ async def save_transaction(data: TransactionCreate):
 
             # ✅ CORRECT WAY: Use constructor + insert
             transaction = Transaction(**transaction_data)
-            await transaction.insert()
+            # A TRANSFER is written as its linked OUT / IN / FEE legs; the OUT leg is returned
+            await insert_transaction(transaction)
 
-            return ApiResponse(
+            return api_response(
                 success=True,
-                data=transaction.model_dump(by_alias=True, mode="json"),
+                data=transaction,
                 message="Transaction duplicated successfully",
             )
 
@@ -131,16 +178,13 @@ async def save_transaction(data: TransactionCreate):
             # Update timestamp
             transaction_data["updated_at"] = datetime.utcnow()
 
-            # Update fields
-            for key, value in transaction_data.items():
-                if hasattr(transaction, key):
-                    setattr(transaction, key, value)
+            # Update fields - validated like a new transaction; other legs of a transfer follow in the same write
+            update_data = {key: value for key, value in transaction_data.items() if key in Transaction.model_fields}
+            [change, *_] = await save_transaction_update(transaction, update_data)
 
-            await transaction.save()
-
-            return ApiResponse(
+            return api_response(
                 success=True,
-                data=transaction.model_dump(by_alias=True, mode="json"),
+                data=change.after,
                 message="Transaction updated successfully",
             )
 
@@ -151,18 +195,87 @@ async def save_transaction(data: TransactionCreate):
 
         print(f"Error in save_transaction: {str(e)}")
         print(traceback.format_exc())
-        return ApiResponse(
+        return api_response(
             success=False, errors=[str(e)], message="Failed to save transaction"
         )
 
 
+@router.post("/batch")
+async def batch_create_transactions(data: TransactionBatchRequest, current_user=Depends(get_current_user)):
+    """Create many transactions in one write - per-item status in data, partial failures allowed"""
+    try:
+        results = await create_transactions(data.items, str(current_user.id))
+        created = sum(1 for r in results if r["status"] == "created")
+        return api_response(
+            success=True,
+            data=results,
+            message=f"{created} of {len(results)} transactions created",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/import", status_code=202)
+async def import_statement(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    category_id: str = Form(..., alias="categoryId"),
+    income_category_id: Optional[str] = Form(None, alias="incomeCategoryId"),
+    account_id: Optional[str] = Form(None, alias="accountId"),
+    format: Optional[Literal["csv", "ofx", "qfx", "qif"]] = Form(None),
+    day_first: bool = Form(True, alias="dayFirst"),
+    current_user=Depends(get_current_user),
+):
+    """Start a CSV / OFX / QIF statement import - poll GET /import/{job_id} for progress"""
+    statement_format = format or detect_format(file.filename)
+    if statement_format not in STATEMENT_PARSERS:
+        raise HTTPException(status_code=400, detail="Unsupported statement format - use csv, ofx or qif")
+
+    try:
+        # The upload is closed when this request ends - copy it (chunked) for the background job
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{statement_format}") as target:
+            shutil.copyfileobj(file.file, target, READ_CHUNK_SIZE)
+            size_bytes = target.tell()
+
+        job = ImportJob(
+            file_name=file.filename or f"statement.{statement_format}",
+            format=statement_format,
+            size_bytes=size_bytes,
+            created_by=str(current_user.id),
+        )
+        await job.insert()
+
+        background_tasks.add_task(
+            run_import, job.id, target.name, category_id, income_category_id, account_id, day_first
+        )
+        return api_response(
+            success=True,
+            data=job,
+            message="Import started",
+            status_code=202,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/import/{job_id}")
+async def get_import_status(job_id: str, current_user=Depends(get_current_user)):
+    """Import job progress"""
+    job = await ImportJob.get(job_id) if ObjectId.is_valid(job_id) else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.created_by != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return api_response(success=True, data=job)
+
+
 # @router.get("/transactions/{transaction_id}")
 @router.get("/transactions/{transaction_id}")
 async def get_transaction(transaction_id: str):
     """Get single transaction by custom transaction_id"""
     try:
-        # Use find_one() for custom fields
-        transaction = await Transaction.find_one(
+        # Read-only - hydrate without re-validating what we stored
+        transaction = await Transaction.find_one_trusted(
             Transaction.transaction_id == transaction_id,
             Transaction.is_deleted == False
         )
@@ -174,9 +287,9 @@ async def get_transaction(transaction_id: str):
         # if transaction.created_by != str(current_user.id):
         #     raise HTTPException(status_code=403, detail="Not authorized")
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=transaction.model_dump(by_alias=True, mode='json'),
+            data=transaction,
             message="Transaction retrieved successfully"
         )
         
@@ -190,6 +303,58 @@ async def get_transaction(transaction_id: str):
 
 
 
+def _build_transaction_query(
+    transaction_type: Optional[TransactionType] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    categoryId: Optional[str] = None,
+    payment_method: Optional[PaymentMethod] = None,
+    search: Optional[str] = None,
+):
+    """Shared get_list / export filters - Beanie query builder"""
+    # Start with base query
+    query = Transaction.find(Transaction.is_deleted == False)
+
+    # Apply filters conditionally
+    if transaction_type:
+        query = query.find(Transaction.transaction_type == transaction_type)
+
+    if categoryId:
+        query = query.find(Transaction.categoryId == categoryId)
+
+    if payment_method:
+        query = query.find(Transaction.payment_method == payment_method)
+
+    # Date range filters
+    if start_date:
+        query = query.find(Transaction.transaction_date >= start_date)
+
+    if end_date:
+        query = query.find(Transaction.transaction_date <= end_date)
+
+    # Word-prefix search over description, notes, tags and category name (indexed)
+    terms = query_terms(search)
+    if terms:
+        query = query.find(search_filter(terms))
+
+    return query
+
+
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: Optional[Literal["description", "tag"]] = None,
+    limit: int = Query(10, ge=1, le=50),
+    current_user=Depends(get_current_user),
+):
+    """Typeahead for descriptions and tags - most used completions of `q` first"""
+    try:
+        suggestions = await suggestion_cache.suggest(str(current_user.id), q, limit, kind)
+        return api_response(data=suggestions)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # @router.get("/get_list")
 @router.get("/get_list")
 async def list_transactions(
@@ -201,61 +366,265 @@ async def list_transactions(
     categoryId: Optional[str] = None,
     payment_method: Optional[PaymentMethod] = None,
     search: Optional[str] = None,
+    facets: bool = Query(False),
+    anomalies: bool = Query(False),
+    current_user=Depends(get_current_user),
 ):
     """List transactions with filters - Beanie query builder"""
     try:
-        # Start with base query
-        query = Transaction.find(Transaction.is_deleted == False)
+        query = _build_transaction_query(
+            transaction_type, start_date, end_date, categoryId, payment_method, search
+        )
+        match = query.get_filter_query()
+
+        terms = query_terms(search)
+        if terms:
+            # Best matches first - whole-word hits outrank prefix-only hits
+            page_stages = [
+                *relevance_stages(terms),
+                {"$sort": {"searchScore": -1, Transaction.transaction_date: -1, Transaction.created_at: -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$project": {"searchScore": 0}},
+            ]
+        else:
+            page_stages = [
+                {"$sort": {Transaction.transaction_date: -1, Transaction.created_at: -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+            ]
+
+        facet_counts = facet_cache.get(match) if facets else None
+        if facets and facet_counts is None:
+            # Page, total and facet counts from one $facet aggregation
+            transactions, facet_counts, total = await page_with_facets(match, page_stages)
+            facet_cache.put(match, facet_counts, total)
+        else:
+            # Date-bounded pages read only the months in range when partitioned
+            partitions = Transaction.partitions if not terms and (start_date or end_date) else None
+            if partitions is not None and not await partitions.serves(match):
+                partitions = None
+            if facet_counts is not None:
+                facet_counts, total = facet_counts
+            elif partitions is not None:
+                total = await partitions.count(match)
+            else:
+                # Get total count before pagination
+                total = await query.count()
+
+            if terms:
+                pipeline = [{"$match": match}, *page_stages]
+                transactions = [
+                    Transaction.from_db(raw) async for raw in Transaction.aggregate(pipeline)
+                ]
+            elif partitions is not None:
+                raws = await partitions.find(
+                    match,
+                    sort=[(Transaction.transaction_date, -1), (Transaction.created_at, -1)],
+                    skip=skip,
+                    limit=limit,
+                )
+                transactions = [Transaction.from_db(raw) for raw in raws]
+            else:
+                # Apply sorting and pagination - trusted read, no per-row validation
+                transactions = await Transaction.find_trusted(
+                    query,
+                    sort=[-Transaction.transaction_date, -Transaction.created_at],
+                    skip=skip,
+                    limit=limit,
+                )
 
-        # Apply filters conditionally
-        if transaction_type:
-            query = query.find(Transaction.transaction_type == transaction_type)
+        # Unusual amounts for their category - only the caller's rows, judged against their own history
+        flagged = {}
+        if anomalies:
+            user = str(current_user.id)
+            owned = [transaction for transaction in transactions if transaction.created_by == user]
+            if owned:
+                flagged = find_anomalies(await column_cache.get(user), owned)
+
+        # Models are dumped straight to bytes by the response class
+        return api_response(
+            data=transactions,
+            pagination={
+                "total": total,
+                "skip": skip,
+                "limit": limit,
+                "pages": (total + limit - 1) // limit,
+            },
+            **({"facets": facet_counts} if facets else {}),
+            **({"anomalies": flagged} if anomalies else {}),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if categoryId:
-            query = query.find(Transaction.categoryId == categoryId)
 
-        if payment_method:
-            query = query.find(Transaction.payment_method == payment_method)
+@router.post("/search")
+async def search_transactions(
+    filters: FilterOptions,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    facets: bool = Query(False),
+    current_user=Depends(get_current_user),
+):
+    """
+    Advanced search over the current user's transactions - every FilterOptions field
+    compiled into one hinted query
+    Keyset paginated: pass back `nextCursor` for the following page.
+    `facets=true` adds per-facet counts for the whole filter, not just the page
+    """
+    try:
+        compiled = compile_filters(filters, str(current_user.id))
+        total = None
+        facet_counts = facet_cache.get(compiled.filter) if facets else None
+
+        if facets and facet_counts is None:
+            # Page and facet counts from one $facet aggregation
+            transactions, facet_counts, total = await page_with_facets(
+                compiled.filter,
+                [
+                    *([{"$match": cursor_filter(cursor)}] if cursor else []),
+                    {"$sort": dict(KEYSET_SORT)},
+                    {"$limit": limit + 1},
+                ],
+                hint=compiled.hint,
+            )
+            facet_cache.put(compiled.filter, facet_counts, total)
+        else:
+            if facet_counts is not None:
+                facet_counts, total = facet_counts
+            elif not cursor:
+                # Total only on the first page - later pages stay O(limit)
+                total = await Transaction.get_pymongo_collection().count_documents(
+                    compiled.filter, hint=compiled.hint
+                )
+            transactions = await Transaction.find_trusted(
+                after_cursor(compiled.filter, cursor),
+                sort=KEYSET_SORT,
+                limit=limit + 1,
+                hint=compiled.hint,
+            )
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
 
-        # Date range filters
-        if start_date:
-            query = query.find(Transaction.transaction_date >= start_date)
+        return api_response(
+            data=transactions,
+            pagination={
+                "total": total,
+                "limit": limit,
+                "hasMore": has_more,
+                "nextCursor": encode_cursor(transactions[-1]) if has_more else None,
+            },
+            **({"facets": facet_counts} if facets else {}),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if end_date:
-            query = query.find(Transaction.transaction_date <= end_date)
 
-        # Search in description (MongoDB regex)
-        if search:
-            from beanie.operators import RegEx
+@router.post("/search/facets")
+async def search_facets(
+    filters: FilterOptions,
+    current_user=Depends(get_current_user),
+):
+    """
+    Facet counts for the current user's transactions matching the filter
+    Counted from the analytics column cache; filters on accounts, status or text go to the database
+    """
+    try:
+        user = str(current_user.id)
+        columns = await column_cache.get(user)
+        mask = compile_mask(columns, filters)
+        if mask is not None:
+            facet_counts, total = column_facets(columns, mask)
+        else:
+            compiled = compile_filters(filters, user)
+            match = {
+                **compiled.filter,
+                Transaction.transfer_leg: {"$ne": TransferLeg.IN.value},
+            }
+            cached = facet_cache.get(match)
+            if cached is None:
+                cached = await count_facets(match, hint=compiled.hint)
+                facet_cache.put(match, *cached)
+            facet_counts, total = cached
+        return api_response(data=facet_counts, total=total)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-            query = query.find(RegEx(Transaction.description, search, "i"))
 
-        # Get total count before pagination
-        total = await query.count()
+@router.post("/export")
+async def export_transactions(
+    data: TransactionExportRequest,
+    format: Literal["csv", "ndjson", "xlsx", "excel"] = Query("csv"),
+    current_user=Depends(get_current_user),
+):
+    """Stream the caller's matching transactions as CSV, NDJSON or XLSX"""
+    try:
+        if data.ids:
+            filter_query = {
+                Transaction.is_deleted: False,
+                **ids_filter(data.ids),
+            }
+        else:
+            filter_query = _build_transaction_query(
+                data.transaction_type,
+                data.start_date,
+                data.end_date,
+                data.categoryId,
+                data.payment_method,
+                data.search,
+            ).get_filter_query()
+        # Only the caller's rows, whether picked by id or by filter
+        filter_query = {**filter_query, Transaction.created_by: str(current_user.id)}
+
+        # Raw projected cursor - rows are encoded as they arrive, never collected
+        cursor = (
+            Transaction.get_pymongo_collection()
+            .find(filter_query, export_projection())
+            .sort([(Transaction.transaction_date, -1), (Transaction.created_at, -1)])
+            .batch_size(EXPORT_CHUNK_SIZE)
+        )
+        encoder = EXPORT_ENCODERS[format](EXPORT_COLUMNS)
+        filename = f"transactions_{datetime.utcnow():%Y%m%d_%H%M%S}.{encoder.extension}"
 
-        # Apply sorting and pagination
-        transactions = (
-            await query.sort(-Transaction.transaction_date, -Transaction.created_at)
-            .skip(skip)
-            .limit(limit)
-            .to_list()
+        return StreamingResponse(
+            stream_export(cursor, encoder, NameLookup(), chunk_size=EXPORT_CHUNK_SIZE),
+            media_type=encoder.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Serialize transactions
-        transactions_data = [
-            t.model_dump(by_alias=True, mode="json") for t in transactions
-        ]
 
-        return {
-            "success": True,
-            "data": transactions_data,
-            "pagination": {
+@router.get("/archive")
+async def list_archived(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user=Depends(get_current_user),
+):
+    """The current user's archived transactions, newest first - read from the cold archive files"""
+    try:
+        transactions, total = await find_archived(str(current_user.id), start_date, end_date, skip, limit)
+        return api_response(
+            data=transactions,
+            pagination={
                 "total": total,
                 "skip": skip,
                 "limit": limit,
                 "pages": (total + limit - 1) // limit,
             },
-        }
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/archive/restore")
+async def restore_archived(data: BulkDeleteRequest, current_user=Depends(get_current_user)):
+    """Move archived transactions back to the hot collection so they can be edited"""
+    try:
+        restored = await restore_transactions(str(current_user.id), data.ids)
+        return api_response(data=restored, message=f"{len(restored)} transactions restored")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -267,6 +636,9 @@ async def update_transaction(
     """Update transaction - Django style"""
     try:
         transaction = await Transaction.get(str(transaction_id))
+        if not transaction and await restore_transactions(str(current_user.id), [transaction_id]):
+            # Archived - edits happen on the hot copy
+            transaction = await Transaction.get(str(transaction_id))
         if not transaction:
             raise HTTPException(status_code=404, detail="Transaction not found")
 
@@ -281,12 +653,14 @@ async def update_transaction(
         if "categoryId" in update_data and update_data["categoryId"]:
             update_data["categoryId"] = str(update_data["categoryId"])
 
-        # Django-style update
-        await transaction.update(**update_data)
+        update_data["updated_at"] = datetime.utcnow()
+
+        # Validated as a whole; document, other transfer legs, balances and aggregates move together
+        [change, *_] = await save_transaction_update(transaction, update_data)
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=transaction.dict(by_alias=True),
+            data=change.after,
             message="Transaction updated successfully",
         )
     except Exception as e:
@@ -301,19 +675,47 @@ async def delete_transaction(
 ):
     """Soft delete transaction"""
     try:
-        transaction = await Transaction.get(transaction_id)
-        if not transaction:
-            raise HTTPException(status_code=404, detail="Transaction not found")
-
         # Check ownership
         # if transaction.created_by != str(current_user.id):
         #     raise HTTPException(status_code=403, detail="Not authorized")
 
-        # Soft delete - Modify and save
-        transaction.is_deleted = True
-        await transaction.save()  # or await transaction.replace()
+        [result] = await soft_delete_transactions([transaction_id])
+        if result["status"] == "not_found":
+            raise HTTPException(status_code=404, detail="Transaction not found")
+
+        return api_response(success=True, message="Transaction deleted successfully")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_transactions(data: BulkDeleteRequest, current_user=Depends(get_current_user)):
+    """Soft delete many of the user's transactions in one write - per-ID status in data"""
+    try:
+        results = await soft_delete_transactions(data.ids, created_by=str(current_user.id))
+        deleted = sum(1 for r in results if r["status"] == "deleted")
+        return api_response(
+            success=True,
+            data=results,
+            message=f"{deleted} of {len(results)} transactions deleted",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-        return ApiResponse(success=True, message="Transaction deleted successfully")
+@router.post("/bulk-update")
+async def bulk_update_transactions(data: BulkUpdateRequest, current_user=Depends(get_current_user)):
+    """Apply the same changes to many of the user's transactions in one write - per-ID status in data"""
+    try:
+        results = await patch_transactions(data.ids, data.changes, created_by=str(current_user.id))
+        updated = sum(1 for r in results if r["status"] == "updated")
+        return api_response(
+            success=True,
+            data=results,
+            message=f"{updated} of {len(results)} transactions updated",
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -331,9 +733,9 @@ async def create_category(data: CategoryCreate, current_user=Depends(get_current
 
         category = await Category.objects.create(**category_data)
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=category.dict(by_alias=True),
+            data=category,
             message="Category created successfully",
         )
     except Exception as e:
@@ -353,7 +755,7 @@ async def list_categories(
 
         categories = await query.order_by("name").to_list()
 
-        return {"success": True, "data": categories}
+        return api_response(data=categories)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -371,10 +773,10 @@ async def get_category(categoryId: str, current_user=Depends(get_current_user)):
             parent_id=category.id, is_active=True
         ).to_list()
 
-        category_dict = category.dict(by_alias=True)
+        category_dict = category.model_dump(by_alias=True, mode="json")
         category_dict["subcategories"] = subcategories
 
-        return category_dict
+        return FastJSONResponse(category_dict)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -388,9 +790,9 @@ async def create_account(data: AccountCreate, current_user=Depends(get_current_u
     try:
         account = await Account.objects.create(**data.dict(by_alias=False))
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=account.dict(by_alias=True),
+            data=account,
             message="Account created successfully",
         )
     except Exception as e:
@@ -405,7 +807,7 @@ async def list_accounts(current_user=Depends(get_current_user)):
             await Account.objects.filter(is_active=True).order_by("name").to_list()
         )
 
-        return {"success": True, "data": accounts}
+        return api_response(data=accounts)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -418,7 +820,34 @@ async def get_account(account_id: str, current_user=Depends(get_current_user)):
         if not account:
             raise HTTPException(status_code=404, detail="Account not found")
 
-        return account
+        return FastJSONResponse(account)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/accounts/{account_id}/balance")
+async def get_account_balance(
+    account_id: str,
+    on: Optional[date] = None,
+    current_user=Depends(get_current_user),
+):
+    """Account balance now, or at the end of a given day"""
+    try:
+        account = await Account.get(str(account_id))
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+
+        balance = await balance_at(account, on) if on else account.balance
+        return api_response(
+            data={
+                "accountId": str(account.id),
+                "balance": balance,
+                "currency": account.currency,
+                "asOf": on,
+            },
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -435,9 +864,9 @@ async def update_account_balance(
 
         await account.update(balance=balance)
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=account.dict(by_alias=True),
+            data=account,
             message="Balance updated successfully",
         )
     except Exception as e:
@@ -453,9 +882,9 @@ async def create_contact(data: ContactCreate, current_user=Depends(get_current_u
     try:
         contact = await Contact.objects.create(**data.dict(by_alias=False))
 
-        return ApiResponse(
+        return api_response(
             success=True,
-            data=contact.dict(by_alias=True),
+            data=contact,
             message="Contact created successfully",
         )
     except Exception as e:
@@ -468,7 +897,55 @@ async def list_contacts(current_user=Depends(get_current_user)):
     try:
         contacts = await Contact.objects.all().order_by("name").to_list()
 
-        return {"success": True, "data": contacts}
+        return api_response(data=contacts)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/contacts/settlements")
+async def get_settlements(current_user=Depends(get_current_user)):
+    """Who owes whom across unsettled split transactions, as the fewest transfers"""
+    try:
+        settlements = await settlement_cache.get(str(current_user.id))
+
+        object_ids = [ObjectId(row["contactId"]) for row in settlements["balances"] if ObjectId.is_valid(row["contactId"])]
+        names = {
+            str(doc["_id"]): doc.get("name")
+            async for doc in Contact.get_pymongo_collection().find({"_id": {"$in": object_ids}}, {"name": 1})
+        }
+        names[SELF] = "You"
+
+        return api_response(
+            data={
+                "balances": [{**row, "name": names.get(row["contactId"])} for row in settlements["balances"]],
+                "transfers": [
+                    {**row, "fromName": names.get(row["from"]), "toName": names.get(row["to"])}
+                    for row in settlements["transfers"]
+                ],
+            },
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/contacts/debt-aging")
+async def get_debt_aging(
+    contact_id: Optional[str] = Query(None, alias="contactId"),
+    current_user=Depends(get_current_user),
+):
+    """Outstanding debts per contact in 0-30 / 31-60 / 61-90 / 90+ days overdue buckets"""
+    try:
+        aging = await debt_aging(str(current_user.id), contact_id)
+
+        object_ids = [ObjectId(row["contactId"]) for row in aging if ObjectId.is_valid(row["contactId"])]
+        names = {
+            str(doc["_id"]): doc.get("name")
+            async for doc in Contact.get_pymongo_collection().find({"_id": {"$in": object_ids}}, {"name": 1})
+        }
+        for row in aging:
+            row["name"] = names.get(row["contactId"])
+
+        return api_response(data=aging)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -484,7 +961,7 @@ async def list_upi_providers(current_user=Depends(get_current_user)):
             await UpiProvider.objects.filter(is_active=True).order_by("name").to_list()
         )
 
-        return {"success": True, "data": providers}
+        return api_response(data=providers)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -492,41 +969,69 @@ async def list_upi_providers(current_user=Depends(get_current_user)):
 # ==================== STATISTICS ENDPOINTS ====================
 
 
-@router.get("/stats/summary")
-async def get_summary(
+@router.get("/stats/timeseries")
+async def get_timeseries(
+    granularity: Literal["day", "week", "month"] = "month",
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    window: int = Query(3, ge=1, le=365),
+    top_categories: int = Query(10, ge=0, le=50),
     current_user=Depends(get_current_user),
 ):
-    """Get transaction summary statistics"""
+    """Income / expense series with rolling averages, changes, percentiles and category breakdown"""
     try:
-        query = Transaction.objects.filter(
-            created_by=str(current_user.id), is_deleted=False
+        series = await timeseries(
+            str(current_user.id), granularity, start_date, end_date, window, top_categories
         )
+        names = await category_cache.names()
+        for row in series.get("categories", []):
+            row["name"] = names.get(row["categoryId"])
+        return api_response(data=series)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-        if start_date:
-            query = query.filter(transaction_date__gte=start_date)
-        if end_date:
-            query = query.filter(transaction_date__lte=end_date)
+@router.get("/stats/forecast")
+async def get_forecast(
+    as_of: Optional[date] = None,
+    current_user=Depends(get_current_user),
+):
+    """Projected month-end spend per category from this month's pace and past months"""
+    try:
+        columns = await column_cache.get(str(current_user.id))
+        forecast = forecast_month(columns, as_of or date.today())
+        names = await category_cache.names()
+        for row in forecast["categories"]:
+            row["name"] = names.get(row["categoryId"])
+        return api_response(data=forecast)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        transactions = await query.to_list()
 
-        # Calculate statistics
+@router.get("/stats/summary")
+async def get_summary(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user=Depends(get_current_user),
+):
+    """Get transaction summary statistics - served from monthly rollups"""
+    try:
+        totals = await rollup_totals(str(current_user.id), start_date, end_date)
+
         total_income = sum(
-            t.amount
-            for t in transactions
-            if t.transaction_type == TransactionType.INCOME
+            row["total"]
+            for (_, transaction_type), row in totals.items()
+            if transaction_type == TransactionType.INCOME.value
         )
         total_expense = sum(
-            t.amount
-            for t in transactions
-            if t.transaction_type == TransactionType.EXPENSE
+            row["total"]
+            for (_, transaction_type), row in totals.items()
+            if transaction_type == TransactionType.EXPENSE.value
         )
-        total_transactions = len(transactions)
+        total_transactions = sum(row["count"] for row in totals.values())
 
-        return {
-            "success": True,
-            "data": {
+        return api_response(
+            data={
                 "totalIncome": total_income,
                 "totalExpense": total_expense,
                 "netSavings": total_income - total_expense,
@@ -535,7 +1040,7 @@ async def get_summary(
                     total_expense / total_transactions if total_transactions > 0 else 0
                 ),
             },
-        }
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -546,43 +1051,29 @@ async def get_category_stats(
     end_date: Optional[date] = None,
     current_user=Depends(get_current_user),
 ):
-    """Get spending by category"""
+    """Get spending by category - served from monthly rollups"""
     try:
-        query = Transaction.objects.filter(
-            created_by=str(current_user.id),
-            is_deleted=False,
-            transaction_type=TransactionType.EXPENSE,
+        totals = await rollup_totals(
+            str(current_user.id), start_date, end_date, TransactionType.EXPENSE
         )
 
-        if start_date:
-            query = query.filter(transaction_date__gte=start_date)
-        if end_date:
-            query = query.filter(transaction_date__lte=end_date)
-
-        transactions = await query.to_list()
-
-        # Group by category
-        category_totals = {}
-        for t in transactions:
-            cat_id = str(t.categoryId)
-            category_totals[cat_id] = category_totals.get(cat_id, 0) + t.amount
-
-        # Get category names
-        categories = await Category.objects.all().to_list()
-        category_map = {str(c.id): c.name for c in categories}
+        # Category and subcategory names from the per-worker cache
+        category_map = await category_cache.names()
 
         result = [
             {
                 "categoryId": cat_id,
                 "categoryName": category_map.get(cat_id, "Unknown"),
-                "amount": amount,
+                "amount": row["total"],
+                "count": row["count"],
+                "minAmount": row["min"],
+                "maxAmount": row["max"],
             }
-            for cat_id, amount in category_totals.items()
+            for (cat_id, _), row in totals.items()
         ]
 
-        return {
-            "success": True,
-            "data": sorted(result, key=lambda x: x["amount"], reverse=True),
-        }
+        return api_response(
+            data=sorted(result, key=lambda x: x["amount"], reverse=True),
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from ..categories.cache import category_cache
+from .models import Transaction
+
+# Fields that feed the token array
+SEARCH_FIELDS = ("description", "notes", "tags", "categoryId")
+
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+MAX_TOKENS = 400
+# Whole words are stored a second time behind this marker - exact hits rank first
+EXACT = "="
+REINDEX_BATCH_SIZE = 1000
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def words(*texts: Optional[str]) -> List[str]:
+    """Lowercased alphanumeric words, in order, without repeats"""
+    seen: Dict[str, None] = {}
+    for text in texts:
+        if text:
+            for word in _WORD.findall(text.lower()):
+                seen.setdefault(word, None)
+    return list(seen)
+
+
+def search_tokens(transaction: Transaction, category_name: Optional[str] = None) -> List[str]:
+    """
+    Token array stored on the transaction: every 2..20 character prefix of every word
+    in description, tags, category name and notes, plus "=word" for whole words
+    """
+    tokens: Dict[str, None] = {}
+    for word in words(transaction.description, " ".join(transaction.tags), category_name, transaction.notes):
+        tokens.setdefault(EXACT + word[:MAX_PREFIX], None)
+        for end in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+            tokens.setdefault(word[:end], None)
+        if len(tokens) >= MAX_TOKENS:
+            break
+    return list(tokens)[:MAX_TOKENS]
+
+
+def query_terms(search: Optional[str]) -> List[str]:
+    """Search box text -> prefix terms; one-letter words are ignored"""
+    return [word[:MAX_PREFIX] for word in words(search) if len(word) >= MIN_PREFIX]
+
+
+def search_filter(terms: List[str]) -> Dict[str, Any]:
+    """Every term must prefix some word - served by the multikey searchTokens index"""
+    return {Transaction.search_tokens: {"$all": terms}}
+
+
+def relevance_stages(terms: List[str]) -> List[Dict[str, Any]]:
+    """$addFields computing `searchScore` - whole-word hits count double a prefix hit"""
+    exact = [EXACT + term for term in terms]
+    return [{"$addFields": {"searchScore": {"$add": [
+        len(terms),
+        {"$size": {"$filter": {
+            "input": exact,
+            "as": "term",
+            "cond": {"$in": ["$$term", f"${Transaction.search_tokens}"]},
+        }}},
+    ]}}}]
+
+
+# ==================== MAINTENANCE ====================
+
+async def index_transactions(transactions: Iterable[Transaction]):
+    """Refresh search_tokens in place before the documents are written"""
+    names = await category_cache.names()
+    for transaction in transactions:
+        transaction.search_tokens = search_tokens(transaction, names.get(transaction.categoryId))
+
+
+def touches_search(fields: Iterable[str]) -> bool:
+    return any(field in SEARCH_FIELDS for field in fields)
+
+
+async def reindex(category_id: Optional[str] = None) -> int:
+    """
+    Recompute stored tokens - all transactions, or one category's after a rename
+    Streams the collection and writes REINDEX_BATCH_SIZE updates per bulk_write
+    """
+    names = await category_cache.names()
+    query: Dict[str, Any] = {}
+    if category_id:
+        query[Transaction.categoryId] = category_id
+    projection = {
+        field: 1
+        for field in (Transaction.description, Transaction.notes, Transaction.tags, Transaction.categoryId)
+    }
+
+    collection = Transaction.get_pymongo_collection()
+    written, operations = 0, []
+    async for raw in collection.find(query, projection):
+        transaction = Transaction.model_construct(
+            description=raw.get(Transaction.description) or "",
+            notes=raw.get(Transaction.notes),
+            tags=raw.get(Transaction.tags) or [],
+            categoryId=raw.get(Transaction.categoryId),
+        )
+        tokens = search_tokens(transaction, names.get(transaction.categoryId))
+        operations.append(UpdateOne({"_id": raw["_id"]}, {"$set": {Transaction.search_tokens: tokens}}))
+        if len(operations) >= REINDEX_BATCH_SIZE:
+            await collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+
+async def _main(category_id: Optional[str]):
+    from ..database import MongoDBManager
+    from ..models_list import models_list
+
+    await MongoDBManager.connect(list(dict.fromkeys(models_list)))
+    try:
+        written = await reindex(category_id)
+        print(f"Reindexed {written} transactions")
+    finally:
+        await MongoDBManager.close()
+
+
+if __name__ == "__main__":
+    # python -m API.app.expense_tracker.search
+    parser = argparse.ArgumentParser(description="Rebuild transaction search tokens")
+    parser.add_argument("--category", default=None, help="only this categoryId")
+    args = parser.parse_args()
+    asyncio.run(_main(args.category))
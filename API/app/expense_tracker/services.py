@@ -0,0 +1,811 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from beanie.odm.utils.encoder import Encoder
+from bson import ObjectId
+from pydantic import ValidationError
+from beanie.odm.utils.dump import get_dict
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..cloud_services.aws_services.dynamodb import TRANSACT_WRITE_LIMIT, BaseDynamoModel
+from ..core.utils import utils
+from ..database import MongoDBManager
+from .importers import STATEMENT_PARSERS, StatementRow, row_to_payload
+from .search import index_transactions, touches_search
+from .models import (
+    ImportJob,
+    ImportStatus,
+    Transaction,
+    TransactionCreate,
+    TransactionType,
+    TransactionUpdate,
+    TransferLeg,
+)
+from .signals import Signal, TransactionChange, transaction_changed, transaction_committed
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== LOOKUPS ====================
+
+def ids_filter(ids: List[str]) -> dict:
+    """Match UI ids - Mongo _id hex strings or our own transaction_id values"""
+    object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    return {
+        "$or": [
+            {"_id": {"$in": object_ids}},
+            {Transaction.transaction_id: {"$in": ids}},
+        ]
+    }
+
+
+async def load_by_ids(
+    ids: List[str], created_by: Optional[str] = None
+) -> Tuple[Dict[str, Transaction], List[Transaction]]:
+    """
+    Fetch live transactions for `ids` in one query - only `created_by`'s when given
+    Returns (lookup by both _id and transaction_id, documents)
+    """
+    query = {Transaction.is_deleted: False, **ids_filter(ids)}
+    if created_by is not None:
+        query[Transaction.created_by] = created_by
+    docs = await Transaction.find_trusted(query)
+    lookup = {}
+    for doc in docs:
+        lookup[str(doc.id)] = doc
+        if doc.transaction_id:
+            lookup[doc.transaction_id] = doc
+    return lookup, docs
+
+
+# ==================== TRANSFERS ====================
+
+# Copied to every leg of a transfer when one leg is edited
+SHARED_LEG_FIELDS = (
+    "transaction_date",
+    "currency",
+    "payment_method",
+    "from_account_id",
+    "notes",
+    "tags",
+    "is_paid",
+)
+# Copied between the OUT and IN legs only - the fee leg keeps its own
+TRANSFER_LEG_FIELDS = ("description", "to_account_id")
+
+
+def _new_leg(source: Transaction, **update) -> Transaction:
+    return source.model_copy(
+        update={
+            "id": PydanticObjectId(),
+            "transaction_id": utils.get_id(),
+            "create_linked_transactions": False,
+            # Only the OUT leg repeats; its occurrences bring their own legs
+            "is_recurring": False,
+            "recurring_config": None,
+            **update,
+        },
+        deep=True,
+    )
+
+
+def _fee_leg(out_leg: Transaction) -> Transaction:
+    return _new_leg(
+        out_leg,
+        transaction_type=TransactionType.EXPENSE,
+        amount=out_leg.transfer_fee,
+        transfer_fee=0.0,
+        to_account_id=None,
+        transfer_leg=TransferLeg.FEE,
+        linked_transaction_id=out_leg.transaction_id,
+        idempotency_key=None,
+        description=f"Transfer fee - {out_leg.description}"[:200],
+    )
+
+
+def build_transfer_legs(transfer: Transaction) -> List[Transaction]:
+    """
+    Split a TRANSFER into its OUT, IN and (when there is a fee) FEE legs
+    `transfer` becomes the OUT leg; the others link to its transaction_id
+    """
+    if transfer.id is None:
+        transfer.id = PydanticObjectId()
+    transfer.transfer_leg = TransferLeg.OUT
+    in_leg = _new_leg(
+        transfer,
+        transfer_leg=TransferLeg.IN,
+        linked_transaction_id=transfer.transaction_id,
+        idempotency_key=None,
+    )
+    transfer.linked_transaction_id = in_leg.transaction_id
+    legs = [transfer, in_leg]
+    if transfer.transfer_fee > 0:
+        legs.append(_fee_leg(transfer))
+    return legs
+
+
+def is_linked_transfer(transaction: Transaction) -> bool:
+    """New TRANSFER that should be written as linked legs"""
+    return (
+        transaction.transaction_type == TransactionType.TRANSFER
+        and transaction.create_linked_transactions
+        and transaction.transfer_leg is None
+    )
+
+
+def transfer_group(transaction: Optional[Transaction]) -> Optional[str]:
+    """transaction_id of the OUT leg, shared by every leg of one transfer"""
+    if transaction is None or transaction.transfer_leg is None:
+        return None
+    if transaction.transfer_leg == TransferLeg.OUT:
+        return transaction.transaction_id
+    return transaction.linked_transaction_id
+
+
+async def load_transfer_legs(groups: List[str]) -> Dict[str, List[Transaction]]:
+    """Live legs of these transfers in one query, by group"""
+    groups = [g for g in dict.fromkeys(groups) if g]
+    if not groups:
+        return {}
+    docs = await Transaction.find_trusted({
+        Transaction.is_deleted: False,
+        Transaction.transfer_leg: {"$ne": None},
+        "$or": [
+            {Transaction.transaction_id: {"$in": groups}},
+            {Transaction.linked_transaction_id: {"$in": groups}},
+        ],
+    })
+    legs: Dict[str, List[Transaction]] = {}
+    for doc in docs:
+        legs.setdefault(transfer_group(doc), []).append(doc)
+    return legs
+
+
+def leaves_transfer(transaction: Transaction) -> bool:
+    """An edited leg whose type no longer matches its role in the transfer"""
+    if transaction.transfer_leg is None:
+        return False
+    expected = TransactionType.EXPENSE if transaction.transfer_leg == TransferLeg.FEE else TransactionType.TRANSFER
+    return transaction.transaction_type != expected
+
+
+def detach_leg(transaction: Transaction) -> Transaction:
+    """Turn a leg into a standalone transaction"""
+    transaction.transfer_leg = None
+    transaction.linked_transaction_id = None
+    transaction.transfer_fee = 0.0
+    return transaction
+
+
+def sync_transfer_legs(
+    edited: Transaction, siblings: List[Transaction], now: Optional[datetime] = None
+) -> Tuple[List[TransactionChange], List[Transaction]]:
+    """
+    Bring the other legs in line with an edited one
+    Returns (changes to existing legs, legs to create)
+    Deleting the OUT or IN leg, or turning it into a non-transfer, removes the whole
+    transfer; a fee going to zero (or the FEE leg leaving) removes the fee from the rest
+    """
+    now = now or datetime.utcnow()
+    is_fee = edited.transfer_leg == TransferLeg.FEE
+    left = leaves_transfer(edited)
+    dissolve = not is_fee and (edited.is_deleted or left)
+
+    out_leg = edited if edited.transfer_leg == TransferLeg.OUT else next(
+        (s for s in siblings if s.transfer_leg == TransferLeg.OUT), None
+    )
+    if is_fee:
+        fee = 0.0 if edited.is_deleted or left else edited.amount
+    else:
+        fee = edited.transfer_fee
+    shared = {name: getattr(edited, name) for name in SHARED_LEG_FIELDS}
+    if not is_fee:
+        shared.update({name: getattr(edited, name) for name in TRANSFER_LEG_FIELDS})
+        shared["amount"] = edited.amount
+    shared["transfer_fee"] = fee
+
+    changes: List[TransactionChange] = []
+    has_fee_leg = False
+    for sibling in siblings:
+        if sibling.transfer_leg == TransferLeg.FEE:
+            has_fee_leg = True
+            if dissolve or fee <= 0:
+                update = {"is_deleted": True}
+            else:
+                update = {name: shared[name] for name in SHARED_LEG_FIELDS}
+                update["amount"] = fee
+        elif dissolve:
+            update = {"is_deleted": True}
+        else:
+            update = shared
+
+        if any(getattr(sibling, name) != value for name, value in update.items()):
+            after = sibling.model_copy(update={**update, "updated_at": now}, deep=True)
+            changes.append(TransactionChange(before=sibling, after=after))
+
+    created: List[Transaction] = []
+    if not dissolve and fee > 0 and not has_fee_leg and not is_fee and out_leg is not None:
+        source = next((c.after for c in changes if c.before is out_leg), out_leg)
+        created.append(_fee_leg(source))
+    return changes, created
+
+
+def _leg_operations(changes: List[TransactionChange], created: List[Transaction]) -> list:
+    """bulk_write operations storing synced legs"""
+    return [
+        ReplaceOne({"_id": change.after.id}, get_dict(change.after, to_db=True))
+        for change in changes
+    ] + [InsertOne(get_dict(leg, to_db=True)) for leg in created]
+
+
+# ==================== COMMIT ====================
+
+async def commit_changes(
+    changes: List[TransactionChange], write: Optional[Callable[[Any], Awaitable[Any]]] = None
+):
+    """
+    Run `write(session)` and the transaction_changed receivers in one MongoDB transaction
+    Retried as a whole when concurrent writes to the same account / rollup documents conflict,
+    so neither may mutate anything outside the database. In-memory caches hear about the
+    changes from transaction_committed, once the commit went through, followed by any
+    signals the receivers queued on `after_commit`. On DynamoDB the documents are put instead
+    """
+    if issubclass(Transaction, BaseDynamoModel):
+        # The model registry put Transaction on DynamoDB (IS_CLOUD)
+        await _transact_put([change.after for change in changes])
+        return
+
+    after_commit: List[Tuple[Signal, Dict[str, Any]]] = []
+
+    async def run(session):
+        # A retried attempt starts over - only the committed attempt's follow-ups go out
+        after_commit.clear()
+        if write is not None:
+            await write(session)
+        if session is None:
+            # Standalone server: the write above is already final, so it is reported as done;
+            # a failing aggregate receiver is logged (its rebuild CLI brings it back in line)
+            await transaction_changed.send_robust(changes=changes, session=None, after_commit=after_commit)
+        else:
+            await transaction_changed.send(changes=changes, session=session, after_commit=after_commit)
+
+    await MongoDBManager.run_transaction(run)
+    # Committed - a failing cache receiver is logged, never reported as a failed write
+    await transaction_committed.send_robust(changes=changes)
+    for signal, kwargs in after_commit:
+        await signal.send_robust(**kwargs)
+
+
+async def _transact_put(docs: List[Transaction]):
+    """
+    DynamoDB: store the written documents with TransactWriteItems, all or none per
+    TRANSACT_WRITE_LIMIT documents - a transfer's legs always fit in one request
+    The aggregates and caches fed by the signals are MongoDB-only
+    """
+    for start in range(0, len(docs), TRANSACT_WRITE_LIMIT):
+        await Transaction.transact_save(docs[start:start + TRANSACT_WRITE_LIMIT])
+
+
+async def insert_transaction(transaction: Transaction) -> List[Transaction]:
+    """
+    Insert a new transaction - a TRANSFER as all of its legs in one insert_many
+    Documents, balances and aggregates commit in one MongoDB transaction
+    """
+    legs = build_transfer_legs(transaction) if is_linked_transfer(transaction) else [transaction]
+    for leg in legs:
+        # Ids up front so transaction_changed receivers see them
+        if leg.id is None:
+            leg.id = PydanticObjectId()
+    await index_transactions(legs)
+
+    async def write(session):
+        await Transaction.insert_many(legs, session=session)
+
+    await commit_changes([TransactionChange(None, leg) for leg in legs], write)
+    return legs
+
+
+async def save_transaction_update(before: Transaction, update_data: Dict[str, Any]) -> List[TransactionChange]:
+    """
+    Validate and store an edit to one transaction; for a transfer leg the other legs
+    follow in the same bulk_write and MongoDB transaction
+    The edited document is changes[0].after
+    """
+    # Validators normalize values (tags, rounding) and check split totals, as patch_transactions does
+    after = Transaction.model_validate({**before.model_dump(), **update_data})
+    after.id = before.id
+    group = transfer_group(before)
+    leg_changes: List[TransactionChange] = []
+    created: List[Transaction] = []
+    if group:
+        legs = await load_transfer_legs([group])
+        siblings = [leg for leg in legs.get(group, []) if leg.id != after.id]
+        leg_changes, created = sync_transfer_legs(after, siblings)
+        if leaves_transfer(after):
+            detach_leg(after)
+
+    changes = [TransactionChange(before, after)] + leg_changes
+    changes += [TransactionChange(None, leg) for leg in created]
+    await index_transactions(change.after for change in changes)
+    operations: list = [ReplaceOne({"_id": after.id}, get_dict(after, to_db=True))]
+    operations += _leg_operations(leg_changes, created)
+
+    async def write(session):
+        await Transaction.get_pymongo_collection().bulk_write(operations, session=session)
+
+    await commit_changes(changes, write)
+    return changes
+
+
+# ==================== BULK OPERATIONS ====================
+
+async def soft_delete_transactions(ids: List[str], created_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Soft-delete many transactions with one update_many
+    The other legs of a deleted transfer follow in the same MongoDB transaction
+    Returns per-ID status: deleted | not_found (ids owned by someone other than `created_by` too)
+    """
+    ids = list(dict.fromkeys(ids))
+    lookup, docs = await load_by_ids(ids, created_by)
+
+    if docs:
+        now = datetime.utcnow()
+        changes = [
+            TransactionChange(
+                before=doc,
+                after=doc.model_copy(update={"is_deleted": True, "updated_at": now}),
+            )
+            for doc in docs
+        ]
+
+        # Per transfer, the OUT / IN leg decides over a FEE leg deleted alongside it
+        leg_changes: List[TransactionChange] = []
+        legs = await load_transfer_legs([transfer_group(doc) for doc in docs])
+        selected = {doc.id for doc in docs}
+        deciding: Dict[str, Transaction] = {}
+        for change in changes:
+            group = transfer_group(change.before)
+            if group in legs and (group not in deciding or deciding[group].transfer_leg == TransferLeg.FEE):
+                deciding[group] = change.after
+        for group, edited in deciding.items():
+            siblings = [leg for leg in legs[group] if leg.id not in selected]
+            group_changes, _ = sync_transfer_legs(edited, siblings, now)
+            leg_changes += group_changes
+
+        async def write(session):
+            collection = Transaction.get_pymongo_collection()
+            await collection.update_many(
+                {"_id": {"$in": list(selected)}, Transaction.is_deleted: False},
+                {"$set": {Transaction.is_deleted: True, Transaction.updated_at: now}},
+                session=session,
+            )
+            if leg_changes:
+                await collection.bulk_write(_leg_operations(leg_changes, []), session=session)
+
+        await commit_changes(changes + leg_changes, write)
+
+    return [
+        {"id": i, "status": "deleted" if i in lookup else "not_found"}
+        for i in ids
+    ]
+
+
+async def patch_transactions(
+    ids: List[str], patch: TransactionUpdate, created_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Apply the same partial update to many transactions with one update_many
+    Every patched document is validated before anything is written
+    Returns per-ID status: updated | not_found (ids owned by someone other than `created_by` too) | invalid
+    """
+    ids = list(dict.fromkeys(ids))
+    update_data = patch.model_dump(by_alias=False, exclude_unset=True)
+    lookup, docs = await load_by_ids(ids, created_by)
+
+    now = datetime.utcnow()
+    update_data["updated_at"] = now
+
+    valid: Dict[Any, TransactionChange] = {}
+    errors: Dict[Any, str] = {}
+    for doc in docs:
+        try:
+            after = Transaction.model_validate({**doc.model_dump(), **update_data})
+            after.id = doc.id
+            valid[doc.id] = TransactionChange(before=doc, after=after)
+        except Exception as e:
+            errors[doc.id] = str(e)
+
+    if valid:
+        # Validators can normalize values (tags, rounding) - write what the model produced
+        sample = next(iter(valid.values())).after
+        set_values = {
+            Transaction.model_fields[name].alias or name: getattr(sample, name)
+            for name in update_data
+        }
+
+        # Legs of patched transfers that were not patched themselves follow the first patched leg
+        changes = list(valid.values())
+        leg_changes: List[TransactionChange] = []
+        created: List[Transaction] = []
+        legs = await load_transfer_legs([transfer_group(c.before) for c in changes])
+        synced = set()
+        for change in changes:
+            group = transfer_group(change.before)
+            if group not in legs or group in synced:
+                continue
+            synced.add(group)
+            siblings = [leg for leg in legs[group] if leg.id not in valid]
+            group_changes, group_created = sync_transfer_legs(change.after, siblings, now)
+            leg_changes += group_changes
+            created += group_created
+
+        # Search tokens differ per document - one UpdateOne each when searchable fields change
+        token_updates = []
+        if touches_search(update_data):
+            await index_transactions(change.after for change in changes)
+            token_updates = [
+                UpdateOne({"_id": change.after.id}, {"$set": {Transaction.search_tokens: change.after.search_tokens}})
+                for change in changes
+            ]
+        await index_transactions(change.after for change in leg_changes)
+        await index_transactions(created)
+
+        detached = [c.after.id for c in changes if leaves_transfer(c.after)]
+        for change in changes:
+            if change.after.id in detached:
+                detach_leg(change.after)
+
+        async def write(session):
+            collection = Transaction.get_pymongo_collection()
+            await collection.update_many(
+                {"_id": {"$in": list(valid)}, Transaction.is_deleted: False},
+                {"$set": Encoder(to_db=True).encode(set_values)},
+                session=session,
+            )
+            if detached:
+                await collection.update_many(
+                    {"_id": {"$in": detached}},
+                    {"$set": {
+                        Transaction.transfer_leg: None,
+                        Transaction.linked_transaction_id: None,
+                        Transaction.transfer_fee: 0.0,
+                    }},
+                    session=session,
+                )
+            if token_updates or leg_changes or created:
+                await collection.bulk_write(token_updates + _leg_operations(leg_changes, created), session=session)
+
+        changes += leg_changes + [TransactionChange(None, leg) for leg in created]
+        await commit_changes(changes, write)
+
+    results = []
+    for i in ids:
+        doc = lookup.get(i)
+        if doc is None:
+            results.append({"id": i, "status": "not_found"})
+        elif doc.id in errors:
+            results.append({"id": i, "status": "invalid", "error": errors[doc.id]})
+        else:
+            results.append({"id": i, "status": "updated"})
+    return results
+
+
+# ==================== BATCH CREATE ====================
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _validation_errors(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in error.errors()
+    ]
+
+
+def new_transaction(payload: TransactionCreate, created_by: Optional[str] = None) -> Transaction:
+    """Build an unsaved Transaction from a create payload, with its _id assigned up front"""
+    data = payload.model_dump(by_alias=False, exclude_unset=True)
+    data.pop("is_duplicated", None)
+    data["transaction_id"] = utils.get_id()
+    data["created_at"] = datetime.utcnow()
+    data["is_deleted"] = False
+    if created_by:
+        data["created_by"] = created_by
+    transaction = Transaction(**data)
+    transaction.id = PydanticObjectId()
+    return transaction
+
+
+async def _existing_keys(keys: List[str]) -> Dict[str, dict]:
+    """Already-stored transactions for these idempotency keys"""
+    if not keys:
+        return {}
+    cursor = Transaction.get_pymongo_collection().find(
+        {Transaction.idempotency_key: {"$in": keys}},
+        {Transaction.transaction_id: 1, Transaction.idempotency_key: 1},
+    )
+    return {doc[Transaction.idempotency_key]: doc async for doc in cursor}
+
+
+def _duplicate(index: int, existing: Optional[dict]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "status": "duplicate",
+        "id": str(existing["_id"]) if existing else None,
+        "transactionId": existing.get(Transaction.transaction_id) if existing else None,
+    }
+
+
+async def _insert_documents(documents: List[Transaction]):
+    """
+    insert_many the documents with their aggregates in one commit_changes - all or none
+    A rejected document raises BulkWriteError with nothing stored
+    """
+
+    async def write(session):
+        try:
+            await Transaction.insert_many(documents, ordered=False, session=session)
+        except BulkWriteError:
+            if session is None:
+                # Standalone server: no rollback, so the accepted documents are removed by hand
+                await Transaction.get_pymongo_collection().delete_many(
+                    {"_id": {"$in": [doc.id for doc in documents]}}
+                )
+            raise
+
+    await commit_changes([TransactionChange(before=None, after=doc) for doc in documents], write)
+
+
+async def create_transactions(
+    items: List[Dict[str, Any]], created_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Validate and insert many new transactions with one insert_many, committed with their
+    aggregates; a rejected item is dropped and the rest retried
+    Items carrying an idempotencyKey that was already stored (or repeated in the batch)
+    are reported as duplicates instead of inserted again
+    Returns per-item status: created | duplicate | invalid | failed
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending: List[Tuple[int, Transaction]] = []
+    first_by_key: Dict[str, int] = {}
+    repeats: List[Tuple[int, int]] = []
+
+    # Validate everything first - one bad item never blocks the rest
+    for index, item in enumerate(items):
+        try:
+            payload = TransactionCreate.model_validate(item)
+            transaction = new_transaction(payload, created_by)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "invalid", "errors": _validation_errors(e)}
+            continue
+
+        key = transaction.idempotency_key
+        if key:
+            if key in first_by_key:
+                repeats.append((index, first_by_key[key]))
+                continue
+            first_by_key[key] = index
+        pending.append((index, transaction))
+
+    # Keys seen in earlier requests
+    existing = await _existing_keys(list(first_by_key))
+    to_insert: List[Tuple[int, Transaction]] = []
+    for index, transaction in pending:
+        stored = existing.get(transaction.idempotency_key) if transaction.idempotency_key else None
+        if stored:
+            results[index] = _duplicate(index, stored)
+        else:
+            to_insert.append((index, transaction))
+
+    # Transfers go in as all of their legs; each leg remembers its item's position
+    documents: List[Transaction] = []
+    owners: List[int] = []
+    for position, (_, transaction) in enumerate(to_insert):
+        legs = build_transfer_legs(transaction) if is_linked_transfer(transaction) else [transaction]
+        documents.extend(legs)
+        owners.extend([position] * len(legs))
+    await index_transactions(documents)
+
+    failed: Dict[int, str] = {}
+    while documents:
+        try:
+            await _insert_documents(documents)
+            break
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors:
+                raise
+            raced: List[str] = []
+            for error in errors:
+                position = owners[error["index"]]
+                _, transaction = to_insert[position]
+                if error.get("code") == DUPLICATE_KEY_ERROR and transaction.idempotency_key:
+                    # Another request stored the same key between our lookup and insert
+                    raced.append(transaction.idempotency_key)
+                failed.setdefault(position, error.get("errmsg", "Insert failed"))
+            if raced:
+                existing.update(await _existing_keys(raced))
+        # Nothing of the attempt was kept - retry without the rejected items (a transfer only whole)
+        kept = [(doc, position) for doc, position in zip(documents, owners) if position not in failed]
+        documents = [doc for doc, _ in kept]
+        owners = [position for _, position in kept]
+
+    for position, (index, transaction) in enumerate(to_insert):
+        if position not in failed:
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "id": str(transaction.id),
+                "transactionId": transaction.transaction_id,
+            }
+        elif transaction.idempotency_key in existing:
+            results[index] = _duplicate(index, existing[transaction.idempotency_key])
+        else:
+            results[index] = {"index": index, "status": "failed", "errors": [failed[position]]}
+
+    # Repeats inside this batch point at whatever their first occurrence became
+    for index, first in repeats:
+        first_result = results[first]
+        results[index] = {
+            "index": index,
+            "status": "duplicate",
+            "id": first_result.get("id"),
+            "transactionId": first_result.get("transactionId"),
+        }
+
+    return results
+
+
+# ==================== STATEMENT IMPORT ====================
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 50
+
+
+def _next_rows(rows: Iterator[StatementRow], size: int) -> List[StatementRow]:
+    return list(islice(rows, size))
+
+
+ImportKey = Tuple[str, Any, float]
+
+
+def _import_keys(row: StatementRow) -> Tuple[Optional[ImportKey], Optional[ImportKey]]:
+    """
+    (reference, date, amount) and (UPI id, date, amount) for a statement row
+    A reference alone is not unique - cheque numbers and UTRs get reused across days
+    """
+    amount = round(abs(row["amount"]), 2)
+    reference = row["reference"][:100] if row["reference"] else None
+    return (
+        (reference, row["date"], amount) if reference else None,
+        (row["upi_reference"], row["date"], amount) if row["upi_reference"] else None,
+    )
+
+
+async def _known_references(
+    rows: List[StatementRow], created_by: Optional[str], account_id: Optional[str] = None
+) -> Tuple[set, set]:
+    """Import keys of this batch already stored by the importing user (on the same account)"""
+    references = list({row["reference"][:100] for row in rows if row["reference"]})
+    upi_references = list({row["upi_reference"] for row in rows if row["upi_reference"]})
+    if not references and not upi_references:
+        return set(), set()
+
+    query: Dict[str, Any] = {
+        Transaction.is_deleted: False,
+        Transaction.created_by: created_by,
+        Transaction.transaction_date: {"$in": list({utils.as_datetime(row["date"]) for row in rows})},
+        "$or": [
+            {Transaction.reference_number: {"$in": references}},
+            {Transaction.upi_transaction_id: {"$in": upi_references}},
+        ],
+    }
+    if account_id:
+        query["$and"] = [{"$or": [
+            {Transaction.from_account_id: account_id},
+            {Transaction.to_account_id: account_id},
+        ]}]
+    projection = {
+        Transaction.reference_number: 1,
+        Transaction.upi_transaction_id: 1,
+        Transaction.transaction_date: 1,
+        Transaction.amount: 1,
+        "_id": 0,
+    }
+    known, known_upi = set(), set()
+    async for doc in Transaction.get_pymongo_collection().find(query, projection):
+        day = doc[Transaction.transaction_date].date()
+        amount = round(doc[Transaction.amount], 2)
+        if doc.get(Transaction.reference_number):
+            known.add((doc[Transaction.reference_number], day, amount))
+        if doc.get(Transaction.upi_transaction_id):
+            known_upi.add((doc[Transaction.upi_transaction_id], day, amount))
+    return known, known_upi
+
+
+async def run_import(
+    job_id: PydanticObjectId,
+    path: str,
+    expense_category_id: str,
+    income_category_id: Optional[str] = None,
+    account_id: Optional[str] = None,
+    day_first: bool = True,
+):
+    """
+    Background statement import
+    Rows are parsed lazily in a worker thread, de-duplicated against the user's stored
+    (reference / UPI number, date, amount) and inserted IMPORT_BATCH_SIZE at a time
+    """
+    job: Optional[ImportJob] = None
+    loop = asyncio.get_running_loop()
+    seen_references, seen_upi = set(), set()
+    try:
+        job = await ImportJob.get(job_id)
+        if job is None:
+            raise ValueError(f"Import job {job_id} not found")
+        job.status = ImportStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        await job.save()
+
+        with open(path, "rb") as stream:
+            rows = STATEMENT_PARSERS[job.format](stream, day_first=day_first)
+            while True:
+                batch = await loop.run_in_executor(None, _next_rows, rows, IMPORT_BATCH_SIZE)
+                if not batch:
+                    break
+
+                first_row = job.rows_read + 1
+                job.rows_read += len(batch)
+                known, known_upi = await _known_references(batch, job.created_by, account_id)
+
+                payloads, row_numbers = [], []
+                for offset, row in enumerate(batch):
+                    reference_key, upi_key = _import_keys(row)
+                    if (upi_key and (upi_key in known_upi or upi_key in seen_upi)) or (
+                        reference_key and (reference_key in known or reference_key in seen_references)
+                    ):
+                        job.duplicates += 1
+                        continue
+                    if upi_key:
+                        seen_upi.add(upi_key)
+                    if reference_key:
+                        seen_references.add(reference_key)
+                    payloads.append(row_to_payload(row, expense_category_id, income_category_id, account_id))
+                    row_numbers.append(first_row + offset)
+
+                if payloads:
+                    for result in await create_transactions(payloads, job.created_by):
+                        status = result["status"]
+                        if status == "created":
+                            job.created += 1
+                        elif status == "duplicate":
+                            job.duplicates += 1
+                        else:
+                            setattr(job, status, getattr(job, status) + 1)
+                            if len(job.errors) < MAX_IMPORT_ERRORS:
+                                row_number = row_numbers[result["index"]]
+                                job.errors.append(f"Row {row_number}: {'; '.join(result['errors'])}")
+
+                # Progress for pollers
+                await job.save()
+
+        job.status = ImportStatus.COMPLETED
+    except Exception as e:
+        logger.error(f"Import {job_id} failed: {e}")
+        if job is not None:
+            job.status = ImportStatus.FAILED
+            job.errors.append(str(e))
+    finally:
+        try:
+            if job is not None:
+                job.finished_at = datetime.utcnow()
+                await job.save()
+        finally:
+            os.remove(path)
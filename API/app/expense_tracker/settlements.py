@@ -0,0 +1,125 @@
+import heapq
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Transaction
+from .signals import TransactionChange, transaction_committed
+
+# Stands for the user themself among the contacts of a settlement
+SELF = "self"
+
+
+# ==================== MIN CASH FLOW ====================
+
+def minimize_transfers(balances: Dict[str, int]) -> List[Tuple[str, str, int]]:
+    """
+    Fewest-transfers settlement of net balances (+ is owed money, - owes), in paise
+    Greedy min-cash-flow: the largest debtor pays the largest creditor until one is
+    square. Two heaps keep it O(n log n); at most n - 1 transfers come out
+    """
+    creditors = [(-amount, who) for who, amount in balances.items() if amount > 0]
+    debtors = [(amount, who) for who, amount in balances.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debit, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debit)
+        transfers.append((debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debit > amount:
+            heapq.heappush(debtors, (debit + amount, debtor))
+    return transfers
+
+
+# ==================== BALANCES ====================
+
+def _participant(contact_id: Optional[str], user: str) -> str:
+    return SELF if not contact_id or contact_id == user else contact_id
+
+
+async def split_balances(user: str) -> Dict[str, int]:
+    """
+    Net position of everyone in the user's unsettled splits, in paise
+    The transaction's contact paid when one is set, otherwise the user did; every
+    unsettled share owes the payer. Streamed from one aggregation grouped by pair
+    """
+    pipeline = [
+        {"$match": {
+            Transaction.created_by: user,
+            Transaction.is_deleted: False,
+            "splitTransactions.0": {"$exists": True},
+        }},
+        {"$unwind": "$splitTransactions"},
+        {"$match": {"splitTransactions.settled": False}},
+        {"$group": {
+            "_id": {"payer": f"${Transaction.contact_id}", "debtor": "$splitTransactions.contactId"},
+            "amount": {"$sum": "$splitTransactions.amount"},
+        }},
+    ]
+    balances: Dict[str, int] = defaultdict(int)
+    async for row in Transaction.aggregate(pipeline):
+        payer = _participant(row["_id"].get("payer"), user)
+        debtor = _participant(row["_id"].get("debtor"), user)
+        if payer == debtor:
+            continue
+        amount = round(row["amount"] * 100)
+        balances[payer] += amount
+        balances[debtor] -= amount
+    return {who: amount for who, amount in balances.items() if amount}
+
+
+async def compute_settlements(user: str) -> Dict[str, Any]:
+    balances = await split_balances(user)
+    return {
+        "balances": [
+            {"contactId": who, "balance": amount / 100}
+            for who, amount in sorted(balances.items(), key=lambda item: item[1])
+        ],
+        "transfers": [
+            {"from": debtor, "to": creditor, "amount": amount / 100}
+            for debtor, creditor, amount in minimize_transfers(balances)
+        ],
+    }
+
+
+# ==================== CACHE ====================
+
+class SettlementCache:
+    """
+    Settlements per user, dropped when one of the user's split transactions changes
+    Entries also expire after `ttl` seconds, covering writes made by other workers
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def invalidate(self, user: Optional[str] = None):
+        if user is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user, None)
+
+    async def get(self, user: str) -> Dict[str, Any]:
+        entry = self._entries.get(user)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        result = await compute_settlements(user)
+        self._entries[user] = (time.monotonic(), result)
+        return result
+
+
+settlement_cache = SettlementCache()
+
+
+@transaction_committed.connect
+async def invalidate_settlements(changes: List[TransactionChange], **kwargs):
+    for before, after in changes:
+        for transaction in (before, after):
+            if transaction is not None and transaction.split_transactions:
+                settlement_cache.invalidate(transaction.created_by or "")
@@ -0,0 +1,77 @@
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+import logging
+
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionChange(NamedTuple):
+    """
+    One transaction write
+    before is None for creates; after.is_deleted is True for soft deletes
+    """
+    before: Optional[Transaction]
+    after: Optional[Transaction]
+
+
+class BudgetAlert(NamedTuple):
+    """A budget's spending crossed one of BUDGET_THRESHOLDS upwards"""
+    budget_id: Any
+    name: str
+    threshold: float
+    spent: float
+    amount: float
+
+
+class Signal:
+    """
+    Django-style signal for async receivers
+    Usage:
+        @transaction_changed.connect
+        async def update_rollups(changes, session=None, **kwargs): ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._receivers: List[Callable[..., Awaitable[Any]]] = []
+
+    def connect(self, receiver: Callable[..., Awaitable[Any]]):
+        """Register a receiver - usable as a decorator"""
+        if receiver not in self._receivers:
+            self._receivers.append(receiver)
+        return receiver
+
+    def disconnect(self, receiver: Callable[..., Awaitable[Any]]):
+        """Unregister a receiver"""
+        if receiver in self._receivers:
+            self._receivers.remove(receiver)
+
+    async def send(self, **kwargs):
+        """Call every receiver in order - the first failure propagates"""
+        for receiver in self._receivers:
+            await receiver(**kwargs)
+
+    async def send_robust(self, **kwargs):
+        """Call every receiver, logging failures instead of raising"""
+        for receiver in self._receivers:
+            try:
+                await receiver(**kwargs)
+            except Exception as e:
+                logger.error(f"Receiver {receiver.__name__} failed for {self.name}: {e}")
+
+
+# Sent after transactions are created, updated or soft-deleted, inside the write's
+# MongoDB transaction - receivers only write to MongoDB (the send may be retried)
+# kwargs: changes: List[TransactionChange], session (optional MongoDB session),
+#         after_commit: list of (Signal, kwargs) to send once the write has committed
+transaction_changed = Signal("transaction_changed")
+
+# Sent once the same changes have committed - receivers keeping in-memory state listen here,
+# so an aborted write never reaches a cache and a stale reload cannot undo an invalidation
+# kwargs: changes: List[TransactionChange]
+transaction_committed = Signal("transaction_committed")
+
+# Sent when a transaction write pushes a budget past a threshold
+# kwargs: alerts: List[BudgetAlert]
+budget_threshold_crossed = Signal("budget_threshold_crossed")
@@ -0,0 +1,132 @@
+import heapq
+import sys
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from ..core.cache import UserCache
+from ..core.config import SUGGEST_MEMORY_BUDGET_MB
+from .models import Transaction, TransferLeg
+from .signals import TransactionChange, transaction_committed
+
+DESCRIPTION = "description"
+TAG = "tag"
+# Most-used descriptions / tags loaded per user; later saves may add more
+MAX_LOADED_PER_KIND = 5000
+# Rough per-entry cost beyond the two strings: key tuple, weight, list slots
+ENTRY_OVERHEAD = 200
+
+
+def _countable(transaction: Optional[Transaction]) -> bool:
+    # The IN and FEE legs repeat the OUT leg's text - count a transfer once
+    return (
+        transaction is not None
+        and not transaction.is_deleted
+        and transaction.transfer_leg not in (TransferLeg.IN, TransferLeg.FEE)
+    )
+
+
+def _texts(transaction: Transaction) -> List[Tuple[str, str]]:
+    return [(DESCRIPTION, transaction.description), *((TAG, tag) for tag in transaction.tags)]
+
+
+class UserSuggestions:
+    """
+    One user's descriptions and tags with use counts, sorted by lowercased text
+    A prefix is a contiguous slice of `keys`; the heaviest N of the slice win.
+    `weights` and `texts` run parallel to `keys`
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[str, str]] = []
+        self.weights: List[int] = []
+        self.texts: List[str] = []
+        self.nbytes = 0
+
+    def add(self, kind: str, text: str, weight: int = 1):
+        text = text.strip()
+        if not text:
+            return
+        key = (text.lower(), kind)
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.weights[i] += weight
+            if self.weights[i] <= 0:
+                self.nbytes -= sys.getsizeof(key[0]) + sys.getsizeof(self.texts[i]) + ENTRY_OVERHEAD
+                del self.keys[i], self.weights[i], self.texts[i]
+            return
+        if weight <= 0:
+            return
+        self.keys.insert(i, key)
+        self.weights.insert(i, weight)
+        self.texts.insert(i, text)
+        self.nbytes += sys.getsizeof(key[0]) + sys.getsizeof(text) + ENTRY_OVERHEAD
+
+    def apply(self, change: TransactionChange):
+        for transaction, sign in ((change.before, -1), (change.after, 1)):
+            if _countable(transaction):
+                for kind, text in _texts(transaction):
+                    self.add(kind, text, sign)
+
+    def complete(self, prefix: str, limit: int, kind: Optional[str] = None) -> List[Dict]:
+        prefix = prefix.strip().lower()
+        start = bisect_left(self.keys, (prefix,))
+        end = bisect_left(self.keys, (prefix + "\uffff",))
+        candidates = range(start, end)
+        if kind is not None:
+            candidates = [i for i in candidates if self.keys[i][1] == kind]
+        best = heapq.nlargest(limit, candidates, key=self.weights.__getitem__)
+        return [{"text": self.texts[i], "kind": self.keys[i][1], "count": self.weights[i]} for i in best]
+
+
+async def load_user_suggestions(user: str) -> UserSuggestions:
+    """Build a user's vocabulary from history - one $facet over their live transactions"""
+    def top(stages):
+        return [
+            *stages,
+            {"$group": {"_id": "$text", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": MAX_LOADED_PER_KIND},
+        ]
+
+    pipeline = [
+        {"$match": {
+            Transaction.created_by: user,
+            Transaction.is_deleted: False,
+            Transaction.transfer_leg: {"$nin": [TransferLeg.IN.value, TransferLeg.FEE.value]},
+        }},
+        {"$facet": {
+            DESCRIPTION: top([{"$project": {"text": f"${Transaction.description}"}}]),
+            TAG: top([{"$unwind": f"${Transaction.tags}"}, {"$project": {"text": f"${Transaction.tags}"}}]),
+        }},
+    ]
+    suggestions = UserSuggestions()
+    async for facets in Transaction.aggregate(pipeline):
+        for kind in (DESCRIPTION, TAG):
+            for row in facets[kind]:
+                if isinstance(row["_id"], str):
+                    suggestions.add(kind, row["_id"], row["count"])
+    return suggestions
+
+
+class SuggestionCache(UserCache[UserSuggestions]):
+    """Per-worker UserSuggestions, built on first use and kept current by transaction_committed"""
+
+    def __init__(self, budget_bytes: int):
+        super().__init__(load_user_suggestions, budget_bytes)
+
+    async def suggest(self, user: str, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict]:
+        return (await self.get(user)).complete(prefix, limit, kind)
+
+
+suggestion_cache = SuggestionCache(SUGGEST_MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+@transaction_committed.connect
+async def update_suggestions(changes: List[TransactionChange], **kwargs):
+    """Adjust the counts of users whose vocabulary is loaded; others build fresh on next use"""
+    for change in changes:
+        transaction = change.after or change.before
+        suggestions = suggestion_cache.changed(transaction.created_by or "")
+        if suggestions is not None:
+            suggestions.apply(change)
+    suggestion_cache.evict()
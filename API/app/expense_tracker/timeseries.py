@@ -0,0 +1,223 @@
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Literal, NamedTuple, Optional
+
+import numpy as np
+
+from ..core.config import ANALYTICS_WORKERS
+from .columns import TYPE_CODES, column_cache, day_number
+from .models import TransactionType
+
+Granularity = Literal["day", "week", "month"]
+
+PERCENTILES = [50, 75, 90, 95, 99]
+# Longest series served - about 13 years of days
+MAX_PERIODS = 5000
+# Below this many rows the pool's pickling costs more than the computation
+INLINE_ROWS = 50_000
+
+INCOME = TYPE_CODES[TransactionType.INCOME.value]
+EXPENSE = TYPE_CODES[TransactionType.EXPENSE.value]
+
+
+class Columns(NamedTuple):
+    """One user's income / expense rows as parallel arrays"""
+    dates: np.ndarray       # datetime64[D]
+    amounts: np.ndarray     # float64
+    is_income: np.ndarray   # bool - otherwise expense
+    categories: np.ndarray  # int32 index into category_ids
+    category_ids: List[str]
+
+
+# ==================== LOADING ====================
+
+async def load_columns(user: str, start: Optional[date] = None, end: Optional[date] = None) -> Columns:
+    """The user's income and expenses within [start, end], sliced from the column cache"""
+    cached = await column_cache.get(user)
+    view = cached.view()
+    rows = (view.type == INCOME) | (view.type == EXPENSE)
+    if start:
+        rows &= view.day >= day_number(start)
+    if end:
+        rows &= view.day <= day_number(end)
+    return Columns(
+        dates=view.day[rows].astype("datetime64[D]"),
+        amounts=view.amount[rows],
+        is_income=view.type[rows] == INCOME,
+        categories=view.category[rows].astype(np.int32),
+        category_ids=list(cached.category_ids),
+    )
+
+
+# ==================== COMPUTATION ====================
+
+def bucket_keys(dates: np.ndarray, granularity: Granularity) -> np.ndarray:
+    """Period number of each date: days, Monday-based weeks or months since the epoch"""
+    if granularity == "month":
+        return dates.astype("datetime64[M]").astype(np.int64)
+    days = dates.astype(np.int64)
+    if granularity == "week":
+        # 1970-01-01 was a Thursday - shift so weeks start on Monday
+        return (days + 3) // 7
+    return days
+
+
+def period_starts(first: int, count: int, granularity: Granularity) -> List[str]:
+    keys = np.arange(first, first + count, dtype=np.int64)
+    if granularity == "month":
+        starts = keys.astype("datetime64[M]").astype("datetime64[D]")
+    elif granularity == "week":
+        starts = (keys * 7 - 3).astype("datetime64[D]")
+    else:
+        starts = keys.astype("datetime64[D]")
+    return np.datetime_as_string(starts, unit="D").tolist()
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` periods; the first periods average what they have"""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def period_change(values: np.ndarray) -> Dict[str, List[Optional[float]]]:
+    """Change against the previous period, absolute and in percent (null where undefined)"""
+    previous = np.concatenate(([np.nan], values[:-1]))
+    delta = values - previous
+    percent = np.full(len(values), np.nan)
+    np.divide(delta * 100, previous, out=percent, where=(previous != 0) & ~np.isnan(previous))
+    return {"delta": _rounded(delta), "percent": _rounded(percent)}
+
+
+def _rounded(values: np.ndarray) -> List[Optional[float]]:
+    return [None if math.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def _percentiles(values: np.ndarray) -> Optional[Dict[str, float]]:
+    if not len(values):
+        return None
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def compute_series(
+    columns: Columns,
+    granularity: Granularity = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    window: int = 3,
+    top_categories: int = 10,
+) -> Dict[str, Any]:
+    """
+    Income / expense per period with rolling means, period-over-period change,
+    percentiles and the top expense categories per period - all vectorized:
+    one bincount per series, one flattened (period, category) bincount for the breakdown
+    """
+    if not len(columns.amounts) and not (start and end):
+        return {"granularity": granularity, "periods": [], "window": window}
+
+    keys = bucket_keys(columns.dates, granularity)
+    first = int(bucket_keys(np.array([start], dtype="datetime64[D]"), granularity)[0]) if start else int(keys.min())
+    last = int(bucket_keys(np.array([end], dtype="datetime64[D]"), granularity)[0]) if end else int(keys.max())
+    count = last - first + 1
+    if count <= 0:
+        raise ValueError("end_date is before start_date")
+    if count > MAX_PERIODS:
+        raise ValueError(f"Range spans {count} {granularity}s - at most {MAX_PERIODS} allowed")
+    in_range = (keys >= first) & (keys <= last)
+
+    buckets = (keys - first)[in_range]
+    amounts = columns.amounts[in_range]
+    is_income = columns.is_income[in_range]
+    categories = columns.categories[in_range]
+
+    income = np.bincount(buckets, weights=np.where(is_income, amounts, 0.0), minlength=count)
+    expense = np.bincount(buckets, weights=np.where(is_income, 0.0, amounts), minlength=count)
+    net = income - expense
+
+    # Expense per (period, category) in one pass over a flattened index
+    category_count = len(columns.category_ids)
+    expense_rows = ~is_income
+    by_category = np.bincount(
+        buckets[expense_rows] * category_count + categories[expense_rows],
+        weights=amounts[expense_rows],
+        minlength=count * category_count,
+    ).reshape(count, category_count)
+    category_totals = by_category.sum(axis=0)
+    top = [i for i in np.argsort(-category_totals)[:top_categories] if category_totals[i] > 0]
+
+    return {
+        "granularity": granularity,
+        "periods": period_starts(first, count, granularity),
+        "income": _rounded(income),
+        "expense": _rounded(expense),
+        "net": _rounded(net),
+        "window": window,
+        "rollingAverage": {
+            "income": _rounded(rolling_mean(income, window)),
+            "expense": _rounded(rolling_mean(expense, window)),
+            "net": _rounded(rolling_mean(net, window)),
+        },
+        "change": {
+            "income": period_change(income),
+            "expense": period_change(expense),
+            "net": period_change(net),
+        },
+        "percentiles": {
+            "expenseAmount": _percentiles(amounts[expense_rows]),
+            "incomeAmount": _percentiles(amounts[is_income]),
+            "periodExpense": _percentiles(expense),
+            "periodIncome": _percentiles(income),
+        },
+        "categories": [
+            {
+                "categoryId": columns.category_ids[i],
+                "total": round(float(category_totals[i]), 2),
+                "expense": _rounded(by_category[:, i]),
+            }
+            for i in top
+        ],
+    }
+
+
+# ==================== WORKER POOL ====================
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool for large series - spawned, so no event loop or sockets are forked"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=ANALYTICS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def timeseries(
+    user: str,
+    granularity: Granularity = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    window: int = 3,
+    top_categories: int = 10,
+) -> Dict[str, Any]:
+    columns = await load_columns(user, start, end)
+    if len(columns.amounts) < INLINE_ROWS or ANALYTICS_WORKERS <= 0:
+        return compute_series(columns, granularity, start, end, window, top_categories)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_pool(), compute_series, columns, granularity, start, end, window, top_categories
+    )
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from decouple import Config, RepositoryEnv
 from pathlib import Path
@@ -11,8 +12,14 @@ from .database import Base, engine, MongoDBManager, BaseDocument # MongoDB manag
 from .cloud_services.aws_services.dynamodb import BaseDynamoModel,DynamoDBManager,Manager  # DynamoDB manager
 from .auth.routes import router as auth_router
 from .expense_tracker.routes import router as expense_router
+from .expense_tracker.budgets import reconcile_periodically
+from .expense_tracker.recurring import run_scheduler
+from .expense_tracker.archive import archive_periodically
+from .expense_tracker.compaction import compact_periodically
+from .expense_tracker.timeseries import shutdown_pool
 from .categories.routes import router as categories_router
 from .core.config import *
+from .core.responses import FastJSONResponse
 
 
 # SQLAlchemy for auth (existing) - ALWAYS runs
@@ -75,15 +82,31 @@ async def lifespan(app: FastAPI):
     
     # Connect to correct database
     await model_registry.db_manager.connect(models=initialized_models)  # ✅ CORRECT!
+
+    # Background jobs
+    background_tasks = []
+    if not IS_CLOUD and BUDGET_RECONCILE_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(reconcile_periodically(BUDGET_RECONCILE_SECONDS)))
+    if not IS_CLOUD and RECURRING_SCHEDULER_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_scheduler(RECURRING_SCHEDULER_SECONDS)))
+    if not IS_CLOUD and ARCHIVE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(archive_periodically(ARCHIVE_INTERVAL_SECONDS)))
+    if not IS_CLOUD and COMPACTION_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(compact_periodically(COMPACTION_INTERVAL_SECONDS)))
     
     yield
     
     # Shutdown
-    await model_registry.manager.close()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    shutdown_pool()
+    await model_registry.db_manager.close()
 
 app = FastAPI(
     title="FastAPI Auth & Expense Tracker System",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
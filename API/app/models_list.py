@@ -1,5 +1,5 @@
 from .auth.models import User
-from .expense_tracker.models import Transaction, Account, Contact, Budget, UpiProvider
+from .expense_tracker.models import Transaction, Account, Contact, Budget, UpiProvider, ImportJob, TransactionRollup, BalanceSnapshot, SchedulerLease
 from .categories.models import Category
 
 models_list = [
@@ -10,6 +10,10 @@ models_list = [
     Contact,
     Budget,
     UpiProvider,
+    ImportJob,
+    TransactionRollup,
+    BalanceSnapshot,
+    SchedulerLease,
     Category
 ]
 
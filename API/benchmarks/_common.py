@@ -0,0 +1,89 @@
+"""
+Shared helpers for the benchmark scripts
+Run any benchmark from the repository root, e.g.
+    python -m API.benchmarks.bench_serialization
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+from beanie import init_beanie
+
+from API.app.core.config import MONGO_URL, DB_NAME
+
+BENCH_DB_NAME = f"{DB_NAME}_bench"
+
+TRANSACTION_TYPES = ["INCOME", "EXPENSE", "EXPENSE", "EXPENSE", "TRANSFER"]
+PAYMENT_METHODS = ["CASH", "UPI", "CREDIT_CARD", "DEBIT_CARD", "NET_BANKING"]
+WORDS = [
+    "grocery", "swiggy", "zomato", "uber", "rent", "salary", "electricity",
+    "petrol", "amazon", "flipkart", "netflix", "gym", "pharmacy", "coffee",
+    "movie", "insurance", "school", "fees", "dinner", "taxi",
+]
+
+
+async def init_models(*models, skip_indexes: bool = True):
+    """Initialize Beanie against the benchmark database"""
+    await init_beanie(
+        connection_string=f"{MONGO_URL.rstrip('/')}/{BENCH_DB_NAME}",
+        document_models=list(models),
+        skip_indexes=skip_indexes,
+    )
+
+
+def make_transaction_docs(count: int, users: int = 1, seed: int = 42) -> List[Dict]:
+    """Raw transaction documents shaped like they are stored in MongoDB (aliased keys)"""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=3 * 365)
+    docs = []
+    for i in range(count):
+        day = start + timedelta(days=rng.randint(0, 3 * 365))
+        docs.append({
+            "transactionId": f"{i:024d}",
+            "transactionType": rng.choice(TRANSACTION_TYPES),
+            "amount": round(rng.uniform(10, 5000), 2),
+            "currency": "INR",
+            "transactionDate": datetime.combine(day, datetime.min.time()),
+            "categoryId": f"cat{rng.randint(1, 25)}",
+            "subcategoryId": None,
+            "description": " ".join(rng.sample(WORDS, 3)),
+            "notes": None,
+            "tags": rng.sample(WORDS, 2),
+            "paymentMethod": rng.choice(PAYMENT_METHODS),
+            "fromAccountId": f"acc{rng.randint(1, 4)}",
+            "toAccountId": None,
+            "isPaid": False,
+            "isRecurring": False,
+            "recurringConfig": None,
+            "isTaxDeductible": False,
+            "location": None,
+            "attachments": [],
+            "splitTransactions": [],
+            "transferFee": 0.0,
+            "createLinkedTransactions": True,
+            "createdAt": datetime.utcnow(),
+            "createdBy": f"user{i % users}",
+            "isDeleted": False,
+            "isDuplicate": False,
+        })
+    return docs
+
+
+def timed(fn: Callable, repeat: int = 5, number: int = 1) -> float:
+    """Best wall time of `repeat` runs of `number` calls, in milliseconds per call"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1000
+
+
+def report(title: str, rows: List[tuple]):
+    """Print a small before/after table"""
+    print(f"\n{title}")
+    print(f"{'case':<28}{'before (ms)':>14}{'after (ms)':>14}{'speed-up':>10}")
+    for name, before, after in rows:
+        print(f"{name:<28}{before:>14.3f}{after:>14.3f}{before / after:>9.1f}x")
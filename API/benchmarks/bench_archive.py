@@ -0,0 +1,68 @@
+"""
+Cold archive at 1M rows - index size of the hot collection and the analytics column load,
+before and after moving the years that ended more than a year ago into mmap'd segments
+Needs a running MongoDB (MONGO_URL); the collection is rebuilt on every run
+
+    python -m API.benchmarks.bench_archive
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from API.app.expense_tracker.archive import archive_older_than, archive_store
+from API.app.expense_tracker.columns import load_user_columns
+from API.app.expense_tracker.models import Transaction
+from ._common import init_models, make_transaction_docs, report
+
+COUNT = 1_000_000
+USERS = 10
+INSERT_BATCH_SIZE = 10_000
+HOT_YEARS = 1
+
+
+async def best_of(fn, repeat: int = 3) -> float:
+    """Best wall time of `repeat` awaited calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def index_size(collection) -> int:
+    stats = await collection.database.command("collStats", collection.name)
+    return stats["totalIndexSize"]
+
+
+async def main():
+    await init_models(Transaction)
+    collection = Transaction.get_pymongo_collection()
+    await collection.drop()
+    await init_models(Transaction, skip_indexes=False)
+    for offset in range(0, COUNT, INSERT_BATCH_SIZE):
+        await collection.insert_many(make_transaction_docs(INSERT_BATCH_SIZE, users=USERS, seed=offset), ordered=False)
+
+    user = "user0"
+    before_size = await index_size(collection)
+    before_load = await best_of(lambda: load_user_columns(user))
+
+    with tempfile.TemporaryDirectory() as root:
+        archive_store.root = Path(root)
+        stats = await archive_older_than(HOT_YEARS)
+        await collection.database.command("compact", collection.name)
+        after_size = await index_size(collection)
+        after_load = await best_of(lambda: load_user_columns(user))
+        archived = archive_store.nbytes()
+
+    print(f"\nArchived {stats['archived']:,} of {COUNT:,} rows into {stats['segments']} segments ({archived / 2**20:.1f} MiB)")
+    print(f"Hot index size: {before_size / 2**20:.1f} MiB -> {after_size / 2**20:.1f} MiB")
+    report(f"Analytics column load ({COUNT // USERS:,} rows per user)", [
+        ("load_user_columns", before_load, after_load),
+    ])
+    await collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
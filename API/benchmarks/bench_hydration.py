@@ -0,0 +1,58 @@
+"""
+Hydration benchmark - validated load vs trusted load of 10k transactions
+
+    python -m API.benchmarks.bench_hydration
+"""
+import asyncio
+from datetime import date
+
+from beanie.odm.utils.parsing import parse_obj
+
+from API.app.core.hydration import Hydrator
+from API.app.expense_tracker.models import Transaction
+from ._common import init_models, make_transaction_docs, timed, report
+
+COUNT = 10_000
+
+
+def with_nested(docs):
+    """Give every tenth document the nested sub-models the validators walk"""
+    for i, doc in enumerate(docs[::10]):
+        doc["recurringConfig"] = {"frequency": "MONTHLY", "startDate": date.today().isoformat()}
+        doc["splitTransactions"] = [{"contactId": "c1", "amount": doc["amount"]}]
+        doc["attachments"] = [{
+            "fileName": "bill.pdf", "fileType": "pdf", "fileSize": 1024,
+            "fileUrl": f"https://files/{i}",
+        }]
+    return docs
+
+
+async def main():
+    await init_models(Transaction)
+    docs = with_nested(make_transaction_docs(COUNT))
+
+    # DynamoDB keeps field names inside `data` - same document, other key style
+    validated = [Transaction.model_validate(doc) for doc in docs[:10]]
+    dynamo_items = [
+        {"pk": str(i), "sk": str(i), "data": t.model_dump(by_alias=False)}
+        for i, t in enumerate(validated * (COUNT // 10))
+    ]
+
+    rows = [
+        (
+            "MongoDB 10k docs",
+            # What Beanie does per document: validate, then snapshot state
+            timed(lambda: [parse_obj(Transaction, doc) for doc in docs], repeat=3),
+            timed(lambda: [Transaction.from_db(doc) for doc in docs], repeat=3),
+        ),
+        (
+            "DynamoDB 10k items",
+            timed(lambda: [Transaction(**item["data"]) for item in dynamo_items], repeat=3),
+            timed(lambda: [Hydrator.hydrate(Transaction, item["data"]) for item in dynamo_items], repeat=3),
+        ),
+    ]
+    report(f"Transaction hydration ({COUNT} rows)", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
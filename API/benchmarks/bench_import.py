@@ -0,0 +1,76 @@
+"""
+Statement import throughput - streaming parse + mapping + validation, rows per second
+Database inserts are excluded; they are one insert_many per IMPORT_BATCH_SIZE rows
+
+    python -m API.benchmarks.bench_import
+"""
+import io
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from API.app.expense_tracker.importers import STATEMENT_PARSERS, row_to_payload
+from API.app.expense_tracker.models import TransactionCreate
+from API.app.expense_tracker.services import IMPORT_BATCH_SIZE
+from ._common import WORDS
+
+ROWS = 100_000
+
+
+def make_statements(count: int, seed: int = 42):
+    """Same synthetic statement as CSV, OFX and QIF bytes"""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    csv_lines = ["Account No: XXXX1234,,,,,", "Date,Narration,Chq./Ref.No.,Withdrawal Amt.,Deposit Amt.,Closing Balance"]
+    ofx_parts = ["OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"]
+    qif_lines = ["!Type:Bank"]
+    for i in range(count):
+        day = start + timedelta(days=rng.randint(0, 700))
+        amount = round(rng.uniform(10, 5000), 2)
+        is_credit = rng.random() < 0.2
+        narration = f"UPI/{400000000000 + i}/{' '.join(rng.sample(WORDS, 2))}"
+        reference = f"{i:016d}"
+        amount_text = f'"{amount:,.2f}"'
+        withdrawal, deposit = ("", amount_text) if is_credit else (amount_text, "")
+        csv_lines.append(f"{day:%d/%m/%y},{narration},{reference},{withdrawal},{deposit},0")
+        ofx_parts.append(
+            f"<STMTTRN><TRNTYPE>{'CREDIT' if is_credit else 'DEBIT'}<DTPOSTED>{day:%Y%m%d}"
+            f"<TRNAMT>{amount if is_credit else -amount}<FITID>{reference}<NAME>{narration}\n"
+        )
+        qif_lines.append(f"D{day:%d/%m/%Y}\nT{amount if is_credit else -amount}\nP{narration}\nN{reference}\n^")
+    ofx_parts.append("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return {
+        "csv": "\n".join(csv_lines).encode(),
+        "ofx": "".join(ofx_parts).encode(),
+        "qif": "\n".join(qif_lines).encode(),
+    }
+
+
+def run(fmt: str, data: bytes) -> int:
+    """Parse, map and validate in import-sized batches - returns rows handled"""
+    rows = STATEMENT_PARSERS[fmt](io.BytesIO(data))
+    handled = 0
+    while True:
+        batch = list(islice(rows, IMPORT_BATCH_SIZE))
+        if not batch:
+            return handled
+        for row in batch:
+            TransactionCreate.model_validate(row_to_payload(row, "cat1", "cat2", "acc1"))
+        handled += len(batch)
+
+
+def main():
+    statements = make_statements(ROWS)
+    print(f"\nStatement import ({ROWS:,} rows, parse + map + validate)")
+    print(f"{'format':<10}{'size (MB)':>12}{'seconds':>10}{'rows/s':>12}")
+    for fmt, data in statements.items():
+        start = time.perf_counter()
+        handled = run(fmt, data)
+        elapsed = time.perf_counter() - start
+        assert handled == ROWS, (fmt, handled)
+        print(f"{fmt:<10}{len(data) / 1e6:>12.1f}{elapsed:>10.2f}{handled / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Date-range reads at 1M rows - one transactions collection vs monthly partitions
+Each read case is a get_list page: count plus the newest 50 rows in the range
+The write cases price the replica: an insert alone vs the insert plus its partition upsert
+Needs a running MongoDB (MONGO_URL); the collections are rebuilt on every run
+
+    python -m API.benchmarks.bench_partitions
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+from API.app.expense_tracker.models import Transaction
+from API.app.expense_tracker.partitions import backfill, enable_partitions, store_raw
+from ._common import init_models, make_transaction_docs, report
+
+COUNT = 1_000_000
+INSERT_BATCH_SIZE = 10_000
+PAGE_SIZE = 50
+RANGES = {"last month": 30, "last quarter": 91, "last year": 365}
+WRITE_SIZES = {"write 1 row": 1, "write 1,000 rows": 1000}
+WRITE_REPEAT = 5
+
+
+async def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of `repeat` awaited calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main():
+    await init_models(Transaction)
+    collection = Transaction.get_pymongo_collection()
+    for name in await collection.database.list_collection_names():
+        if name.startswith(f"{collection.name}_"):
+            await collection.database.drop_collection(name)
+    await collection.drop()
+    await init_models(Transaction, skip_indexes=False)
+    for offset in range(0, COUNT, INSERT_BATCH_SIZE):
+        await collection.insert_many(make_transaction_docs(INSERT_BATCH_SIZE, users=10, seed=offset), ordered=False)
+    partitions = enable_partitions()
+    await backfill()
+
+    sort = [(Transaction.transaction_date, -1), (Transaction.created_at, -1)]
+    rows = []
+    for label, days in RANGES.items():
+        start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+        query = {Transaction.is_deleted: False, Transaction.transaction_date: {"$gte": start}}
+
+        async def single():
+            await collection.count_documents(query)
+            await collection.find(query).sort(sort).limit(PAGE_SIZE).to_list(None)
+
+        async def partitioned():
+            await partitions.count(query)
+            await partitions.find(query, sort=sort, limit=PAGE_SIZE)
+
+        rows.append((label, await best_of(single), await best_of(partitioned)))
+    report(f"Date-range page ({COUNT:,} rows, {len(await partitions.names())} partitions)", rows)
+
+    # Fresh documents for every run, so each insert creates new rows
+    rows, seed = [], COUNT
+    for label, size in WRITE_SIZES.items():
+        batches = []
+        for _ in range(2 * WRITE_REPEAT):
+            batches.append(make_transaction_docs(size, users=10, seed=seed))
+            seed += size
+        pending = iter(batches)
+
+        async def single():
+            await collection.insert_many(next(pending), ordered=False)
+
+        async def mirrored():
+            batch = next(pending)
+            await collection.insert_many(batch, ordered=False)
+            await store_raw(batch)
+
+        rows.append((label, await best_of(single, WRITE_REPEAT), await best_of(mirrored, WRITE_REPEAT)))
+    report("Write cost (speed-up below 1x is the replica's overhead)", rows)
+
+    for name in await partitions.names():
+        await collection.database.drop_collection(name)
+    await collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Transaction search at 1M rows - unanchored regex scan vs searchTokens multikey index
+Each case is what list_transactions runs: a count plus the first page of 50
+Needs a running MongoDB (MONGO_URL); the collection is rebuilt on every run
+
+    python -m API.benchmarks.bench_search
+"""
+import asyncio
+import re
+import time
+
+from API.app.database import LIVE_FILTER
+from API.app.expense_tracker.models import Transaction
+from API.app.expense_tracker.search import query_terms, relevance_stages, search_filter, search_tokens
+from ._common import init_models, make_transaction_docs, report
+
+COUNT = 1_000_000
+INSERT_BATCH_SIZE = 10_000
+PAGE_SIZE = 50
+SEARCHES = ["swiggy", "swig", "dinner taxi", "netfl"]
+
+
+async def load(collection):
+    await collection.drop()
+    await init_models(Transaction, skip_indexes=False)
+    for offset in range(0, COUNT, INSERT_BATCH_SIZE):
+        docs = make_transaction_docs(INSERT_BATCH_SIZE, users=1, seed=offset)
+        for doc in docs:
+            doc["searchTokens"] = search_tokens(
+                Transaction.model_construct(description=doc["description"], tags=doc["tags"], notes=None)
+            )
+        await collection.insert_many(docs, ordered=False)
+
+
+async def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of `repeat` awaited calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main():
+    await init_models(Transaction)
+    collection = Transaction.get_pymongo_collection()
+    await load(collection)
+    sort = [(Transaction.transaction_date, -1), (Transaction.created_at, -1)]
+
+    rows = []
+    for text in SEARCHES:
+        # Both with the live filter list_transactions adds - the searchTokens index is partial on it
+        regex_query = {**LIVE_FILTER, Transaction.description: {"$regex": re.escape(text), "$options": "i"}}
+        terms = query_terms(text)
+        token_query = {**LIVE_FILTER, **search_filter(terms)}
+
+        async def regex_search():
+            await collection.count_documents(regex_query)
+            await collection.find(regex_query).sort(sort).limit(PAGE_SIZE).to_list(None)
+
+        async def token_search():
+            await collection.count_documents(token_query)
+            pipeline = [
+                {"$match": token_query},
+                *relevance_stages(terms),
+                {"$sort": {"searchScore": -1, **dict(sort)}},
+                {"$limit": PAGE_SIZE},
+            ]
+            await (await collection.aggregate(pipeline)).to_list(None)
+
+        rows.append((f"'{text}'", await best_of(regex_search), await best_of(token_search)))
+    report(f"Transaction search ({COUNT:,} rows, count + first page)", rows)
+    await collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
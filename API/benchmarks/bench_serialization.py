@@ -0,0 +1,71 @@
+"""
+Response serialization benchmark - stdlib json + response_model vs FastJSONResponse
+
+    python -m API.benchmarks.bench_serialization
+"""
+import asyncio
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from API.app.core.responses import api_response
+from API.app.expense_tracker.models import Transaction, ApiResponse
+from ._common import init_models, make_transaction_docs, timed, report
+
+
+def legacy_list(transactions, total):
+    """get_list before: per-item model_dump, jsonable_encoder, json.dumps"""
+    data = [t.model_dump(by_alias=True, mode="json") for t in transactions]
+    content = {
+        "success": True,
+        "data": data,
+        "pagination": {"total": total, "skip": 0, "limit": len(data), "pages": 1},
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def legacy_single(transaction):
+    """save / get before: ApiResponse validated again through response_model"""
+    response = ApiResponse(
+        success=True,
+        data=transaction.model_dump(by_alias=True, mode="json"),
+        message="Transaction retrieved successfully",
+    )
+    validated = ApiResponse.model_validate(response.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_list(transactions, total):
+    return api_response(
+        data=transactions,
+        pagination={"total": total, "skip": 0, "limit": len(transactions), "pages": 1},
+    ).body
+
+
+def fast_single(transaction):
+    return api_response(data=transaction, message="Transaction retrieved successfully").body
+
+
+async def main():
+    await init_models(Transaction)
+    transactions = [Transaction.model_validate(doc) for doc in make_transaction_docs(100)]
+    single = transactions[0]
+
+    rows = [
+        (
+            "GET /get_list (100 rows)",
+            timed(lambda: legacy_list(transactions, 100), number=50),
+            timed(lambda: fast_list(transactions, 100), number=50),
+        ),
+        (
+            # /save answers with the same one-document envelope
+            "GET /transactions/{id}, POST /save",
+            timed(lambda: legacy_single(single), number=2000),
+            timed(lambda: fast_single(single), number=2000),
+        ),
+    ]
+    report("Response serialization", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
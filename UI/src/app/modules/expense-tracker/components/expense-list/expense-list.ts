@@ -799,7 +799,7 @@ export class ExpenseList implements OnInit, OnDestroy {
   /**
    * Export all transactions
    */
-  exportAll(format: 'csv' | 'excel' | 'pdf'): void {
+  exportAll(format: 'csv' | 'excel'): void {
     this.loading.set(true);
 
     this.expenseListService.exportTransactions(format)
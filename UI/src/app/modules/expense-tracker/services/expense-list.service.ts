@@ -74,28 +74,19 @@ export class ExpenseListService {
      * Bulk delete transactions
      */
     bulkDeleteTransactions(ids: string[]): Observable<any> {
-        // TODO: Replace with actual API call
-        // return this.http.post(`${this.API_BASE_URL}/transactions/bulk-delete`, { ids });
-
-        return of({ success: true, message: `${ids.length} transactions deleted successfully` }).pipe(delay(1000));
+        return this.http.post(`${this.API_BASE_URL}/bulk-delete`, { ids });
     }
 
     /**
      * Export transactions
      */
-    exportTransactions(format: 'csv' | 'excel' | 'pdf', ids?: string[]): Observable<Blob> {
+    exportTransactions(format: 'csv' | 'excel', ids?: string[]): Observable<Blob> {
         const params = new HttpParams().set('format', format);
 
-        // TODO: Replace with actual API call
-        // return this.http.post(`${this.API_BASE_URL}/transactions/export`, { ids }, {
-        //   params,
-        //   responseType: 'blob'
-        // });
-
-        // Mock implementation
-        const mockData = 'Mock export data';
-        const blob = new Blob([mockData], { type: 'text/plain' });
-        return of(blob).pipe(delay(1500));
+        return this.http.post(`${this.API_BASE_URL}/export`, { ids: ids ?? [] }, {
+            params,
+            responseType: 'blob'
+        });
     }
 
     /**